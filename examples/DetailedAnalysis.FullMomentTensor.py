@@ -149,6 +149,7 @@ if __name__=='__main__':
 
 
     from mpi4py import MPI
+    from mtuq.util import bcast2
     comm = MPI.COMM_WORLD
 
 
@@ -191,10 +192,10 @@ if __name__=='__main__':
 
 
     stations = comm.bcast(stations, root=0)
-    data_bw = comm.bcast(data_bw, root=0)
-    data_sw = comm.bcast(data_sw, root=0)
-    greens_bw = comm.bcast(greens_bw, root=0)
-    greens_sw = comm.bcast(greens_sw, root=0)
+    data_bw = bcast2(comm, data_bw)
+    data_sw = bcast2(comm, data_sw)
+    greens_bw = bcast2(comm, greens_bw)
+    greens_sw = bcast2(comm, greens_sw)
 
 
     #
@@ -46,7 +46,8 @@ def _greens_tensor_clients():
     return clients
 
 
-def open_db(path_or_url='', format='', **kwargs):
+def open_db(path_or_url='', format='', cache_path=None, 
+    cache_max_bytes=2**32, **kwargs):
     """ Opens database containing Green's functions
 
     Returns a client that can then be used to generate ``GreensTensor`` 
@@ -59,10 +60,18 @@ def open_db(path_or_url='', format='', **kwargs):
         db = open_db('axisem_database.nc', format='AxiSEM')
         greens = db.get_greens_tensors(stations, origin)
 
+    If ``cache_path`` is given, Green's tensors are kept in a persistent 
+    on-disk cache in that directory, so that repeated runs skip reading,
+    downloading and resampling (see ``mtuq.io.clients.base.DiskCache``)
         
     """
     format = format.upper()
-    return _greens_tensor_clients()[format](path_or_url=path_or_url, **kwargs)
+    client = _greens_tensor_clients()[format](path_or_url=path_or_url, **kwargs)
+
+    if cache_path:
+        client.set_cache(cache_path, max_bytes=cache_max_bytes)
+
+    return client
 
 
 def _readers():
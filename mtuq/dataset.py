@@ -7,12 +7,14 @@ from copy import copy, deepcopy
 from mtuq.event import Origin
 from mtuq.station import Station
 from mtuq.util import warn
+from mtuq.util.index import IndexedListMixin
+from mtuq.util.pool import pool_map
 from obspy import Stream
 from obspy.geodetics import gps2dist_azimuth
 
 
 
-class Dataset(list):
+class Dataset(IndexedListMixin, list):
     """ Seismic data container
 
     A list of ObsPy streams in which each stream corresponds to a single
@@ -23,12 +25,20 @@ class Dataset(list):
         Each supported file format has a corresponding reader that creates
         Datasets (see ``mtuq.io.readers``).
 
+    .. note::
+
+        To make `select` fast for large datasets, streams are indexed by 
+        station and origin.  The index is updated by `append` and rebuilt
+        after other list operations, but not if the station or origin 
+        attributes of streams already in the Dataset are modified in place.
+
     """
 
     def __init__(self, streams=[], id=None, tags=[]):
         """ Constructor method
         """
         self.id = id
+        self._index = None
 
         for stream in streams:
             self.append(stream)
@@ -80,14 +90,28 @@ class Dataset(list):
 
         super(Dataset, self).append(stream)
 
+        if getattr(self, '_index', None) is not None:
+            self._index_add(stream)
+
 
     def select(self, selector):
         """ Selects streams that match the given station or origin
         """
+        return self.__class__(
+            id=self.id, streams=self._find(selector))
+
+
+    def _find(self, selector):
+        # returns a list of streams that match the given selector, using the
+        # index to narrow down candidates where possible
+        candidates = self
+
         if type(selector) is Station:
+           candidates = self._get_candidates('station', selector)
            selected = lambda stream: stream.station==selector
 
         elif type(selector) is Origin:
+           candidates = self._get_candidates('origin', selector)
            selected = lambda stream: stream.origin==selector
 
         elif type(selector) is list:
@@ -97,8 +121,79 @@ class Dataset(list):
             raise ValueError(
                 "`selector` must be a `Station`, `Origin` or list thereof")
 
-        return self.__class__(
-            id=self.id, streams=filter(selected, self))
+        return list(filter(selected, candidates))
+
+
+    def to_array(self, stations, components, dtype=np.float64, out=None):
+        """ Returns trace data as a single NumPy array
+
+        Returns an array of shape `(len(stations), len(components), npts)`, 
+        in which missing traces are filled with zeros.  For each station,
+        the first matching stream is used and, for each component, the first
+        matching trace.
+
+        .. rubric :: Input arguments
+
+        ``stations`` (`list` of `mtuq.Station` objects):
+        Stations in the order they should appear in the array
+
+        ``components`` (`list` of `str`):
+        Components in the order they should appear in the array, for example
+        ``['Z', 'R', 'T']``
+
+        ``dtype`` (`str` or `numpy.dtype`):
+        Floating-point type of the array
+
+        ``out`` (`numpy.ndarray`):
+        Optional existing array to fill, of the shape given above
+
+        .. warning ::
+
+            Requires that all traces have the same number of samples
+
+        """
+        traces = self._select_traces(stations, components)
+
+        npts = 0
+        for row in traces:
+            for trace in row:
+                if trace is not None:
+                    npts = len(trace.data)
+                    break
+            if npts:
+                break
+
+        shape = (len(stations), len(components), npts)
+
+        if out is None:
+            out = np.zeros(shape, dtype=dtype)
+        elif out.shape != shape:
+            raise ValueError("Bad input argument: out")
+        else:
+            out[...] = 0.
+
+        for _i, row in enumerate(traces):
+            for _j, trace in enumerate(row):
+                if trace is not None:
+                    out[_i, _j, :] = trace.data
+
+        return out
+
+
+    def _select_traces(self, stations, components):
+        # returns a nested list of traces, with `None` in place of missing
+        # traces, in which element (i, j) is the first trace of the given
+        # component from the first stream at the given station
+        traces = []
+        for station in stations:
+            streams = self._find(station)
+            lookup = {}
+            if len(streams) > 0:
+                for trace in streams[0]:
+                    lookup.setdefault(trace.stats.component.upper(), trace)
+            traces += [[lookup.get(component.upper())
+                for component in components]]
+        return traces
 
 
     def apply(self, function, *args, **kwargs):
@@ -121,7 +216,7 @@ class Dataset(list):
             processed, id=self.id)
 
 
-    def map(self, function, *sequences):
+    def map(self, function, *sequences, workers=None, chunk_size=None):
         """ Maps function to all streams
 
         Maps a function to all streams in the Dataset. If one or more optional
@@ -129,6 +224,10 @@ class Dataset(list):
         consisting of corresponding items of each sequence, just like the 
         Python built-in ``map``.
 
+        If ``workers`` is given, streams are processed by a pool of this
+        many local processes, in chunks of ``chunk_size`` streams (see
+        `mtuq.util.pool.pool_map`).  The function must then be picklable.
+
         .. warning ::
 
             Although ``map`` returns a new `Dataset`, contents of the
@@ -137,6 +236,13 @@ class Dataset(list):
             `copy` first.
 
         """
+        if workers is not None:
+            processed = pool_map(function, self, sequences,
+                workers=workers, chunk_size=chunk_size)
+
+            return self.__class__(
+                processed, id=self.id)
+
         processed = []
         for _i, stream in enumerate(self):
             args = [sequence[_i] for sequence in sequences]
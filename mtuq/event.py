@@ -61,6 +61,22 @@ class Origin(AttribDict):
         return self.__dict__
 
 
+    def _key(self):
+        # hashable summary of the fields that usually distinguish origins;
+        # equal origins have equal keys, but origins with equal keys can 
+        # still differ in other fields
+        time = self.get('time')
+        if isinstance(time, UTCDateTime):
+            # rounded in the same way as when comparing times
+            time = round(time.ns, time.precision-9)
+        return (
+            time,
+            self.get('latitude'),
+            self.get('longitude'),
+            self.get('depth_in_m'),
+            )
+
+
 class MomentTensor(object):
     """ Moment tensor object
 
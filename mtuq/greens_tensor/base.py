@@ -6,6 +6,8 @@ from copy import copy, deepcopy
 from mtuq.event import Origin
 from mtuq.station import Station
 from mtuq.dataset import Dataset
+from mtuq.util.index import IndexedListMixin
+from mtuq.util.pool import pool_map
 from mtuq.util.signal import check_time_sampling
 from obspy.core import Stream, Trace
 from obspy.geodetics import gps2dist_azimuth
@@ -202,6 +204,42 @@ class GreensTensor(Stream):
         return synthetics
 
 
+    def get_synthetics_array(self, sources, components=None, out=None):
+        """ Generates synthetics for many sources at once
+
+        Returns a NumPy array of shape `(len(sources), len(components), npts)`
+
+        .. rubric :: Input arguments
+
+        ``sources`` (`numpy.ndarray` or `list`):
+        Array of shape `(len(sources), 6)` for moment tensors or 
+        `(len(sources), 3)` for forces, or a list of source objects
+
+        ``components`` (`list`):
+        List containing zero or more of the following components: 
+        ``Z``, ``R``, ``T``. (Defaults to previously set components.)
+
+        ``out`` (`numpy.ndarray`):
+        Optional existing array in which to store the result
+
+        """
+        if components is None:
+            assert(hasattr(self, 'components'))
+        else:
+            self._set_components(components)
+
+        sources = _to_source_array(sources, self._array.shape[1])
+        nc, nr, nt = self._array.shape
+
+        # a single matrix product over all components and time samples
+        array = np.ascontiguousarray(
+            self._array.transpose(1, 0, 2)).reshape(nr, nc*nt)
+
+        out = _check_out(out, (len(sources), nc, nt))
+        np.matmul(sources, array, out=out.reshape(len(sources), nc*nt))
+        return out
+
+
     def convolve(self, wavelet):
         """ Convolves time series with given wavelet
 
@@ -235,13 +273,22 @@ class GreensTensor(Stream):
 
 
 
-class GreensTensorList(list):
+class GreensTensorList(IndexedListMixin, list):
     """ Container for one or more `GreensTensor` objects
+
+    .. note ::
+
+        To make `select` fast for large lists, tensors are indexed by station
+        and origin.  The index is updated by `append` and rebuilt after other
+        list operations, but not if the station or origin attributes of 
+        tensors already in the list are modified in place.
+
     """
 
     def __init__(self, tensors=[], id=None, tags=[]):
         # typically the id is the event name or origin time
         self.id = id
+        self._index = None
 
         for tensor in tensors:
             self.append(tensor)
@@ -261,17 +308,22 @@ class GreensTensorList(list):
 
         super(GreensTensorList, self).append(tensor)
 
+        if getattr(self, '_index', None) is not None:
+            self._index_add(tensor)
+
 
     def select(self, selector):
         """ Selects `GreensTensors` that match the given station or origin
         """
         if type(selector) is Station:
+            candidates = self._get_candidates('station', selector)
             selected = self.__class__(id=self.id, tensors=filter(
-                lambda tensor: tensor.station==selector, self))
+                lambda tensor: tensor.station==selector, candidates))
 
         elif type(selector) is Origin:
+            candidates = self._get_candidates('origin', selector)
             selected = self.__class__(id=self.id, tensors=filter(
-                lambda tensor: tensor.origin==selector, self))
+                lambda tensor: tensor.origin==selector, candidates))
 
         else:
             raise TypeError("Bad selector: %s" % type(selector).__name__)
@@ -317,6 +369,53 @@ class GreensTensorList(list):
             raise ValueError
 
 
+    def get_synthetics_array(self, sources, components=None, out=None):
+        """ Generates synthetics for many sources at all stations at once
+
+        Returns a NumPy array of shape 
+        `(len(sources), len(self), len(components), npts)`
+
+        .. rubric :: Input arguments
+
+        ``sources`` (`numpy.ndarray` or `list`):
+        Array of shape `(len(sources), 6)` for moment tensors or 
+        `(len(sources), 3)` for forces, or a list of source objects
+
+        ``components`` (`list`):
+        List containing zero or more of the following components: 
+        ``Z``, ``R``, ``T``. (Defaults to ``['Z', 'R', 'T']``.)
+
+        ``out`` (`numpy.ndarray`):
+        Optional existing array in which to store the result, which can be
+        reused between calls to avoid repeated allocation
+
+        .. warning ::
+
+            Requires that all tensors have the same number of samples
+
+        """
+        if components is None:
+            components = ['Z', 'R', 'T']
+
+        for tensor in self:
+            tensor._set_components(components)
+
+        # (len(self), len(components), nr, npts)
+        stacked = np.stack([tensor._array for tensor in self])
+        ns, nc, nr, nt = stacked.shape
+
+        sources = _to_source_array(sources, nr)
+
+        # a single matrix product over all stations, components and time 
+        # samples
+        array = np.ascontiguousarray(
+            stacked.transpose(2, 0, 1, 3)).reshape(nr, ns*nc*nt)
+
+        out = _check_out(out, (len(sources), ns, nc, nt))
+        np.matmul(sources, array, out=out.reshape(len(sources), ns*nc*nt))
+        return out
+
+
     # the next three methods can be used to apply signal processing or other
     # operations to all time series in all GreensTensors
     def apply(self, function, *args, **kwargs):
@@ -340,7 +439,7 @@ class GreensTensorList(list):
         return self.__class__(processed)
 
 
-    def map(self, function, *sequences):
+    def map(self, function, *sequences, workers=None, chunk_size=None):
         """ Maps function to all `GreensTensors`
 
         Maps a function to each `GreensTensor` in the list. If one or more 
@@ -348,6 +447,10 @@ class GreensTensorList(list):
         list consisting of the corresponding item of each sequence, similar
         to the Python built-in ``map``.
 
+        If ``workers`` is given, tensors are processed by a pool of this
+        many local processes, in chunks of ``chunk_size`` tensors (see
+        `mtuq.util.pool.pool_map`).  The function must then be picklable.
+
         .. warning ::
 
             Although ``map`` returns a new `GreensTensorList`, contents of the
@@ -356,6 +459,10 @@ class GreensTensorList(list):
             `copy` first.
 
         """
+        if workers is not None:
+            return self.__class__(pool_map(function, self, sequences,
+                workers=workers, chunk_size=chunk_size))
+
         processed = []
         for _i, tensor in enumerate(self):
             args = [sequence[_i] for sequence in sequences]
@@ -496,3 +603,30 @@ class GreensTensorList(list):
            pickle.dump(self, file)
 
 
+def _to_source_array(sources, nr):
+    # converts source objects or arrays to an array of shape (nsources, nr)
+    if isinstance(sources, np.ndarray):
+        array = np.atleast_2d(sources).astype(np.float64, copy=False)
+    else:
+        if not isinstance(sources, (list, tuple)):
+            sources = [sources]
+        array = np.array([source.as_vector() for source in sources],
+            dtype=np.float64, ndmin=2)
+
+    if array.ndim != 2 or array.shape[1] != nr:
+        raise ValueError("Bad input argument: sources")
+
+    return array
+
+
+def _check_out(out, shape):
+    # returns a preallocated output array, after checking that it can hold
+    # the result of the matrix product in place
+    if out is None:
+        return np.empty(shape)
+
+    if out.shape != shape or out.dtype != np.float64 or\
+       not out.flags.c_contiguous:
+        raise ValueError("Bad input argument: out")
+
+    return out
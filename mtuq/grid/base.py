@@ -94,10 +94,23 @@ class Grid(object):
  
     def to_array(self):
         """ Returns the entire set of grid points as a NumPy array
+
+        To bound memory use for very large grids, consider iterating over 
+        ``chunks`` and calling ``to_array`` on each chunk
         """
-        array = np.zeros((self.size, self.ndim))
-        for _i in range(self.size):
-            array[_i, :] = self.get(_i+self.start, callback=None)
+        array = np.empty((self.size, self.ndim))
+
+        # indices are unraveled in batches to limit the size of temporary 
+        # integer arrays
+        batch_size = 2**20
+        for start in range(self.start, self.stop, batch_size):
+            stop = min(start+batch_size, self.stop)
+
+            indices = np.unravel_index(np.arange(start, stop), self.shape)
+            for _k in range(self.ndim):
+                array[start-self.start:stop-self.start, _k] =\
+                    self.coords[_k][indices[_k]]
+
         return array
 
 
@@ -152,13 +165,11 @@ class Grid(object):
         else:
             callback = self.callback
 
-        vals = self.coords
+        indices = np.unravel_index(int(i), self.shape)
         array = np.zeros(self.ndim)
 
-        for _k in range(self.ndim-1, -1, -1):
-            val = vals[_k]
-            array[_k] = val[int(i%len(val))]
-            i/=len(val)
+        for _k in range(self.ndim):
+            array[_k] = self.coords[_k][indices[_k]]
 
         if callback:
             return callback(*array)
@@ -192,6 +203,19 @@ class Grid(object):
         return subsets
 
 
+    def chunks(self, size):
+        """ Iterates over consecutive subsets of at most `size` grid points
+
+        Subsets are generated one at a time, so memory use does not depend
+        on the size of the grid
+        """
+        for start in range(self.start, self.stop, size):
+            stop = min(start+size, self.stop)
+
+            yield Grid(
+                self.dims, self.coords, start, stop, callback=self.callback)
+
+
     def __len__(self):
         return self.size
 
@@ -295,9 +319,9 @@ class UnstructuredGrid(object):
     def to_array(self):
         """ Returns the entire set of grid points as a NumPy array
         """
-        array = np.zeros((self.size, self.ndim))
-        for _i in range(self.size):
-            array[_i, :] = self.get(_i+self.start, callback=None)
+        array = np.empty((self.size, self.ndim))
+        for _k in range(self.ndim):
+            array[:, _k] = self.coords[_k][:self.size]
         return array
 
 
@@ -377,6 +401,23 @@ class UnstructuredGrid(object):
         return subsets
 
 
+    def chunks(self, size):
+        """ Iterates over consecutive subsets of at most `size` grid points
+
+        Subsets are generated one at a time, so memory use does not depend
+        on the size of the grid
+        """
+        for start in range(0, self.size, size):
+            stop = min(start+size, self.size)
+
+            coords = []
+            for array in self.coords:
+                coords += [array[start:stop]]
+
+            yield UnstructuredGrid(self.dims, coords, 
+                self.start+start, self.start+stop, callback=self.callback)
+
+
     def __len__(self):
         return self.size
 
@@ -0,0 +1,149 @@
+
+import numpy as np
+
+from numpy import pi
+from mtuq.grid.base import Grid, UnstructuredGrid
+
+
+#
+# parameter bounds used when refining grids; points falling outside these
+# bounds are moved back onto the boundary, except for periodic parameters,
+# which are wrapped around
+#
+
+BOUNDS = {
+    'rho': (0., np.inf),
+    'v': (-1./3., 1./3.),
+    'w': (-3./8.*pi, 3./8.*pi),
+    'kappa': (0., 360.),
+    'sigma': (-90., 90.),
+    'h': (0., 1.),
+    'F0': (0., np.inf),
+    'phi': (0., 360.),
+    }
+
+PERIODIC = ['kappa', 'phi']
+
+
+def get_spacing(grid):
+    """ Estimates grid spacing along each axis
+
+    Returns a dictionary of axis names and spacings.  Axes along which the
+    grid does not vary are assigned zero spacing.
+
+    For a regularly-spaced `Grid`, the spacing along each axis is the
+    average distance between neighboring coordinate values.  For an
+    `UnstructuredGrid`, spacing is estimated by assuming that points are
+    evenly spread out over the range of each axis.
+    """
+    spacing = {}
+
+    if issubclass(type(grid), Grid):
+        for dim, coords in zip(grid.dims, grid.coords):
+            if len(coords) > 1:
+                spacing[dim] = np.ptp(coords)/(len(coords)-1)
+            else:
+                spacing[dim] = 0.
+
+    elif issubclass(type(grid), UnstructuredGrid):
+        widths = [np.ptp(coords[:grid.size]) for coords in grid.coords]
+        ndim = sum([width > 0. for width in widths])
+        npts = grid.size**(1./max(ndim, 1))
+
+        for dim, width in zip(grid.dims, widths):
+            spacing[dim] = width/npts
+
+    else:
+        raise TypeError
+
+    return spacing
+
+
+def refine(dims, points, spacing, npts_per_axis=3, bounds=None,
+    periodic=None, callback=None):
+    """ Covers the neighborhood of each given point with a finer grid
+
+    .. rubric:: Parameters
+
+    ``dims`` (`list` of `str`):
+    Axis names
+
+    ``points`` (`array`):
+    Array of shape `(npts, len(dims))` containing points to be refined
+
+    ``spacing`` (`dict`):
+    Current spacing along each axis (axes with zero spacing are not refined)
+
+    ``npts_per_axis`` (`int`):
+    Number of points along each axis of each neighborhood.  Neighborhoods
+    span one current grid spacing, so that the new spacing is
+    `spacing/(npts_per_axis-1)`
+
+    ``bounds`` (`dict`):
+    Lower and upper bounds for each axis (defaults to ``BOUNDS``)
+
+    ``periodic`` (`list`):
+    Axes that wrap around (defaults to ``PERIODIC``)
+
+    ``callback`` (`function`):
+    Callback function for the returned grid
+
+
+    .. rubric:: Returns
+
+    An `UnstructuredGrid` containing all neighborhood points, without
+    duplicates, and a dictionary containing the new spacing along each axis
+    """
+    assert npts_per_axis >= 2,\
+        ValueError("Bad input argument: npts_per_axis")
+
+    if bounds is None:
+        bounds = BOUNDS
+
+    if periodic is None:
+        periodic = PERIODIC
+
+    points = np.atleast_2d(points)
+    ndim = len(dims)
+
+    # offsets relative to each point along each axis
+    offsets = []
+    new_spacing = {}
+    for dim in dims:
+        if spacing[dim] > 0.:
+            offsets += [np.linspace(-0.5, 0.5, npts_per_axis)*spacing[dim]]
+            new_spacing[dim] = spacing[dim]/(npts_per_axis-1)
+        else:
+            offsets += [np.zeros(1)]
+            new_spacing[dim] = 0.
+
+    # (noffsets, ndim)
+    offsets = np.column_stack([array.ravel() for array in
+        np.meshgrid(*offsets, indexing='ij')])
+
+    # (npts*noffsets, ndim)
+    array = (points[:, np.newaxis, :] + offsets[np.newaxis, :, :]).reshape(
+        -1, ndim)
+
+    for _k, dim in enumerate(dims):
+        if dim not in bounds:
+            continue
+
+        lower, upper = bounds[dim]
+        if dim in periodic:
+            array[:, _k] = lower + np.mod(array[:, _k]-lower, upper-lower)
+        else:
+            array[:, _k] = np.clip(array[:, _k], lower, upper)
+
+    # neighborhoods of nearby points may overlap, so we remove points that
+    # coincide to within a small fraction of the new spacing
+    scale = np.array([new_spacing[dim] or 1. for dim in dims])
+    keys = np.round(array/scale*1.e6)
+    _, indices = np.unique(keys, axis=0, return_index=True)
+    array = array[np.sort(indices)]
+
+    return UnstructuredGrid(
+        dims=tuple(dims),
+        coords=[array[:, _k] for _k in range(ndim)],
+        callback=callback), new_spacing
+
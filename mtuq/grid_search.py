@@ -6,10 +6,16 @@ import pandas
 import xarray
 
 from collections.abc import Iterable
+from copy import copy
+from math import ceil
 from mtuq.event import Origin
 from mtuq.grid import DataFrame, DataArray, Grid, UnstructuredGrid
+from mtuq.grid.refine import get_spacing, refine
+from mtuq.misfit.waveform import Misfit
+from mtuq.misfit.waveform.level2 import Cache
 from mtuq.util import gather2, iterable, timer, remove_list, warn,\
-    ProgressCallback, dataarray_idxmin, dataarray_idxmax
+    Null, ProgressCallback, dataarray_idxmin, dataarray_idxmax,\
+    free_shared_arrays
 from os.path import splitext
 from xarray.core.formatting import unindexed_dims_repr
 
@@ -17,8 +23,16 @@ from xarray.core.formatting import unindexed_dims_repr
 xarray.set_options(keep_attrs=True)
 
 
+# message tags used by the dynamic scheduler
+_TAG_TASK = 1
+_TAG_RESULT = 2
+_TAG_STOP = 3
+
+
 def grid_search(data, greens, misfit, origins, sources, 
-    msg_interval=25, timed=True, verbose=1, gather=True):
+    msg_interval=25, timed=True, verbose=1, gather=True, chunk_size=None,
+    dtype='float64', keep_best=None, marginals=None, scheduler='static',
+    fuse_origins=False, shared_memory=False):
 
     """ Evaluates misfit over grids
 
@@ -31,6 +45,10 @@ def grid_search(data, greens, misfit, origins, sources,
     containing misfit values and corresponding grid points. Otherwise, 
     an `MTUQDataFrame` is returned.
 
+    If ``keep_best`` or ``marginals`` is given, misfit values are instead
+    reduced as they are computed, and only the reduced results are returned
+    (see below).
+
 
     .. rubric :: Input arguments
 
@@ -69,6 +87,59 @@ def grid_search(data, greens, misfit, origins, sources,
     (ignored outside MPI environment)
 
 
+    ``chunk_size`` (`int`):
+    If given, sources are generated and evaluated in blocks of at most this
+    many grid points, so that memory use is bounded by the block size 
+    rather than the size of the grid
+
+
+    ``dtype`` (`str`):
+    Floating-point type used to store misfit values (``'float64'`` or 
+    ``'float32'``)
+
+
+    ``keep_best`` (`int`):
+    If given, only the `keep_best` lowest misfit values are retained and 
+    returned as an `MTUQDataFrame`, sorted from best to worst
+
+
+    ``marginals`` (`list` of `str`):
+    If given, only the minimum misfit over all other dimensions is retained 
+    for each point on the listed dimensions (for example, ``['v', 'w']``),
+    and returned as an `MTUQDataArray`. Allowed dimensions are 
+    ``'origin_idx'`` and any of ``sources.dims``. Requires that `sources` 
+    is a regularly-spaced `Grid`
+
+
+    ``scheduler`` (`str`):
+    How work is divided among MPI processes. With ``'static'``, each 
+    process is given an equal part of the source grid in advance.  With 
+    ``'dynamic'``, process 0 hands out blocks of ``chunk_size`` sources at 
+    one origin at a time to the other processes whenever they become idle
+    (ignored outside MPI environment)
+
+
+    ``fuse_origins`` (`bool`):
+    If `True`, misfit is evaluated for all origins at once by calling
+    `misfit(data, greens, sources, origins=origins)`, rather than once per 
+    origin.  Requires a misfit function that accepts an ``origins`` keyword
+    argument, such as `mtuq.Misfit`
+
+
+    ``shared_memory`` (`bool`):
+    If `True`, cross-correlation arrays are computed by one MPI process per
+    node and placed in MPI-3 shared memory, rather than computed by every 
+    process.  Requires an ``optimization_level=2`` `mtuq.Misfit`
+    (ignored outside MPI environment)
+
+
+    .. note:
+
+      With ``chunk_size``, misfit is evaluated once per block.  To avoid 
+      repeating the data and Green's function setup for every block, use
+      ``Misfit(cache=True)``.
+
+
     .. note:
 
       If invoked from an MPI environment, the grid is partitioned between
@@ -76,6 +147,38 @@ def grid_search(data, greens, misfit, origins, sources,
       partition. If not invoked from an MPI environment, `grid_search`
       reduces to ``_grid_search_serial``.
 
+    .. note:
+
+      With ``keep_best`` or ``marginals``, memory use and MPI communication 
+      depend only on `keep_best` and on the size of the marginal grid, 
+      rather than on the size of the full grid.  If both are given, a 
+      `(best, marginals)` tuple is returned.
+
+    .. note:
+
+      The dynamic scheduler balances load when misfit evaluation costs vary
+      between origins or processes, and allows more processes than grid
+      points.  Process 0 only coordinates, and always receives all results
+      (``gather`` is ignored).  If ``chunk_size`` is not given, a block size
+      is chosen so that there are several blocks per process.
+
+    .. note:
+
+      With ``fuse_origins``, an ``optimization_level=2`` misfit function 
+      evaluates each source at all origins in a single pass, avoiding 
+      per-origin Green's function selection and kernel calls.  This is 
+      especially effective for depth or centroid searches over many origins
+      with small source grids. Cross-correlation arrays for all origins are
+      then held in memory at once, which can be limited using ``chunk_size``
+      only along the source dimension.
+
+    .. note:
+
+      With ``shared_memory``, per-node memory use for cross-correlation 
+      arrays no longer grows with the number of processes per node, which
+      allows larger station sets.  Arrays for all origins are computed
+      before the search begins and freed once it ends.
+
     """
 
     # check input arguments
@@ -86,14 +189,52 @@ def grid_search(data, greens, misfit, origins, sources,
     if type(sources) not in (Grid, UnstructuredGrid):
         raise TypeError
 
+    if chunk_size is not None:
+        assert chunk_size >= 1,\
+            ValueError("Bad input argument: chunk_size")
+
+    assert dtype in ['float32', 'float64'],\
+        ValueError("Bad input argument: dtype")
+
+    assert scheduler in ['static', 'dynamic'],\
+        ValueError("Bad input argument: scheduler")
+
+    if keep_best is not None:
+        assert keep_best >= 1,\
+            ValueError("Bad input argument: keep_best")
+
+    if marginals is not None:
+        if type(sources) is not Grid:
+            raise TypeError("Marginals require a regularly-spaced Grid")
+
+        marginals = list(iterable(marginals))
+        for dim in marginals:
+            assert dim=='origin_idx' or dim in sources.dims,\
+                ValueError("Bad input argument: marginals")
+
     if _is_mpi_env():
         from mpi4py import MPI
         comm = MPI.COMM_WORLD
         iproc, nproc = comm.rank, comm.size
 
-        if nproc > sources.size:
+        if scheduler=='static' and nproc > sources.size:
             raise Exception('Number of CPU cores exceeds size of grid')
 
+        if shared_memory:
+            # arrays are computed before the search begins and freed once it
+            # ends
+            misfit, shared = _precompute_shared(
+                comm, data, greens, misfit, origins, fuse_origins)
+
+            results = grid_search(data, greens, misfit, origins, sources,
+                msg_interval=msg_interval, timed=timed, verbose=verbose,
+                gather=gather, chunk_size=chunk_size, dtype=dtype,
+                keep_best=keep_best, marginals=marginals,
+                scheduler=scheduler, fuse_origins=fuse_origins)
+
+            _free_shared(misfit, shared)
+            return results
+
 
     # print debugging information
     if verbose>0 and _is_mpi_env() and iproc==0:
@@ -109,7 +250,23 @@ def grid_search(data, greens, misfit, origins, sources,
             (len(origins)*len(sources)))
 
 
-    if _is_mpi_env():
+    if _is_mpi_env() and scheduler=='dynamic':
+        #
+        # hand out parts of the grid search to MPI processes on demand
+        #
+        values = _grid_search_dynamic(
+            data, greens, misfit, origins, sources, timed=(timed and iproc==0),
+            msg_interval=msg_interval, chunk_size=chunk_size, dtype=dtype,
+            keep_best=keep_best, marginals=marginals,
+            fuse_origins=fuse_origins)
+
+        if iproc != 0:
+            return
+
+        # results have already been collected by process 0
+        gather = False
+
+    elif _is_mpi_env():
         #
         # divide up the grid search over MPI processes
         #
@@ -124,17 +281,27 @@ def grid_search(data, greens, misfit, origins, sources,
             msg_interval = 0
 
 
-    #
-    # evaluate misfit over grids
-    #
-    values = _grid_search_serial(
-        data, greens, misfit, origins, sources, timed=timed,
-        msg_interval=msg_interval)
+    if not (_is_mpi_env() and scheduler=='dynamic'):
+        #
+        # evaluate misfit over grids
+        #
+        values = _grid_search_serial(
+            data, greens, misfit, origins, sources, timed=timed,
+            msg_interval=msg_interval, chunk_size=chunk_size, dtype=dtype,
+            keep_best=keep_best, marginals=marginals,
+            fuse_origins=fuse_origins)
 
 
     #
     # collect results
     #
+    if isinstance(values, _Reduction):
+        if _is_mpi_env() and gather:
+            sources = _all
+
+        return _collect_reduction(values, origins, sources, keep_best,
+            marginals, gather)
+
     if _is_mpi_env() and gather:
         # gather results from MPI processes
         values = gather2(comm, values)
@@ -152,27 +319,451 @@ def grid_search(data, greens, misfit, origins, sources,
 
 
 
+def grid_search_adaptive(data, greens, misfit, origins, sources, levels=3, 
+    keep_best=10, npts_per_axis=3, spacing=None, bounds=None, verbose=1,
+    **kwargs):
+
+    """ Evaluates misfit over successively refined grids
+
+    .. rubric :: Usage
+
+    Carries out a coarse grid search over `sources`, then repeatedly covers
+    the neighborhoods of the lowest-misfit sources with finer grids and 
+    searches again.  Compared with a single search over a uniformly fine 
+    grid, far fewer misfit evaluations are usually needed to reach the same
+    final resolution.
+
+    Returns an `MTUQDataFrame` containing misfit values at all grid points
+    evaluated over all levels, each of which is evaluated only once.
+
+
+    .. rubric :: Input arguments
+
+    ``data``, ``greens``, ``misfit``, ``origins``:
+    Same as for `grid_search`
+
+
+    ``sources`` (`mtuq.Grid` or `mtuq.UnstructuredGrid`):
+    Coarse grid with which the search begins
+
+
+    ``levels`` (`int`):
+    Number of refinement levels following the coarse search
+
+
+    ``keep_best`` (`int`):
+    Number of lowest-misfit sources (over all levels so far) refined at each
+    level
+
+
+    ``npts_per_axis`` (`int`):
+    Number of points along each axis of each refined neighborhood.  With 
+    the default value, grid spacing is halved at each level
+
+
+    ``spacing`` (`dict`):
+    Spacing of the coarse grid along each axis (by default, estimated using
+    `mtuq.grid.refine.get_spacing`).  Axes with zero spacing are not refined
+
+
+    ``bounds`` (`dict`):
+    Parameter bounds (defaults to `mtuq.grid.refine.BOUNDS`)
+
+
+    Any other keyword arguments are passed to `grid_search`.
+
+
+    .. note:
+
+      Origins are not refined; at each level, all origins are searched.
+      Cross-correlations computed by ``level2`` misfit functions are reused
+      between levels.  With ``shared_memory=True``, they are placed in
+      shared memory once, before the first level, and freed after the last.
+
+    """
+    origins = iterable(origins)
+
+    if type(sources) not in (Grid, UnstructuredGrid):
+        raise TypeError
+
+    assert levels >= 0,\
+        ValueError("Bad input argument: levels")
+
+    assert keep_best >= 1,\
+        ValueError("Bad input argument: keep_best")
+
+    if isinstance(misfit, Misfit) and misfit._cache is None:
+        # data and Green's functions are the same at every level, so
+        # cross-correlations only need to be computed once
+        misfit = copy(misfit)
+        misfit._cache = Cache()
+
+    shared = None
+    if kwargs.pop('shared_memory', False) and _is_mpi_env():
+        # shared arrays are computed once and reused at every level
+        from mpi4py import MPI
+        misfit, shared = _precompute_shared(MPI.COMM_WORLD, data, greens,
+            misfit, origins, kwargs.get('fuse_origins', False))
+
+    if spacing is None:
+        spacing = get_spacing(sources)
+
+    dims = tuple(sources.dims)
+    callback = sources.callback
+
+    # begin with the coarse grid
+    array = sources.to_array()
+
+    # points evaluated so far, known to all processes
+    evaluated = []
+
+    arrays = []
+    values = []
+    for level in range(levels+1):
+
+        grid = UnstructuredGrid(
+            dims=dims,
+            coords=[array[:, _k] for _k in range(len(dims))],
+            callback=callback)
+
+        if verbose>0 and _is_rank0():
+            print('  Refinement level %d of %d: %d grid points\n' %
+                (level, levels, len(grid)))
+
+        df = grid_search(
+            data, greens, misfit, origins, grid, verbose=0, **kwargs)
+
+        evaluated += [array]
+
+        if _is_rank0():
+            # misfit values of shape `(len(grid), len(origins))`
+            _values = np.reshape(df[0].values, (len(origins), len(grid))).T
+            arrays += [array]
+            values += [_values]
+
+            # sources with the lowest misfit at any origin, over all levels
+            # so far (refined grids exclude points already evaluated,
+            # including the points about which they were refined)
+            _values = np.concatenate(values, axis=0)
+            best = np.argsort(_values.min(axis=1), kind='stable')
+            best = best[:keep_best]
+            points = np.concatenate(arrays, axis=0)[best]
+        else:
+            points = None
+
+        if _is_mpi_env():
+            from mpi4py import MPI
+            points = MPI.COMM_WORLD.bcast(points, root=0)
+
+        if level < levels:
+            grid, spacing = refine(dims, points, spacing, 
+                npts_per_axis=npts_per_axis, bounds=bounds, callback=callback)
+            array = _exclude(grid.to_array(), evaluated, dims, spacing)
+
+            if len(array)==0:
+                # nothing left to refine
+                break
+
+    _free_shared(misfit, shared)
+
+    if not _is_rank0():
+        return
+
+    # combine all levels
+    array = np.concatenate(arrays, axis=0)
+    grid = UnstructuredGrid(
+        dims=dims,
+        coords=[array[:, _k] for _k in range(len(dims))],
+        callback=callback)
+
+    return _to_dataframe(origins, grid, np.concatenate(values, axis=0))
+
+
+
+def _exclude(array, evaluated, dims, spacing):
+    # removes points that coincide with points already evaluated, to within
+    # a small fraction of the grid spacing (as in `mtuq.grid.refine.refine`)
+    scale = np.array([spacing[dim] or 1. for dim in dims])
+
+    keys = np.round(np.concatenate(evaluated, axis=0)/scale*1.e6)
+    keys = set(map(tuple, keys))
+
+    keep = [tuple(key) not in keys for key in np.round(array/scale*1.e6)]
+    return array[np.array(keep, dtype=bool)]
+
+
 @timer
 def _grid_search_serial(data, greens, misfit, origins, sources, 
-    timed=True, msg_interval=25):
+    timed=True, msg_interval=25, chunk_size=None, dtype='float64',
+    keep_best=None, marginals=None, fuse_origins=False):
     """ Evaluates misfit over origin and source grids 
     (serial implementation)
     """
     ni = len(origins)
     nj = len(sources)
 
-    values = []
+    if chunk_size is None:
+        chunk_size = nj
+
+    if keep_best or marginals:
+        # misfit values are reduced as soon as they are computed
+        values = _Reduction(origins, sources, keep_best, marginals, dtype)
+    else:
+        # only misfit values are retained, so memory use depends on grid size
+        # only through this array
+        values = np.empty((nj, ni), dtype=dtype)
+
+    if fuse_origins:
+        for _j, chunk in enumerate(sources.chunks(chunk_size)):
+            start = _j*chunk_size
+            stop = start + len(chunk)
+
+            msg_handle = ProgressCallback(
+                start=start*ni, stop=ni*nj, percent=msg_interval)
+
+            # evaluate misfit function for all origins at once
+            chunk_values = misfit(
+                data, greens, chunk, msg_handle, origins=origins)
+
+            if isinstance(values, _Reduction):
+                for _i in range(ni):
+                    values.update(_i, chunk.start, chunk_values[:, _i])
+            else:
+                values[start:stop, :] = chunk_values
+
+        return values
+
     for _i, origin in enumerate(origins):
+        greens_origin = greens.select(origin)
+
+        for _j, chunk in enumerate(sources.chunks(chunk_size)):
+            start = _j*chunk_size
+            stop = start + len(chunk)
+
+            msg_handle = ProgressCallback(
+                start=_i*nj+start, stop=ni*nj, percent=msg_interval)
+
+            # evaluate misfit function
+            chunk_values = misfit(
+                data, greens_origin, chunk, msg_handle)[:, 0]
+
+            if isinstance(values, _Reduction):
+                values.update(_i, chunk.start, chunk_values)
+            else:
+                values[start:stop, _i] = chunk_values
+
+    # returns NumPy array of shape `(len(sources), len(origins))` or, in 
+    # reduction mode, a `_Reduction`
+    return values
+
+
+
+@timer
+def _grid_search_dynamic(data, greens, misfit, origins, sources,
+    timed=True, msg_interval=25, chunk_size=None, dtype='float64',
+    keep_best=None, marginals=None, fuse_origins=False):
+    """ Evaluates misfit over origin and source grids 
+    (MPI implementation with dynamic load balancing)
+
+    Process 0 hands out tasks, each consisting of one block of sources at
+    one origin (or, with ``fuse_origins``, at all origins), to the other 
+    processes as they become idle, and collects the results
+    """
+    from mpi4py import MPI
+    comm = MPI.COMM_WORLD
+    iproc, nproc = comm.rank, comm.size
+
+    # randomly-generated grids differ between processes, so all processes
+    # use the grid from process 0
+    sources = comm.bcast(sources, root=0)
+
+    ni = len(origins)
+    nj = len(sources)
+
+    # number of origins handled by each task
+    nfused = ni if fuse_origins else 1
+
+    if chunk_size is None:
+        # several tasks per worker helps to even out load
+        chunk_size = max(1, int(ceil(ni*nj/(4.*nfused*(nproc-1)))))
+        chunk_size = min(chunk_size, nj)
+
+    chunks = list(sources.chunks(chunk_size))
+
+    if fuse_origins:
+        # an origin index of None stands for all origins
+        tasks = [(None, _j) for _j in range(len(chunks))]
+    else:
+        # tasks are ordered by origin, so that each worker tends to stay with
+        # the same origin (and reuse any cached cross-correlations)
+        tasks = [(_i, _j) for _i in range(ni) for _j in range(len(chunks))]
+
+    status = MPI.Status()
+
+    if iproc==0:
+        if keep_best or marginals:
+            values = _Reduction(origins, sources, keep_best, marginals, dtype)
+        else:
+            values = np.empty((nj, ni), dtype=dtype)
 
         msg_handle = ProgressCallback(
-            start=_i*nj, stop=ni*nj, percent=msg_interval)
+            start=0, stop=len(tasks), percent=msg_interval)
+
+        next_task = 0
+        nstopped = 0
+        while nstopped < nproc-1:
+            # wait for any worker to ask for work, possibly returning the
+            # results of its previous task
+            result = comm.recv(
+                source=MPI.ANY_SOURCE, tag=_TAG_RESULT, status=status)
+            worker = status.Get_source()
+
+            if result is not None:
+                _i, _j, chunk_values = result
+                chunk = chunks[_j]
+                start = _j*chunk_size
+
+                if _i is None and isinstance(values, _Reduction):
+                    for _k in range(ni):
+                        values.update(_k, chunk.start, chunk_values[:, _k])
+                elif _i is None:
+                    values[start:start+len(chunk), :] = chunk_values
+                elif isinstance(values, _Reduction):
+                    values.update(_i, chunk.start, chunk_values)
+                else:
+                    values[start:start+len(chunk), _i] = chunk_values
+
+                msg_handle()
+
+            if next_task < len(tasks):
+                comm.send(tasks[next_task], dest=worker, tag=_TAG_TASK)
+                next_task += 1
+            else:
+                comm.send(None, dest=worker, tag=_TAG_STOP)
+                nstopped += 1
+
+    else:
+        selected = None
+        result = None
+        while True:
+            comm.send(result, dest=0, tag=_TAG_RESULT)
+
+            task = comm.recv(source=0, tag=MPI.ANY_TAG, status=status)
+            if status.Get_tag()==_TAG_STOP:
+                break
+
+            _i, _j = task
+            if _i is None:
+                # evaluate misfit function for all origins at once
+                result = (_i, _j, misfit(
+                    data, greens, chunks[_j], Null(), origins=origins))
+                continue
+
+            if selected != _i:
+                greens_origin = greens.select(origins[_i])
+                selected = _i
+
+            # evaluate misfit function
+            result = (_i, _j, misfit(
+                data, greens_origin, chunks[_j], Null())[:, 0])
+
+        values = None
+
+    # keeps messages from any subsequent grid search from being mistaken for
+    # messages from this one
+    comm.Barrier()
+
+    return values
+
+
+
+class _Reduction(object):
+    """ Running reduction of grid search results
+
+    Keeps the lowest misfit values found so far together with their origin
+    and source indices, and the running minimum over all dimensions not 
+    listed in ``marginals``
+    """
+    def __init__(self, origins, sources, keep_best=None, marginals=None,
+        dtype='float64'):
+
+        self.keep_best = keep_best
+        self.marginals = marginals
+
+        if keep_best:
+            self.best_values = np.empty(0, dtype=dtype)
+            self.best_origin_idx = np.empty(0, dtype=int)
+            self.best_source_idx = np.empty(0, dtype=int)
+
+        if marginals:
+            # full grid shape, with origins as the last (fast) axis
+            self.dims = list(sources.dims) + ['origin_idx']
+            self.shape = tuple(sources.shape) + (len(origins),)
+
+            self.axes = [self.dims.index(dim) for dim in marginals]
+            self.marginal_shape = tuple([self.shape[_k] for _k in self.axes])
+
+            self.marginal_values = np.full(
+                self.marginal_shape, np.inf, dtype=dtype)
+
+
+    def update(self, origin_idx, start, values):
+        """ Incorporates misfit values for consecutive sources beginning at
+        index `start`, all at the given origin
+        """
+        source_idx = start + np.arange(len(values))
+
+        if self.keep_best:
+            self._update_best(
+                values,
+                np.full(len(values), origin_idx, dtype=int), 
+                source_idx)
 
-        # evaluate misfit function
-        values += [misfit(
-            data, greens.select(origin), sources, msg_handle)]
+        if self.marginals:
+            indices = np.unravel_index(source_idx, self.shape[:-1]) +\
+                (np.full(len(values), origin_idx, dtype=int),)
 
-    # returns NumPy array of shape `(len(sources), len(origins))` 
-    return np.concatenate(values, axis=1)
+            marginal_idx = np.ravel_multi_index(
+                [indices[_k] for _k in self.axes], self.marginal_shape)
+
+            np.minimum.at(self.marginal_values.reshape(-1), marginal_idx,
+                values)
+
+
+    def merge(self, other):
+        """ Combines with a reduction carried out over a different part of
+        the grid
+        """
+        if self.keep_best:
+            self._update_best(
+                other.best_values, 
+                other.best_origin_idx, 
+                other.best_source_idx)
+
+        if self.marginals:
+            np.minimum(self.marginal_values, other.marginal_values,
+                out=self.marginal_values)
+
+
+    def _update_best(self, values, origin_idx, source_idx):
+        values = np.concatenate([self.best_values, values])
+        origin_idx = np.concatenate([self.best_origin_idx, origin_idx])
+        source_idx = np.concatenate([self.best_source_idx, source_idx])
+
+        if len(values) > self.keep_best:
+            indices = np.argpartition(values, self.keep_best-1)
+            indices = indices[:self.keep_best]
+        else:
+            indices = np.arange(len(values))
+
+        # sort from best to worst, breaking ties by grid position
+        order = np.lexsort((
+            source_idx[indices], origin_idx[indices], values[indices]))
+        indices = indices[order]
+
+        self.best_values = values[indices].astype(self.best_values.dtype)
+        self.best_origin_idx = origin_idx[indices]
+        self.best_source_idx = source_idx[indices]
 
 
 
@@ -274,6 +865,44 @@ class MTUQDataFrame(pandas.DataFrame):
 # utility functions
 #
 
+def _precompute_shared(comm, data, greens, misfit, origins, fuse_origins):
+    # places cross-correlation arrays for all origins in shared memory, 
+    # returning a misfit function whose cache holds them, together with the
+    # arrays to be freed afterwards by `_free_shared`
+    if not isinstance(misfit, Misfit) or misfit.optimization_level != 2:
+        warn("Shared memory requires an optimization_level=2 Misfit "
+             "(ignoring shared_memory)")
+        return misfit, None
+
+    # shared arrays must not be evicted, or they would be recomputed by 
+    # each process; the cache is discarded together with the copied misfit
+    # function once the search ends
+    misfit = copy(misfit)
+    misfit._cache = Cache(max_bytes=np.inf)
+
+    # misfit is later evaluated with exactly these arguments, so cache 
+    # keys match
+    shared = []
+    if fuse_origins:
+        shared += misfit.precompute_shared(data, greens, comm,
+            origins=origins)[:-1]
+    else:
+        for origin in origins:
+            shared += misfit.precompute_shared(data, greens.select(origin),
+                comm)[:-1]
+
+    return misfit, shared
+
+
+def _free_shared(misfit, shared):
+    # collective; releases arrays allocated by `_precompute_shared`
+    if shared is None:
+        return
+
+    misfit.clear_cache()
+    free_shared_arrays(shared)
+
+
 def _is_mpi_env():
     try:
         import mpi4py
@@ -291,6 +920,14 @@ def _is_mpi_env():
         return False
 
 
+def _is_rank0():
+    if _is_mpi_env():
+        from mpi4py import MPI
+        return MPI.COMM_WORLD.rank==0
+    else:
+        return True
+
+
 def _to_dataarray(origins, sources, values):
     """ Converts grid_search inputs to DataArray
     """
@@ -336,12 +973,87 @@ def _to_dataframe(origins, sources, values, index_type=2):
 
     # construct DataFrame
     data = {dims[_i]: coords[_i] for _i in range(len(dims))}
-    data.update({0: values.flatten()})
+    data.update({0: values.flatten(order='F')})
+    df = MTUQDataFrame(data=data)
+    df = df.set_index(list(dims))
+    return df
+
+
+def _collect_reduction(reduction, origins, sources, keep_best, marginals,
+    gather=True):
+    """ Combines reductions from MPI processes and converts to DataFrame
+    and/or DataArray
+    """
+    if _is_mpi_env() and gather:
+        from mpi4py import MPI
+        comm = MPI.COMM_WORLD
+
+        # only the reduced results are communicated
+        reductions = comm.gather(reduction, root=0)
+
+        if comm.rank!=0:
+            return
+
+        for other in reductions[1:]:
+            reductions[0].merge(other)
+        reduction = reductions[0]
+
+    results = []
+
+    if keep_best:
+        results += [_best_to_dataframe(origins, sources, reduction)]
+
+    if marginals:
+        results += [_marginals_to_dataarray(origins, sources, reduction)]
+
+    if len(results)==1:
+        return results[0]
+    else:
+        return tuple(results)
+
+
+def _best_to_dataframe(origins, sources, reduction):
+    """ Converts lowest misfit values to DataFrame
+    """
+    origin_idx = reduction.best_origin_idx
+    source_idx = reduction.best_source_idx
+
+    # coordinates of the corresponding grid points
+    if issubclass(type(sources), Grid):
+        indices = np.unravel_index(source_idx, sources.shape)
+        source_coords = [sources.coords[_k][indices[_k]]
+            for _k in range(sources.ndim)]
+    else:
+        source_coords = [sources.coords[_k][source_idx-sources.start]
+            for _k in range(sources.ndim)]
+
+    coords = [origin_idx, source_idx] + source_coords
+    dims = ('origin_idx', 'source_idx') + tuple(sources.dims)
+
+    data = {dims[_i]: coords[_i] for _i in range(len(dims))}
+    data.update({0: reduction.best_values})
     df = MTUQDataFrame(data=data)
     df = df.set_index(list(dims))
     return df
 
 
+def _marginals_to_dataarray(origins, sources, reduction):
+    """ Converts minimum misfit values over marginal dimensions to DataArray
+    """
+    coords = []
+    for dim in reduction.marginals:
+        if dim=='origin_idx':
+            coords += [np.arange(len(origins))]
+        else:
+            coords += [sources.coords[list(sources.dims).index(dim)]]
+
+    return MTUQDataArray(**{
+        'data': reduction.marginal_values,
+        'coords': coords,
+        'dims': tuple(reduction.marginals),
+         })
+
+
 #
 # I/O functions
 #
@@ -44,6 +44,8 @@ class Client(ClientBase):
 
     """
 
+    _settings = ['model', 'kernelwidth', 'include_mt', 'include_force']
+
     def __init__(self, path_or_url='', model='', kernelwidth=12,
         include_mt=True, include_force=False):
 
@@ -60,7 +62,8 @@ class Client(ClientBase):
         self.include_force = include_force
 
 
-    def get_greens_tensors(self, stations=[], origins=[], verbose=False):
+    def get_greens_tensors(self, stations=[], origins=[], verbose=False,
+        workers=None, pool='thread'):
         """ Reads Green's tensors from database
 
         Returns a ``GreensTensorList`` in which each element corresponds to a
@@ -73,8 +76,13 @@ class Client(ClientBase):
         ``origins`` (`list` of `mtuq.Origin` objects)
 
         ``verbose`` (`bool`)
+
+        ``workers`` (`int`)
+
+        ``pool`` (`str`)
         """
-        return super(Client, self).get_greens_tensors(stations, origins, verbose)
+        return super(Client, self).get_greens_tensors(
+            stations, origins, verbose, workers, pool)
 
 
     def _get_greens_tensor(self, station=None, origin=None):
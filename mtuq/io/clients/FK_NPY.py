@@ -0,0 +1,250 @@
+
+import obspy
+import numpy as np
+
+from glob import glob
+from os.path import basename, exists, isdir, splitext
+from mtuq.io.clients.FK_SAC import Client as ClientFK, EXTENSIONS
+from obspy.core import Trace
+
+
+class Client(ClientFK):
+    """  FK archive client
+
+    .. rubric:: Usage
+
+    To instantiate a database client, supply the path to an FK archive
+    created by `convert`:
+
+    .. code::
+
+        from mtuq.io.clients.FK_NPY import Client
+        db = Client(path_or_url)
+
+    Then the database client can be used to generate GreensTensors:
+
+    .. code::
+
+        greens_tensors = db.get_greens_tensors(stations, origin)
+
+
+    .. note::
+
+      An FK archive holds all time series from an FK directory tree in a
+      single NumPy ``.npy`` file, indexed by event depth and distance.  The
+      archive is memory-mapped rather than read, so that only the time series
+      actually needed are loaded, and processes running on the same node
+      share them through the operating system page cache.  Opening an
+      archive requires no filesystem metadata operations other than opening
+      one file, which helps on parallel filesystems when many MPI processes
+      start at once.
+
+    .. note::
+
+      Green's tensors are identical to those returned by the FK directory
+      tree client, except that SAC headers are not retained. The ``lookup``
+      argument has the same meaning as for `mtuq.io.clients.FK_SAC.Client`.
+
+    """
+    def __init__(self, path_or_url=None, model=None,
+        include_mt=True, include_force=False, lookup='ceil'):
+
+        if not path_or_url:
+            raise Exception
+
+        if not exists(path_or_url):
+            raise Exception
+
+        if not model:
+            model = splitext(basename(path_or_url))[0]
+
+        super(Client, self).__init__(path_or_url, model=model,
+            include_mt=include_mt, include_force=include_force,
+            preload=True, lookup=lookup)
+
+        self._archive = None
+
+
+    def _get_store(self, dep):
+        """ Returns available distances for the given depth
+        """
+        with self._lock:
+            if dep not in self._stores:
+                archive = self._get_archive()
+
+                # records are sorted by depth and distance, so a binary
+                # search avoids touching the whole archive
+                start = _search(archive, int(dep), 'left')
+                stop = _search(archive, int(dep), 'right')
+                indices = np.arange(start, stop)
+
+                if len(indices)==0:
+                    raise Exception("No Green's functions found: %s (depth %s)"
+                        % (self.path, dep))
+
+                distances = np.array(archive['distance'][start:stop])
+
+                self._stores[dep] = {
+                    'distances': distances,
+                    'indices': dict(zip(distances.tolist(), indices.tolist())),
+                    }
+
+            return self._stores[dep]
+
+
+    def _get_sac_traces(self, dep, dst):
+        """ Returns traces for the given depth and distance, in the order
+        given by ``EXTENSIONS``
+        """
+        store = self._get_store(dep)
+        if dst not in store['indices']:
+            raise Exception("Missing Green's functions: %s (depth %s, "
+                "distance %s)" % (self.path, dep, dst))
+
+        record = self._get_archive()[store['indices'][dst]]
+
+        traces = []
+        for _i in range(len(EXTENSIONS)):
+            npts = int(record['npts'][_i])
+            traces += [Trace(np.array(record['data'][_i, :npts]), {
+                'starttime': float(record['starttime'][_i]),
+                'delta': float(record['delta'][_i]),
+                })]
+
+        return traces
+
+
+    def _get_archive(self):
+        if self._archive is None:
+            self._archive = np.load(self.path, mmap_mode='r')
+        return self._archive
+
+
+    def __getstate__(self):
+        # memory maps are reopened rather than pickled
+        state = super(Client, self).__getstate__()
+        state['_archive'] = None
+        return state
+
+
+
+def _search(archive, depth, side):
+    # index of the first record with depth greater than or equal to (left)
+    # or greater than (right) the given depth
+    lower, upper = 0, len(archive)
+    while lower < upper:
+        middle = (lower+upper)//2
+        value = int(archive[middle]['depth'])
+        if value < depth or (side=='right' and value==depth):
+            lower = middle+1
+        else:
+            upper = middle
+    return lower
+
+
+def convert(path, filename, model=None, dtype='float32', verbose=False):
+    """ Packs an FK directory tree into a single archive file
+
+    Reads all Green's functions from the FK directory tree at `path` and
+    writes them to `filename`, which can then be opened using
+    ``open_db(filename, format='FK_NPY')``
+
+    .. rubric :: Input arguments
+
+    ``path`` (`str`):
+    FK directory tree, containing subdirectories named `<model>_<depth>`
+
+    ``filename`` (`str`):
+    Output archive (by convention, ending in ``.npy``)
+
+    ``model`` (`str`):
+    Model name (defaults to the name of the directory tree)
+
+    ``dtype`` (`str`):
+    Floating-point type used to store time series. FK outputs single
+    precision SAC files, so the default loses nothing
+
+    """
+    if not isdir(path):
+        raise Exception("Not a directory: %s" % path)
+
+    if not model:
+        model = basename(path.rstrip('/'))
+
+    # which (depth, distance) pairs have all required SAC files?
+    pairs = []
+    for dirname in glob('%s/%s_*' % (path, model)):
+        try:
+            dep = int(basename(dirname)[len(model)+1:])
+        except ValueError:
+            continue
+
+        available = None
+        for ext in EXTENSIONS:
+            found = set()
+            for name in glob('%s/*.grn.%s' % (dirname, ext)):
+                try:
+                    found.add(int(basename(name).split('.')[0]))
+                except ValueError:
+                    continue
+            if available is None:
+                available = found
+            else:
+                available &= found
+
+        pairs += [(dep, dst) for dst in sorted(available or [])]
+
+    if len(pairs)==0:
+        raise Exception("No Green's functions found: %s" % path)
+
+    # records must be sorted by depth and distance (see `Client._get_store`)
+    pairs.sort()
+
+    def _filename(dep, dst, ext):
+        return '%s/%s_%d/%d.grn.%s' % (path, model, dep, dst, ext)
+
+    # first pass: find the longest time series
+    npts_max = 0
+    for dep, dst in pairs:
+        for ext in EXTENSIONS:
+            stats = obspy.read(_filename(dep, dst, ext), format='sac',
+                headonly=True)[0].stats
+            npts_max = max(npts_max, stats.npts)
+
+    nc = len(EXTENSIONS)
+    record_type = np.dtype([
+        ('depth', np.int32),
+        ('distance', np.int32),
+        ('starttime', np.float64, (nc,)),
+        ('delta', np.float64, (nc,)),
+        ('npts', np.int32, (nc,)),
+        ('data', dtype, (nc, npts_max)),
+        ])
+
+    # second pass: fill in records, writing directly to disk so that memory
+    # use does not depend on database size
+    archive = np.lib.format.open_memmap(filename, mode='w+',
+        dtype=record_type, shape=(len(pairs),))
+
+    for _k, (dep, dst) in enumerate(pairs):
+        if verbose:
+            print('  %d of %d: depth %d km, distance %d km' %
+                (_k+1, len(pairs), dep, dst))
+
+        record = archive[_k]
+        record['depth'] = dep
+        record['distance'] = dst
+
+        for _i, ext in enumerate(EXTENSIONS):
+            trace = obspy.read(_filename(dep, dst, ext), format='sac')[0]
+            npts = len(trace.data)
+
+            record['starttime'][_i] = float(trace.stats.starttime)
+            record['delta'][_i] = float(trace.stats.delta)
+            record['npts'][_i] = npts
+            record['data'][_i, :npts] = trace.data
+            record['data'][_i, npts:] = 0.
+
+    archive.flush()
+    del archive
+
@@ -1,12 +1,15 @@
 
 import obspy
 import numpy as np
+import threading
 
+from copy import deepcopy
+from glob import glob
 from os.path import basename, exists
 from mtuq.greens_tensor.FK import GreensTensor 
 from mtuq.io.clients.base import Client as ClientBase
 from mtuq.util.signal import resample
-from obspy.core import Stream
+from obspy.core import Stream, Trace
 from obspy.geodetics import gps2dist_azimuth
 
 
@@ -56,9 +59,33 @@ class Client(ClientBase):
       event depth, and event distance, as used by the `Zhu1994`
       software packages.
 
+
+    .. rubric:: Optional arguments
+
+    ``preload`` (`bool`):
+    If `True`, all SAC files in an event depth directory are read the
+    first time the directory is needed and kept in memory, indexed by 
+    distance, so that subsequent stations and origins at the same depth
+    require no file I/O
+
+    ``lookup`` (`str`):
+    How Green's functions are chosen for a given source-receiver distance.
+    With ``'ceil'`` (default), the nearest greater or equal distance is used;
+    with ``'nearest'``, the nearest distance; and with ``'linear'``, Green's
+    functions at the two neighboring distances are linearly interpolated
+    after resampling.  Without ``preload``, distances are assumed to be
+    spaced at 1 km, as in FK trees computed by `Zhu1994`'s software; with
+    ``preload``, the distances found in the depth directory are used.
+
     """
+    # preload changes only how SAC files are read (wherever distances are
+    # spaced at 1 km, which is the only case in which reading without
+    # preload succeeds, both give the same Green's tensors), so is left out
+    # of cache keys
+    _settings = ClientBase._settings + ['lookup']
+
     def __init__(self, path_or_url=None, model=None,
-        include_mt=True, include_force=False):
+        include_mt=True, include_force=False, preload=False, lookup='ceil'):
 
         if not path_or_url:
             raise Exception
@@ -72,6 +99,9 @@ class Client(ClientBase):
         if not model:
             model = basename(path_or_url)
 
+        assert lookup in ['ceil', 'nearest', 'linear'],\
+            ValueError("Bad input argument: lookup")
+
         # path to fk directory tree
         self.path = path_or_url
 
@@ -81,9 +111,17 @@ class Client(ClientBase):
         self.include_mt = include_mt
         self.include_force = include_force
 
+        self.preload = preload
+        self.lookup = lookup
 
+        # in-memory SAC traces, indexed by depth directory and distance
+        self._stores = {}
+        self._lock = threading.Lock()
 
-    def get_greens_tensors(self, stations=[], origins=[], verbose=False):
+
+
+    def get_greens_tensors(self, stations=[], origins=[], verbose=False,
+        workers=None, pool='thread'):
         """ Reads Green's tensors from database
 
         Returns a ``GreensTensorList`` in which each element corresponds to a
@@ -97,8 +135,13 @@ class Client(ClientBase):
 
         ``verbose`` (`bool`)
 
+        ``workers`` (`int`)
+
+        ``pool`` (`str`)
+
         """
-        return super(Client, self).get_greens_tensors(stations, origins, verbose)
+        return super(Client, self).get_greens_tensors(
+            stations, origins, verbose, workers, pool)
 
 
     def _get_greens_tensor(self, station=None, origin=None):
@@ -123,29 +166,43 @@ class Client(ClientBase):
 
         #dep = str(int(round(origin.depth_in_m/1000.)))
         dep = str(int(np.ceil(origin.depth_in_m/1000.)))
-        #dst = str(int(round(distance_in_m/1000.)))
-        dst = str(int(np.ceil(distance_in_m/1000.)))
 
         if self.include_mt:
 
+            # SAC traces at one or two distances, with interpolation weights
+            neighbors = self._get_neighbors(dep, distance_in_m/1000.)
+
             for _i, ext in enumerate(EXTENSIONS):
-                trace = obspy.read('%s/%s_%s/%s.grn.%s' %
-                    (self.path, self.model, dep, dst, ext),
-                    format='sac')[0]
+                data_new = None
 
-                trace.stats.channel = CHANNELS[_i]
-                trace.stats._component = CHANNELS[_i][0]
+                for sac_traces, weight in neighbors:
+                    trace = sac_traces[_i]
+
+                    # what are the start and end times of the Green's function?
+                    t1_old = float(origin.time)+float(trace.stats.starttime)
+                    t2_old = float(origin.time)+float(trace.stats.endtime)
+                    dt_old = float(trace.stats.delta)
+                    data_old = trace.data
+
+                    # resample Green's function
+                    resampled = resample(data_old, t1_old, t2_old, dt_old, 
+                                                   t1_new, t2_new, dt_new)
 
+                    if weight != 1.:
+                        resampled = weight*resampled
 
-                # what are the start and end times of the Green's function?
-                t1_old = float(origin.time)+float(trace.stats.starttime)
-                t2_old = float(origin.time)+float(trace.stats.endtime)
-                dt_old = float(trace.stats.delta)
-                data_old = trace.data
+                    if data_new is None:
+                        data_new = resampled
+                    else:
+                        data_new = data_new + resampled
+
+                # headers are taken from the first neighbor (traces
+                # returned by _get_sac_traces may be shared, so only their
+                # headers are copied)
+                trace = Trace(header=deepcopy(neighbors[0][0][_i].stats))
+                trace.stats.channel = CHANNELS[_i]
+                trace.stats._component = CHANNELS[_i][0]
 
-                # resample Green's function
-                data_new = resample(data_old, t1_old, t2_old, dt_old, 
-                                              t1_new, t2_new, dt_new)
                 trace.data = data_new
                 # convert from 10^-20 dyne to N^-1
                 trace.data *= 1.e-15
@@ -164,5 +221,123 @@ class Client(ClientBase):
             include_mt=self.include_mt, include_force=self.include_force)
 
 
+    def _get_neighbors(self, dep, distance_in_km):
+        """ Returns SAC traces at the distances used for the given 
+        source-receiver distance, together with interpolation weights
+        """
+        if self.preload:
+            distances = self._get_store(dep)['distances']
+        else:
+            distances = None
+
+        if distances is None:
+            # distances spaced at 1 km
+            lower = int(np.floor(distance_in_km))
+            upper = int(np.ceil(distance_in_km))
+        else:
+            # nearest available distances below and above
+            _k = np.searchsorted(distances, distance_in_km)
+            upper = distances[_k] if _k < len(distances) else None
+            if upper==distance_in_km:
+                lower = upper
+            else:
+                lower = distances[_k-1] if _k > 0 else None
+
+        if self.lookup=='ceil' or lower is None:
+            selected = [(upper, 1.)]
+
+        elif upper is None:
+            selected = [(lower, 1.)]
+
+        elif self.lookup=='nearest':
+            if distance_in_km-lower < upper-distance_in_km:
+                selected = [(lower, 1.)]
+            else:
+                selected = [(upper, 1.)]
+
+        elif lower==upper:
+            selected = [(upper, 1.)]
+
+        else:
+            weight = (distance_in_km-lower)/float(upper-lower)
+            selected = [(lower, 1.-weight), (upper, weight)]
+
+        if selected[0][0] is None:
+            raise Exception("Distance outside database range: %f km" %
+                distance_in_km)
+
+        return [(self._get_sac_traces(dep, dst), weight)
+            for dst, weight in selected]
+
+
+    def _get_sac_traces(self, dep, dst):
+        """ Returns SAC traces for the given depth and distance, in the order
+        given by ``EXTENSIONS`` (callers must not modify them, since with
+        ``preload`` they are shared by all stations and origins)
+        """
+        if self.preload:
+            store = self._get_store(dep)
+            if dst not in store['traces']:
+                raise Exception("Missing Green's functions: %s_%s/%s" %
+                    (self.model, dep, dst))
+            return list(store['traces'][dst])
+
+        return [self._read(dep, dst, ext) for ext in EXTENSIONS]
 
 
+    def _get_store(self, dep):
+        """ Reads all SAC files in the given depth directory into memory
+        (once per depth)
+        """
+        with self._lock:
+            if dep in self._stores:
+                return self._stores[dep]
+
+            # distances for which all required SAC files exist
+            available = None
+            for ext in EXTENSIONS:
+                filenames = glob('%s/%s_%s/*.grn.%s' % 
+                    (self.path, self.model, dep, ext))
+                found = set()
+                for filename in filenames:
+                    try:
+                        found.add(int(basename(filename).split('.')[0]))
+                    except ValueError:
+                        continue
+                if available is None:
+                    available = found
+                else:
+                    available &= found
+
+            distances = np.array(sorted(available or []), dtype=int)
+
+            if len(distances)==0:
+                raise Exception("No Green's functions found: %s/%s_%s" %
+                    (self.path, self.model, dep))
+
+            traces = {}
+            for dst in distances:
+                traces[dst] = [self._read(dep, dst, ext) for ext in EXTENSIONS]
+
+            self._stores[dep] = {'distances': distances, 'traces': traces}
+            return self._stores[dep]
+
+
+    def _read(self, dep, dst, ext):
+        return obspy.read('%s/%s_%s/%s.grn.%s' %
+            (self.path, self.model, dep, dst, ext),
+            format='sac')[0]
+
+
+    def __getstate__(self):
+        # locks cannot be pickled, and preloaded traces are reread on demand
+        state = self.__dict__.copy()
+        state['_stores'] = {}
+        state['_lock'] = None
+        return state
+
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
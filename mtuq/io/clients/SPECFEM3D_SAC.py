@@ -66,7 +66,8 @@ class Client(ClientBase):
         self.include_force = include_force
 
 
-    def get_greens_tensors(self, stations=[], origins=[], verbose=False):
+    def get_greens_tensors(self, stations=[], origins=[], verbose=False,
+        workers=None, pool='thread'):
         """ Reads Green's tensors
 
         Returns a ``GreensTensorList`` in which each element corresponds to a
@@ -80,8 +81,13 @@ class Client(ClientBase):
 
         ``verbose`` (`bool`)
 
+        ``workers`` (`int`)
+
+        ``pool`` (`str`)
+
         """
-        return super(Client, self).get_greens_tensors(stations, origins, verbose)
+        return super(Client, self).get_greens_tensors(
+            stations, origins, verbose, workers, pool)
 
 
     def _get_greens_tensor(self, station=None, origin=None):
@@ -110,7 +110,8 @@ class Client(ClientBase):
             (self.path, self._prefix1, depth_key, self._prefix2, offset_key)
 
 
-    def get_greens_tensors(self, stations=[], origins=[], verbose=False):
+    def get_greens_tensors(self, stations=[], origins=[], verbose=False,
+        workers=None, pool='thread'):
         """ Reads Green's tensors
 
         Returns a ``GreensTensorList`` in which each element corresponds to a
@@ -124,8 +125,13 @@ class Client(ClientBase):
 
         ``verbose`` (`bool`)
 
+        ``workers`` (`int`)
+
+        ``pool`` (`str`)
+
         """
-        return super(Client, self).get_greens_tensors(stations, origins, verbose)
+        return super(Client, self).get_greens_tensors(
+            stations, origins, verbose, workers, pool)
 
 
     def _get_greens_tensor(self, station=None, origin=None):
@@ -1,6 +1,17 @@
 
+
+import hashlib
+import importlib
+import json
+import numpy as np
+import os
+import tempfile
+
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from mtuq.greens_tensor import GreensTensorList
 from mtuq.util import iterable
+from obspy.core import Trace, UTCDateTime
 
 
 
@@ -12,11 +23,17 @@ class Client(object):
     subclass.
     """
 
+    # attributes that determine which Green's tensors the client returns,
+    # from which persistent cache keys are derived (see ``set_cache``);
+    # subclasses with other such attributes extend this list
+    _settings = ['path', 'model', 'include_mt', 'include_force']
+
     def __init__(self, path_or_url='', **kwargs):
         raise NotImplementedError("Must be implemented by subclass")
 
 
-    def get_greens_tensors(self, stations=[], origins=[], verbose=False):
+    def get_greens_tensors(self, stations=[], origins=[], verbose=False,
+        workers=None, pool='thread'):
         """ Reads Green's tensors from database
 
         Returns a ``GreensTensorList`` in which each element corresponds to the
@@ -30,12 +47,35 @@ class Client(object):
 
         ``verbose`` (`bool`)
 
+        ``workers`` (`int`):
+        If given, Green's tensors are retrieved concurrently by this many
+        workers (the order of the returned list is unaffected)
+
+        ``pool`` (`str`):
+        ``'thread'`` (default) suits clients limited by file I/O or downloads,
+        while ``'process'`` suits clients limited by computation, but 
+        requires that the client can be pickled
+
         """
         origins = iterable(origins)
         stations = iterable(stations)
         ni = len(origins)
         nj = len(stations)
 
+        if workers is not None:
+            assert workers >= 1,\
+                ValueError("Bad input argument: workers")
+
+        assert pool in ['thread', 'process'],\
+            ValueError("Bad input argument: pool")
+
+        if workers is None or workers==1:
+            executor = None
+        elif pool=='thread':
+            executor = ThreadPoolExecutor(max_workers=workers)
+        else:
+            executor = ProcessPoolExecutor(max_workers=workers)
+
         tensors = []
         for _i, origin in enumerate(origins):
             if verbose:
@@ -47,12 +87,321 @@ class Client(object):
                     print("")
 
             for _j, station in enumerate(stations):
-                tensors += [self._get_greens_tensor(station, origin)]
+                if executor is None:
+                    tensors += [self._get_cached_greens_tensor(station, origin)]
+                else:
+                    tensors += [executor.submit(
+                        self._get_cached_greens_tensor, station, origin)]
+
+        if executor is not None:
+            # results are collected in submission order
+            futures = tensors
+            try:
+                tensors = [future.result() for future in futures]
+            finally:
+                # if an error occurred, futures not yet started are cancelled
+                # (shutdown(cancel_futures=True) requires Python 3.9)
+                for future in futures:
+                    future.cancel()
+                executor.shutdown()
 
         return GreensTensorList(tensors)
 
 
+    def set_cache(self, path, max_bytes=2**32):
+        """ Keeps Green's tensors in a persistent on-disk cache
+
+        Once set, Green's tensors are read from the cache whenever the same
+        client settings, station, origin and time sampling are requested
+        again, skipping any file I/O, downloads or resampling
+
+        .. rubric :: Input arguments
+
+        ``path`` (`str`):
+        Cache directory, which can be shared between runs and clients
+
+        ``max_bytes`` (`int`):
+        Maximum total size of cache files, after which least recently used
+        files are deleted
+
+        """
+        if path:
+            self._cache = DiskCache(path, max_bytes)
+        else:
+            self._cache = None
+
+
+    def _get_cached_greens_tensor(self, station, origin):
+        cache = getattr(self, '_cache', None)
+
+        if cache is None:
+            return self._get_greens_tensor(station, origin)
+
+        key = _get_key(self, station, origin)
+        tensor = cache.get(key, station, origin)
+
+        if tensor is None:
+            tensor = self._get_greens_tensor(station, origin)
+            cache.put(key, tensor)
+
+        return tensor
+
+
     def _get_greens_tensor(self, station=None, origin=None):
         raise NotImplementedError("Must be implemented by subclass")
 
 
+
+# incremented whenever the format of cache files changes
+_VERSION = 2
+
+
+class DiskCache(object):
+    """ Persistent on-disk cache for Green's tensors
+
+    Each Green's tensor is stored in its own NumPy ``.npz`` file, containing
+    trace data and, in JSON form, trace headers and tensor metadata. File
+    names are derived from a hash of the client settings, station, origin and
+    time sampling, which are rounded to a small tolerance (see ``_get_key``).
+    Trace start times are stored relative to origin time, so that a tensor
+    cached for one event can be reused for another event at the same
+    location.
+
+    Files are written atomically, so that a cache directory can be shared by
+    several processes.  Once the total size exceeds ``max_bytes``, least
+    recently used files (by modification time, which is updated on each 
+    read) are deleted.
+    """
+
+    def __init__(self, path, max_bytes=2**32):
+        assert max_bytes > 0,\
+            ValueError("Bad input argument: max_bytes")
+
+        self.path = path
+        self.max_bytes = max_bytes
+
+        os.makedirs(path, exist_ok=True)
+
+        # running estimate of total cache size (other processes may also be
+        # writing, so the directory is rescanned before evicting anything)
+        self._nbytes = sum([size for _, _, size in self._scan()])
+
+
+    def get(self, key, station, origin):
+        """ Returns cached Green's tensor, or `None` if not found
+
+        The returned tensor is assigned the given station and origin
+        """
+        filename = self._filename(key)
+
+        try:
+            with np.load(filename) as archive:
+                header = json.loads(str(archive['header']))
+                if header.get('version') != _VERSION:
+                    raise ValueError('Incompatible cache file')
+                arrays = [archive['data_%d' % _i]
+                    for _i in range(len(header['traces']))]
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # corrupt or incompatible file
+            self._remove(filename)
+            return None
+
+        try:
+            os.utime(filename)
+        except OSError:
+            pass
+
+        traces = []
+        for data, stats in zip(arrays, header['traces']):
+            stats = dict(stats)
+            stats['starttime'] = origin.time + stats['starttime']
+            component = stats.pop('_component', None)
+            trace = Trace(data, stats)
+            if component is not None:
+                trace.stats._component = component
+            traces += [trace]
+
+        module = importlib.import_module(header['module'])
+        cls = getattr(module, header['class'])
+
+        return cls(traces=traces, station=station, origin=origin,
+            tags=header['tags'], include_mt=header['include_mt'],
+            include_force=header['include_force'])
+
+
+    def put(self, key, tensor):
+        """ Stores Green's tensor
+        """
+        header = {
+            'version': _VERSION,
+            'module': type(tensor).__module__,
+            'class': type(tensor).__name__,
+            'tags': list(tensor.tags),
+            'include_mt': bool(tensor.include_mt),
+            'include_force': bool(tensor.include_force),
+            'traces': [_get_stats(trace, tensor.origin) for trace in tensor],
+            }
+
+        arrays = {'data_%d' % _i: trace.data for _i, trace in enumerate(tensor)}
+        arrays['header'] = np.array(json.dumps(header))
+
+        # writing to a temporary file first means that other processes never
+        # see partially written files
+        filename = self._filename(key)
+        fd, tmpname = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                np.savez(file, **arrays)
+            os.replace(tmpname, filename)
+        except Exception:
+            self._remove(tmpname)
+            raise
+
+        self._nbytes += os.path.getsize(filename)
+
+        if self._nbytes > self.max_bytes:
+            self._evict()
+
+
+    def clear(self):
+        """ Deletes all cache files
+        """
+        for filename, _, _ in self._scan():
+            self._remove(filename)
+        self._nbytes = 0
+
+
+    def _filename(self, key):
+        digest = hashlib.sha1(
+            json.dumps(key, sort_keys=True).encode()).hexdigest()
+        return os.path.join(self.path, digest+'.npz')
+
+
+    def _scan(self):
+        # returns (filename, mtime, size) for all cache files
+        entries = []
+        for name in os.listdir(self.path):
+            if not name.endswith('.npz'):
+                continue
+            filename = os.path.join(self.path, name)
+            try:
+                stat = os.stat(filename)
+            except OSError:
+                continue
+            entries += [(filename, stat.st_mtime, stat.st_size)]
+        return entries
+
+
+    def _evict(self):
+        # deletes least recently used files until under the size limit
+        entries = sorted(self._scan(), key=lambda entry: entry[1])
+        self._nbytes = sum([size for _, _, size in entries])
+
+        for filename, _, size in entries:
+            if self._nbytes <= self.max_bytes:
+                break
+            self._remove(filename)
+            self._nbytes -= size
+
+
+    def _remove(self, filename):
+        try:
+            os.remove(filename)
+        except OSError:
+            pass
+
+
+
+#
+# utility functions
+#
+
+def _get_key(client, station, origin):
+    """ Returns cache key for the given client, station and origin
+
+    Locations are rounded to about one meter and times to one microsecond,
+    so that tensors requested for practically identical stations and
+    origins are shared
+    """
+    # client settings, such as solver type, path, model and whether moment
+    # tensor or force responses are included (other attributes, such as
+    # state that changes as Green's tensors are read, are left out)
+    settings = {'class': '%s.%s' % (
+        type(client).__module__, type(client).__name__)}
+    for name in client._settings:
+        settings[name] = _to_json(getattr(client, name, None))
+
+    return {
+        'client': settings,
+        'station': [
+            station.network,
+            station.station,
+            station.location,
+            _round(station.latitude, 5),
+            _round(station.longitude, 5),
+            ],
+        'origin': [
+            _round(origin.latitude, 5),
+            _round(origin.longitude, 5),
+            _round(origin.depth_in_m, 0),
+            ],
+        # Green's functions are resampled onto the station time sampling,
+        # which is stored relative to origin time
+        'sampling': [
+            _round(float(station.starttime)-float(origin.time), 6),
+            _round(float(station.delta), 9),
+            int(station.npts),
+            ],
+        }
+
+
+def _round(value, decimals):
+    if value is None:
+        return None
+    return round(float(value), decimals)
+
+
+def _get_stats(trace, origin):
+    # converts trace headers, including any SAC headers, to JSON-compatible
+    # form, with start time relative to origin time
+    stats = {}
+    for name, value in trace.stats.items():
+        if name in ['endtime', 'sampling_rate']:
+            # derived from other headers
+            continue
+        if name=='starttime':
+            value = float(value-origin.time)
+        value = _to_json(value)
+        if value is not None:
+            stats[name] = value
+
+    component = getattr(trace.stats, '_component', None)
+    if component is not None:
+        stats['_component'] = component
+
+    return stats
+
+
+def _to_json(value):
+    # returns None for values that cannot be converted
+    if isinstance(value, UTCDateTime):
+        return str(value)
+    elif isinstance(value, np.generic):
+        return value.item()
+    elif isinstance(value, (str, int, float, bool)):
+        return value
+    elif isinstance(value, Mapping):
+        converted = {}
+        for name, item in value.items():
+            item = _to_json(item)
+            if item is not None:
+                converted[name] = item
+        return converted
+    elif isinstance(value, (list, tuple)):
+        return [item for item in map(_to_json, value) if item is not None]
+    else:
+        return None
+
+
@@ -40,6 +40,8 @@ class Client(ClientBase):
 
     """
 
+    _settings = ['url', 'model', 'include_mt', 'include_force']
+
     def __init__(self, path_or_url=None, model=None,
                  include_mt=True, include_force=False):
 
@@ -55,7 +57,8 @@ class Client(ClientBase):
         self.include_force = include_force
 
 
-    def get_greens_tensors(self, stations=[], origins=[], verbose=False):
+    def get_greens_tensors(self, stations=[], origins=[], verbose=False,
+        workers=None, pool='thread'):
         """ Downloads Green's tensors
 
         Returns a ``GreensTensorList`` in which each element corresponds to a
@@ -69,8 +72,13 @@ class Client(ClientBase):
 
         ``verbose`` (`bool`)
 
+        ``workers`` (`int`)
+
+        ``pool`` (`str`)
+
         """
-        return super(Client, self).get_greens_tensors(stations, origins, verbose)
+        return super(Client, self).get_greens_tensors(
+            stations, origins, verbose, workers, pool)
 
 
     def _get_greens_tensor(self, station=None, origin=None):
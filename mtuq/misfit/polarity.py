@@ -5,8 +5,8 @@ import mtuq
 from mtuq.util.math import radiation_coef
 from mtuq.util import Null, iterable, warn
 from mtuq.misfit.waveform.level2 import _to_array
-from obspy.taup import TauPyModel
 from mtuq.util.polarity import extract_polarity, extract_takeoff_angle
+from mtuq.util.traveltimes import get_table
 
 class PolarityMisfit(object):
     """ Polarity misfit function
@@ -60,6 +60,12 @@ class PolarityMisfit(object):
     takeoff angles. If not a default obspy.taup model, taup_model should be a
     path pointing to a valid .npz velocity model file.
 
+    ``takeoff_table`` (`bool`): Whether to look up takeoff angles in a
+    precomputed travel time table for `taup_model` rather than calling
+    obspy.taup for every station (see `mtuq.util.traveltimes.TravelTimeTable`;
+    the table is stored on disk and reused across origins and calls, but
+    agrees with obspy.taup only to within about one degree).
+
     .. note::
 
     *Convention* : Positive vertical motion should be encoded as +1 and
@@ -73,7 +79,8 @@ class PolarityMisfit(object):
 
     """
 
-    def __init__(self, polarity_keyword=None, taup_model='ak135'):
+    def __init__(self, polarity_keyword=None, taup_model='ak135',
+                 takeoff_table=False):
         """ Function handle constructor
         Pre-set optional arguments for custom polarity misfit inputs (sac
         header to read polarity from, velocity model to compute takeoff angles).
@@ -83,6 +90,10 @@ class PolarityMisfit(object):
 
         self.polarity_keyword = polarity_keyword
         self.taup_model = taup_model
+        self.takeoff_table = takeoff_table
+
+        # loaded on first call
+        self._table = None
 
 
     def __call__(self, polarity_input, greens, sources, progress_handle=Null(),
@@ -104,7 +115,11 @@ class PolarityMisfit(object):
         # Extracting measured polarities,  as a numpy array
         observed_polarities = extract_polarity(polarity_input, self.polarity_keyword)
 
-        takeoff_angles = extract_takeoff_angle(greens, taup_model=self.taup_model)
+        if self.takeoff_table and self._table is None:
+            self._table = get_table(self.taup_model)
+
+        takeoff_angles = extract_takeoff_angle(greens,
+            taup_model=self.taup_model, table=self._table)
 
         azimuths = [sta.azimuth for sta in greens]
 
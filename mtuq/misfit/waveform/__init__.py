@@ -65,6 +65,26 @@ class Misfit(object):
     ``optimization_level`` (`int`): optimization level 
     (see further details below)
 
+    ``num_threads`` (`int`): number of OpenMP threads used by the
+    ``level2`` C extension. If `None`, the OpenMP default is used, which
+    is usually the number of available cores (ignored for other
+    optimization levels)
+
+    ``block_size`` (`int`): if given, the ``level2`` misfit is evaluated over
+    blocks of this many sources using BLAS matrix products instead of the C 
+    extension (see further details below)
+
+    ``precision`` (`str`): ``'float64'`` (default) or ``'float32'``, 
+    floating-point precision of the ``level2`` cross-correlation arrays and 
+    misfit kernel (see further details below)
+
+    ``cache`` (`bool`): if `True`, ``level2`` cross-correlation arrays are
+    kept between evaluations and reused whenever the same data and Green's
+    functions are passed again (see further details below)
+
+    ``cache_max_bytes`` (`int`): maximum total size of cached arrays, after
+    which least recently used entries are discarded
+
 
     .. note:: 
 
@@ -109,6 +129,54 @@ class Misfit(object):
       tuning or compiler troubleshooting, users may wish to modify the
       `get_compiler_args` function in `setup.py`.
 
+    .. note::
+
+      The ``level2`` C extension is parallelized over sources using OpenMP,
+      so that a single process can make use of all cores on a node without
+      MPI.  When combining OpenMP and MPI, choose ``num_threads`` so that
+      the number of MPI processes times ``num_threads`` does not exceed the
+      number of available cores.
+
+    .. note::
+
+      With ``block_size`` (typically a few thousand), ``level2`` evaluates
+      whole blocks of sources as matrix products followed by vectorized
+      time-shift and norm reductions. Throughput then depends on the BLAS 
+      library NumPy is linked against (whose threading is controlled by 
+      e.g. ``OMP_NUM_THREADS`` rather than ``num_threads``). Temporary 
+      storage grows as `block_size` times the number of stations, components
+      and time shifts.
+
+    .. note::
+
+      With ``precision='float32'``, ``level2`` stores its cross-correlation
+      arrays, including the large Green's function autocorrelation array,
+      in single precision and runs the misfit kernel in single precision.
+      This halves memory use and roughly doubles SIMD throughput.
+      Correlations are still accumulated in double precision before being
+      rounded. Because misfit is evaluated from `s^2 + d^2 - 2sd`, the
+      relative error of each trace contribution is bounded by roughly
+      `1e-7 * (s^2 + d^2) / (s - d)^2`. For example, a trace fit with 10%
+      residual amplitude has a relative error of order `1e-5`. Sources whose
+      misfit values differ by less than this may be ranked differently than
+      in double precision.
+
+    .. note::
+
+      If a list of ``origins`` is passed when evaluating misfit, ``greens``
+      must contain Green's tensors for each origin, and an array of shape
+      `(len(sources), len(origins))` is returned.  At ``optimization_level=2``,
+      all origins are then evaluated in a single call to the C extension, with
+      cross-correlation arrays for all origins held in memory at once.
+      Other optimization levels simply loop over origins.
+
+    .. note::
+
+      With ``cache=True``, data and Green's functions are recognized by the
+      identity of their individual streams and tensors.  If these are 
+      modified in place (for example, by reprocessing the data), call 
+      `clear_cache` before evaluating misfit again.
+
     """
 
     def __init__(self,
@@ -117,6 +185,11 @@ class Misfit(object):
         time_shift_min=0.,
         time_shift_max=0.,
         optimization_level=2,
+        num_threads=1,
+        block_size=None,
+        precision='float64',
+        cache=False,
+        cache_max_bytes=2**30,
         ):
         """ Function handle constructor
         """
@@ -146,15 +219,34 @@ class Misfit(object):
 
         assert optimization_level in [0,1,2]
 
+        if num_threads is not None:
+            assert num_threads >= 1,\
+                ValueError("Bad input argument: num_threads")
+
+        if block_size is not None:
+            assert block_size >= 1,\
+                ValueError("Bad input argument: block_size")
+
+        assert precision in ['float32', 'float64'],\
+            ValueError("Bad input argument: precision")
+
         self.norm = norm
         self.time_shift_min = time_shift_min
         self.time_shift_max = time_shift_max
         self.time_shift_groups = time_shift_groups
         self.optimization_level = optimization_level
+        self.num_threads = num_threads
+        self.block_size = block_size
+        self.precision = precision
+
+        if cache:
+            self._cache = level2.Cache(max_bytes=cache_max_bytes)
+        else:
+            self._cache = None
 
 
     def __call__(self, data, greens, sources, progress_handle=Null(), 
-        set_attributes=False, optimization_level=None):
+        set_attributes=False, optimization_level=None, origins=None):
         """ Evaluates misfit on given data
         """
         if optimization_level is None:
@@ -166,16 +258,28 @@ class Misfit(object):
         # makes things work if just a single source is given
         sources = iterable(sources)
 
+        if origins is not None:
+            origins = list(origins)
+            norigins = len(origins)
+        else:
+            norigins = 1
+
         # checks that dataset is nonempty
         if isempty(data):
             warn("Empty data set. No misfit evaluations will be carried out")
-            return np.zeros((len(sources), 1))
+            return np.zeros((len(sources), norigins))
 
         # checks that the container legnths are consistent
-        if len(data) != len(greens):
+        if len(data)*norigins != len(greens):
             raise Exception("Inconsistent container lengths\n\n  "+
                 "len(data): %d\n  len(greens): %d\n" %
                 (len(data), len(greens)))
+
+        if origins is not None and (optimization_level < 2 or set_attributes):
+            # only the level2 extension evaluates several origins at once
+            return np.hstack([self.__call__(
+                data, greens.select(origin), sources, progress_handle,
+                set_attributes, optimization_level) for origin in origins])
  
 
         # checks that optional Green's function padding is consistent with time 
@@ -197,7 +301,40 @@ class Misfit(object):
         if optimization_level==2:
             return level2.misfit(
                 data, greens, sources, self.norm, self.time_shift_groups,
-                self.time_shift_min, self.time_shift_max, progress_handle)
+                self.time_shift_min, self.time_shift_max, progress_handle,
+                num_threads=self.num_threads, block_size=self.block_size,
+                precision=self.precision, cache=self._cache, origins=origins)
+
+
+    def clear_cache(self):
+        """ Discards cached ``level2`` cross-correlation arrays
+        """
+        if self._cache is not None:
+            self._cache.clear()
+
+
+    def precompute_shared(self, data, greens, comm, origins=None):
+        """ Computes ``level2`` cross-correlation arrays once per node and
+        places them in MPI-3 shared memory
+
+        Collective over the MPI communicator `comm`.  Arrays are added to the
+        cache, so that subsequent evaluations with the same data and Green's
+        functions on any process of the node reuse a single shared copy.
+        Requires ``cache=True``
+
+        Returns the shared arrays, which can be released by calling
+        `clear_cache` followed by `mtuq.util.free_shared_arrays`
+        """
+        if self._cache is None:
+            raise Exception("Shared memory requires Misfit(cache=True)")
+
+        # padding must be applied before arrays are computed, since cache
+        # keys don't change when tensors are padded in place
+        check_padding(greens, self.time_shift_min, self.time_shift_max)
+
+        return level2.precompute_shared(
+            data, greens, self.time_shift_min, self.time_shift_max,
+            self._cache, comm, precision=self.precision, origins=origins)
 
 
     def collect_attributes(self, data, greens, source):
@@ -3,25 +3,32 @@
 #include <numpy/arrayobject.h>
 #include <numpy/npy_math.h>
 #include <math.h>
+#include <stdlib.h>
+
+#ifdef _OPENMP
+#include <omp.h>
+#endif
 
 
 //
 // array access macros
 //
+// (real_t is defined separately for each precision, see below)
+//
 #define data_data(i0,i1)\
-    (*(npy_float64*)((PyArray_DATA(data_data)+\
+    (*(real_t*)((PyArray_DATA(data_data)+\
     (i0) * PyArray_STRIDES(data_data)[0]+\
     (i1) * PyArray_STRIDES(data_data)[1])))
 
 #define greens_data(i0,i1,i2,i3)\
-    (*(npy_float64*)((PyArray_DATA(greens_data)+\
+    (*(real_t*)((PyArray_DATA(greens_data)+\
     (i0) * PyArray_STRIDES(greens_data)[0]+\
     (i1) * PyArray_STRIDES(greens_data)[1]+\
     (i2) * PyArray_STRIDES(greens_data)[2]+\
     (i3) * PyArray_STRIDES(greens_data)[3])))
 
 #define greens_greens(i0,i1,i2,i3,i4)\
-    (*(npy_float64*)((PyArray_DATA(greens_greens)+\
+    (*(real_t*)((PyArray_DATA(greens_greens)+\
     (i0) * PyArray_STRIDES(greens_greens)[0]+\
     (i1) * PyArray_STRIDES(greens_greens)[1]+\
     (i2) * PyArray_STRIDES(greens_greens)[2]+\
@@ -29,7 +36,7 @@
     (i4) * PyArray_STRIDES(greens_greens)[4])))
 
 #define sources(i0,i1)\
-    (*(npy_float64*)((PyArray_DATA(sources)+\
+    (*(real_t*)((PyArray_DATA(sources)+\
     (i0) * PyArray_STRIDES(sources)[0]+\
     (i1) * PyArray_STRIDES(sources)[1])))
 
@@ -43,13 +50,41 @@
     (i0) * PyArray_STRIDES(weights)[0]+\
     (i1) * PyArray_STRIDES(weights)[1])))
 
-#define results(i0)\
+#define results(i0,i1)\
     (*(npy_float64*)((PyArray_DATA(results)+\
-    (i0) * PyArray_STRIDES(results)[0])))
+    (i0) * PyArray_STRIDES(results)[0]+\
+    (i1) * PyArray_STRIDES(results)[1])))
+
+
+
+//
+// progress message state shared by all threads
+//
+typedef struct {
+  float iter;
+  float next_iter;
+  int msg_count;
+  int msg_interval;
+  int msg_percent;
+} progress_t;
+
+
 
-#define cc(i0)\
-    (*(npy_float64*)((PyArray_DATA(cc)+\
-    (i0) * PyArray_STRIDES(cc)[0])))
+//
+// L2 misfit kernels, one for each supported precision
+//
+
+#define real_t npy_float64
+#define KERNEL misfit_float64
+#include "c_ext_L2_kernel.h"
+#undef KERNEL
+#undef real_t
+
+#define real_t npy_float32
+#define KERNEL misfit_float32
+#include "c_ext_L2_kernel.h"
+#undef KERNEL
+#undef real_t
 
 
 
@@ -73,19 +108,16 @@ static PyObject *misfit(PyObject *self, PyObject *args) {
   int NPAD1, NPAD2;
   int debug_level;
   int msg_start, msg_stop, msg_percent;
+  int num_threads;
 
-  int NSRC, NSTA, NC, NG, NGRP;
-  int isrc, ista, ic, ig, igrp;
-
-  int cc_argmax, it, itpad, j1, j2, nd, NPAD;
-  npy_float64 cc_max, L2_sum, L2_tmp;
+  int NSRC, NSTA, NC, NG, NGRP, NPAD, NORIGIN;
+  int nd, nthreads, status, typenum;
 
-  float iter, next_iter;
-  int msg_count, msg_interval;
+  progress_t progress;
 
 
   // parse arguments
-  if (!PyArg_ParseTuple(args, "O!O!O!O!O!O!idiiiiii",
+  if (!PyArg_ParseTuple(args, "O!O!O!O!O!O!idiiiiiii",
                         &PyArray_Type, &data_data,
                         &PyArray_Type, &greens_data,
                         &PyArray_Type, &greens_greens,
@@ -99,7 +131,28 @@ static PyObject *misfit(PyObject *self, PyObject *args) {
                         &debug_level,
                         &msg_start,
                         &msg_stop,
-                        &msg_percent)) {
+                        &msg_percent,
+                        &num_threads)) {
+    return NULL;
+  }
+
+  // cross-correlation and source arrays must all have the same precision;
+  // groups and weights are always double precision
+  typenum = PyArray_TYPE(greens_data);
+
+  if ((typenum != NPY_DOUBLE && typenum != NPY_FLOAT) ||
+      PyArray_TYPE(data_data) != typenum ||
+      PyArray_TYPE(greens_greens) != typenum ||
+      PyArray_TYPE(sources) != typenum) {
+    PyErr_SetString(PyExc_TypeError,
+      "Cross-correlation and source arrays must all be float32 or all be float64");
+    return NULL;
+  }
+
+  if (PyArray_TYPE(groups) != NPY_DOUBLE ||
+      PyArray_TYPE(weights) != NPY_DOUBLE) {
+    PyErr_SetString(PyExc_TypeError,
+      "Group and weight arrays must be float64");
     return NULL;
   }
 
@@ -110,163 +163,96 @@ static PyObject *misfit(PyObject *self, PyObject *args) {
   NG = (int) PyArray_SHAPE(sources)[1];
   NGRP = (int) PyArray_SHAPE(groups)[0];
 
+  // Green's function arrays for several origins may be stacked along the
+  // station axis
+  if (NSTA < 1 || PyArray_SHAPE(greens_data)[0] % NSTA != 0 ||
+      PyArray_SHAPE(greens_greens)[0] != PyArray_SHAPE(greens_data)[0]) {
+    PyErr_SetString(PyExc_ValueError,
+      "Inconsistent number of stations");
+    return NULL;
+  }
+  NORIGIN = (int) PyArray_SHAPE(greens_data)[0]/NSTA;
+
   NPAD = (int) NPAD1+NPAD2+1;
 
+  // number of threads (values less than one mean "use OpenMP default")
+#ifdef _OPENMP
+  if (num_threads > 0) {
+    nthreads = num_threads;
+  }
+  else {
+    nthreads = omp_get_max_threads();
+  }
+#else
+  nthreads = 1;
+#endif
+
   if (debug_level>1) {
     printf(" number of sources:  %d\n", NSRC);
     printf(" number of stations:  %d\n", NSTA);
     printf(" number of components:  %d\n", NC);
     printf(" number of Green's functions:  %d\n\n", NG);
     printf(" number of component groups:  %d\n", NGRP);
+    printf(" number of origins:  %d\n", NORIGIN);
+    printf(" number of threads:  %d\n", nthreads);
+    printf(" single precision:  %d\n", typenum == NPY_FLOAT);
   }
 
 
   // allocate arrays
-  nd = 1;
-  npy_intp dims_cc[] = {(int)NPAD};
-  PyObject *cc = PyArray_SimpleNew(nd, dims_cc, NPY_DOUBLE);
-
   nd = 2;
-  npy_intp dims_results[] = {(int)NSRC, 1};
+  npy_intp dims_results[] = {(int)NSRC, (int)NORIGIN};
   PyObject *results = PyArray_SimpleNew(nd, dims_results, NPY_DOUBLE);
+  if (results == NULL) {
+    return NULL;
+  }
 
 
   // initialize progress messages
+  progress.msg_percent = msg_percent;
   if (msg_percent > 0) {
-    msg_interval = msg_percent/100.*msg_stop;
-    msg_count = 100./msg_percent*msg_start/msg_stop;
-    iter = (float) msg_start;
-    next_iter = (float) msg_count*msg_interval;
+    progress.msg_interval = msg_percent/100.*msg_stop;
+    progress.msg_count = ceil(100./msg_percent*msg_start/msg_stop);
+    progress.iter = (float) msg_start;
+    progress.next_iter = (float) progress.msg_count*progress.msg_interval;
 
   }
   else {
-    iter = 0;
-    next_iter = INFINITY;
+    progress.msg_interval = 0;
+    progress.msg_count = 0;
+    progress.iter = 0;
+    progress.next_iter = INFINITY;
   }
 
+
   //
-  // Iterate over sources
+  // main computational work
   //
 
-  for(isrc=0; isrc<NSRC; ++isrc) {
+  Py_BEGIN_ALLOW_THREADS
 
+  if (typenum == NPY_FLOAT) {
+    status = misfit_float32(
+      data_data, greens_data, greens_greens, sources, groups, weights,
+      (PyArrayObject*) results, hybrid_norm, dt,
+      NSRC, NSTA, NC, NG, NGRP, NPAD, NORIGIN, nthreads, debug_level,
+      &progress);
+  }
+  else {
+    status = misfit_float64(
+      data_data, greens_data, greens_greens, sources, groups, weights,
+      (PyArrayObject*) results, hybrid_norm, dt,
+      NSRC, NSTA, NC, NG, NGRP, NPAD, NORIGIN, nthreads, debug_level,
+      &progress);
+  }
 
-    // display progress message
-    if (iter >= next_iter) {
-        printf("  about %d percent finished\n", msg_percent*msg_count);
-        msg_count += 1;
-        next_iter = msg_count*msg_interval;
-    }
-    iter += 1;
-
-
-    L2_sum = (npy_float64) 0.;
-
-    for (ista=0; ista<NSTA; ista++) {
-      for (igrp=0; igrp<NGRP; igrp++) {
-
-        /*
-
-        Finds the shift between data and synthetics that yields the maximum
-        cross-correlation value across all components in the given component 
-        group, subject to the (time_shift_min, time_shift_max) constraint
-
-        */
-
-        for (it=0; it<NPAD; it++) {
-          cc(it) = (npy_float64) 0.;
-        }
-
-        for (ic=0; ic<NC; ic++) {
-
-          // Skip components not in the component group being considered
-          if (((int) groups(igrp,ic))==0) {
-            continue;
-           }
-
-          // Skip traces that have been assigned zero weight
-          if (((int) weights(ista,ic))==0) {
-              if (debug_level>1) {
-                if (isrc==0) {
-                  printf(" skipping trace: %d %d\n", ista, ic);
-                }
-              }
-              continue;
-           }
-
-          // Sum cross-correlations of all components being considered
-          for (ig=0; ig<NG; ig++) {
-            for (it=0; it<NPAD; it++) {
-                cc(it) += greens_data(ista,ic,ig,it) * sources(isrc,ig);
-            }
-          }
-        }
-        cc_max = -NPY_INFINITY;
-        cc_argmax = 0;
-        for (it=0; it<NPAD; it++) {
-          if (cc(it) > cc_max) {
-            cc_max = cc(it);
-            cc_argmax= it;
-          }
-        }
-        itpad = cc_argmax;
-
-
-        /*
-
-        Calculates L2 norm of difference between data and synthetics
-        for all components in the given component group
-
-        Rather than storing (s - d) directly for all time samples, we use a
-        computational shortcut based on
-
-        ||s - d||^2 = s^2 + d^2 - 2sd
-
-        */
-        for (ic=0; ic<NC; ic++) {
-          L2_tmp = 0.;
-
-          // Skip components not in the component group being considered
-          if (((int) groups(igrp,ic))==0) {
-            continue;
-          } 
-
-          // Skip traces that have been assigned zero weight
-          if (((int) weights(ista,ic))==0) {
-              continue;
-          }
-
-          // calculate s^2
-          for (j1=0; j1<NG; j1++) {
-            for (j2=0; j2<NG; j2++) {
-              L2_tmp += sources(isrc, j1) * sources(isrc, j2) *
-                  greens_greens(ista,ic,itpad,j1,j2);
-            }
-          }
-
-          // calculate d^2
-          L2_tmp += data_data(ista,ic);
-
-          // calculate sd
-          for (ig=0; ig<NG; ig++) {
-            L2_tmp -= 2.*greens_data(ista,ic,ig,itpad) * sources(isrc, ig); 
-          }
-
-          if (hybrid_norm==0) {
-              // L2 norm
-              L2_sum += dt * weights(ista,ic) * L2_tmp;
-          }
-          else {
-              // hybrid L1-L2 norm
-              L2_sum += dt * weights(ista,ic) * pow(L2_tmp, 0.5);
-          }
-        }
-
-      }
-    }
-    results(isrc) = L2_sum;
-
+  Py_END_ALLOW_THREADS
+
+  if (status != 0) {
+    Py_DECREF(results);
+    return PyErr_NoMemory();
   }
+
   return results;
 
 }
@@ -0,0 +1,198 @@
+//
+// L2 misfit kernel
+//
+// This file is included once for each supported floating-point precision by
+// c_ext_L2.c, which defines the following before each inclusion:
+//
+//   real_t  -  floating-point type of the cross-correlation and source arrays
+//   KERNEL  -  name of the resulting function
+//
+// Green's function cross-correlation arrays may contain several origins,
+// stacked along the station axis, in which case a separate misfit value is
+// returned for each origin (data and weights are shared by all origins).
+//
+// Returns 0 on success and -1 if scratch memory could not be allocated.
+// Does not call the Python C API, so can be run without holding the GIL.
+//
+
+static int KERNEL(
+    PyArrayObject *data_data,
+    PyArrayObject *greens_data,
+    PyArrayObject *greens_greens,
+    PyArrayObject *sources,
+    PyArrayObject *groups,
+    PyArrayObject *weights,
+    PyArrayObject *results,
+    int hybrid_norm,
+    npy_float64 dt,
+    int NSRC, int NSTA, int NC, int NG, int NGRP, int NPAD, int NORIGIN,
+    int nthreads,
+    int debug_level,
+    progress_t *progress) {
+
+  int isrc;
+  real_t *cc_all;
+
+  // each thread gets its own cross-correlation scratch array
+  cc_all = (real_t*) malloc((size_t)nthreads*NPAD*sizeof(real_t));
+  if (cc_all == NULL) {
+    return -1;
+  }
+
+  //
+  // Iterate over sources
+  //
+
+  #pragma omp parallel for num_threads(nthreads) schedule(dynamic,64)
+  for(isrc=0; isrc<NSRC; ++isrc) {
+
+    int iori, ista, jsta, ic, ig, igrp, it, itpad, j1, j2, cc_argmax, ithread;
+    real_t cc_max, L2_tmp;
+    npy_float64 L2_sum;
+    real_t *cc;
+    float iter_now;
+
+#ifdef _OPENMP
+    ithread = omp_get_thread_num();
+#else
+    ithread = 0;
+#endif
+    cc = cc_all + (size_t)ithread*NPAD;
+
+
+    // display progress message (only the first thread writes to stdout, so
+    // messages remain ordered even when running in parallel)
+    #pragma omp atomic capture
+    {iter_now = progress->iter; progress->iter += NORIGIN;}
+
+    if (ithread==0 && iter_now >= progress->next_iter) {
+        printf("  about %d percent finished\n",
+            progress->msg_percent*progress->msg_count);
+        progress->msg_count += 1;
+        progress->next_iter = progress->msg_count*progress->msg_interval;
+    }
+
+
+    for (iori=0; iori<NORIGIN; iori++) {
+
+    L2_sum = (npy_float64) 0.;
+
+    for (ista=0; ista<NSTA; ista++) {
+
+      // index along the stacked station axis of the Green's function arrays
+      jsta = iori*NSTA + ista;
+
+      for (igrp=0; igrp<NGRP; igrp++) {
+
+        /*
+
+        Finds the shift between data and synthetics that yields the maximum
+        cross-correlation value across all components in the given component 
+        group, subject to the (time_shift_min, time_shift_max) constraint
+
+        */
+
+        for (it=0; it<NPAD; it++) {
+          cc[it] = (real_t) 0.;
+        }
+
+        for (ic=0; ic<NC; ic++) {
+
+          // Skip components not in the component group being considered
+          if (((int) groups(igrp,ic))==0) {
+            continue;
+           }
+
+          // Skip traces that have been assigned zero weight
+          if (((int) weights(ista,ic))==0) {
+              if (debug_level>1) {
+                if (isrc==0) {
+                  printf(" skipping trace: %d %d\n", ista, ic);
+                }
+              }
+              continue;
+           }
+
+          // Sum cross-correlations of all components being considered
+          for (ig=0; ig<NG; ig++) {
+            for (it=0; it<NPAD; it++) {
+                cc[it] += greens_data(jsta,ic,ig,it) * sources(isrc,ig);
+            }
+          }
+        }
+        cc_max = -NPY_INFINITY;
+        cc_argmax = 0;
+        for (it=0; it<NPAD; it++) {
+          if (cc[it] > cc_max) {
+            cc_max = cc[it];
+            cc_argmax= it;
+          }
+        }
+        itpad = cc_argmax;
+
+
+        /*
+
+        Calculates L2 norm of difference between data and synthetics
+        for all components in the given component group
+
+        Rather than storing (s - d) directly for all time samples, we use a
+        computational shortcut based on
+
+        ||s - d||^2 = s^2 + d^2 - 2sd
+
+        */
+        for (ic=0; ic<NC; ic++) {
+          L2_tmp = 0.;
+
+          // Skip components not in the component group being considered
+          if (((int) groups(igrp,ic))==0) {
+            continue;
+          } 
+
+          // Skip traces that have been assigned zero weight
+          if (((int) weights(ista,ic))==0) {
+              continue;
+          }
+
+          // calculate s^2
+          for (j1=0; j1<NG; j1++) {
+            for (j2=0; j2<NG; j2++) {
+              L2_tmp += sources(isrc, j1) * sources(isrc, j2) *
+                  greens_greens(jsta,ic,itpad,j1,j2);
+            }
+          }
+
+          // calculate d^2
+          L2_tmp += data_data(ista,ic);
+
+          // calculate sd
+          for (ig=0; ig<NG; ig++) {
+            L2_tmp -= 2.*greens_data(jsta,ic,ig,itpad) * sources(isrc, ig); 
+          }
+
+          if (hybrid_norm==0) {
+              // L2 norm
+              L2_sum += dt * weights(ista,ic) * L2_tmp;
+          }
+          else {
+              // hybrid L1-L2 norm (roundoff can make L2_tmp slightly
+              // negative, especially in single precision)
+              if (L2_tmp < 0) L2_tmp = 0;
+              L2_sum += dt * weights(ista,ic) * pow(L2_tmp, 0.5);
+          }
+        }
+
+      }
+    }
+    results(isrc,iori) = L2_sum;
+
+    }
+
+  }
+
+  free(cc_all);
+
+  return 0;
+
+}
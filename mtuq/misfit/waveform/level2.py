@@ -6,53 +6,68 @@ See ``mtuq/misfit/waveform/__init__.py`` for more information
 
 import numpy as np
 import time
+import weakref
+from collections import OrderedDict
 from copy import deepcopy
-from mtuq.misfit.waveform.level1 import correlate
+from numpy.lib.stride_tricks import sliding_window_view
 from mtuq.util.math import to_mij, to_rtp
 from mtuq.util.signal import get_components, get_time_sampling
 from mtuq.misfit.waveform import c_ext_L2
+from scipy.fft import next_fast_len, rfft, irfft
 
 
 def misfit(data, greens, sources, norm, time_shift_groups,
-    time_shift_min, time_shift_max, msg_handle, debug_level=0):
+    time_shift_min, time_shift_max, msg_handle, num_threads=1, block_size=None,
+    precision='float64', cache=None, origins=None, debug_level=0):
     """
     Data misfit function (fast Python/C version)
 
     See ``mtuq/misfit/waveform/__init__.py`` for more information
+
+    If a list of ``origins`` is given, ``greens`` must contain Green's tensors
+    for each origin, and misfit is evaluated for all origins in a single pass,
+    returning an array of shape `(len(sources), len(origins))`
     """
+    # floating-point type of the cross-correlation arrays passed to the misfit
+    # kernel (correlations themselves are always accumulated in float64)
+    dtype = np.dtype(precision)
+
     #
     # collect metadata
     #
     nt, dt = _get_time_sampling(data)
     stations = _get_stations(data)
     components = _get_components(data)
-
-
-    # which components are absent from the data (boolean array)?
-    mask = _get_mask(data, stations, components)
+    padding = _get_padding(time_shift_min, time_shift_max, dt)
 
     # which components will be used to determine time shifts (boolean array)?
     groups = _get_groups(time_shift_groups, components)
 
+    sources = _to_array(sources)
+
 
     #
-    # collapse main structures into NumPy arrays
+    # collapse main structures into NumPy arrays and cross-correlate data and
+    # synthetics (or, if possible, reuse previously computed correlations)
     #
-    data = _get_data(data, stations, components)
-    greens = _get_greens(greens, stations, components)
-    sources = _to_array(sources)
+    if cache is not None:
+        key = _get_key(data, greens, padding, components, dtype, origins)
+        arrays = cache.get(key)
+    else:
+        arrays = None
 
-    # sanity checks
-    _check(data, greens, sources)
+    if arrays is None:
+        arrays = _precompute(
+            data, greens, sources, stations, components, padding, dtype,
+            origins)
 
+        if cache is not None:
+            cache.put(key, arrays, list(data)+list(greens)+list(origins or []))
 
-    #
-    # cross-correlate data and synthetics
-    #
-    padding = _get_padding(time_shift_min, time_shift_max, dt)
-    data_data = _autocorr_1(data)
-    greens_greens = _autocorr_2(greens, padding)
-    greens_data = _corr_1_2(data, greens, padding)
+    mask, data_data, greens_data, greens_greens, scale = arrays
+
+    # Green's functions may have been rescaled, see _precompute
+    sources = (sources/scale).astype(dtype)
 
     if norm=='hybrid':
         hybrid_norm = 1
@@ -74,21 +89,299 @@ def misfit(data, greens, sources, norm, time_shift_groups,
 
     start_time = time.time()
 
-    if norm in ['L2', 'hybrid']:
+    # values less than one tell the C extension to use the OpenMP default
+    if num_threads is None:
+        num_threads = 0
+
+    if norm in ['L2', 'hybrid'] and block_size:
+        results = _misfit_blocked(
+           data_data, greens_data, greens_greens, sources, groups, mask,
+           hybrid_norm, dt, block_size, msg_handle)
+
+    elif norm in ['L2', 'hybrid']:
         results = c_ext_L2.misfit(
            data_data, greens_data, greens_greens, sources, groups, mask,
-           hybrid_norm, dt, padding[0], padding[1], debug_level, *msg_args)
+           hybrid_norm, dt, padding[0], padding[1], debug_level, *msg_args,
+           num_threads)
 
     elif norm in ['L1']:
         raise NotImplementedError
 
     if debug_level > 0:
-      print('  Elapsed time (C extension) (s): %f' % \
+      print('  Elapsed time (misfit kernel) (s): %f' % \
           (time.time() - start_time))
 
     return results
 
 
+def _misfit_blocked(data_data, greens_data, greens_greens, sources, groups,
+    mask, hybrid_norm, dt, block_size, msg_handle):
+    """ Evaluates misfit over blocks of sources using matrix products
+
+    Mathematically equivalent to the C extension, but rather than looping
+    over sources one at a time, each block of sources is handled by a few
+    large matrix products, so that performance scales with the underlying
+    BLAS library
+    """
+    Nrows, Ncomponents, Ngreens, Npad = greens_data.shape
+    Nsources = sources.shape[0]
+    Ngroups = groups.shape[0]
+
+    # Green's functions for several origins may be stacked along the station
+    # axis, while data and mask are shared by all origins
+    Nstations = mask.shape[0]
+    Norigins = Nrows//Nstations
+
+    # the quadratic form sources*greens_greens*sources only depends on the
+    # upper triangle of the symmetric greens_greens matrix
+    i1, i2 = np.triu_indices(Ngreens)
+    coef = np.where(i1==i2, 1., 2.)
+
+    # (Nstations*Ncomponents*Npad, Ngreens)
+    gd = np.ascontiguousarray(greens_data.transpose(0, 1, 3, 2)).reshape(
+        -1, Ngreens)
+
+    # (Nstations, Ncomponents, Npad, Ngreens*(Ngreens+1)/2)
+    gg = np.ascontiguousarray(greens_greens[..., i1, i2]*coef)
+
+    ista = np.arange(Nrows)[:, np.newaxis]
+
+    mask_all = np.tile(mask, (Norigins, 1))
+    data_data_all = np.tile(data_data, (Norigins, 1))
+
+    results = np.zeros((Nsources, Norigins))
+
+    for start in range(0, Nsources, block_size):
+        stop = min(start+block_size, Nsources)
+        block = sources[start:stop]
+        nb = stop - start
+
+        # cross-correlation between data and synthetics for all time shifts
+        # (Nrows, Ncomponents, Npad, nb)
+        sd = np.dot(gd, block.T).reshape(
+            Nrows, Ncomponents, Npad, nb)
+
+        # (nb, Ngreens*(Ngreens+1)/2)
+        outer = block[:, i1]*block[:, i2]
+
+        values = np.zeros((Norigins, nb))
+
+        for _i in range(Ngroups):
+            # which components contribute to this group at each station?
+            weights = mask_all*groups[_i]
+
+            # time shifts that maximize summed cross-correlation within the
+            # group, subject to time shift constraints
+            cc = np.einsum('ij,ijkl->ikl', weights, sd)
+            itpad = cc.argmax(axis=1)
+
+            for _j in range(Ncomponents):
+                if groups[_i, _j]==0:
+                    continue
+
+                # synthetics autocorrelation, evaluated only at the chosen 
+                # time shifts
+                ss = np.einsum('ijk,jk->ij', gg[ista, _j, itpad], outer)
+
+                # ||s - d||^2 = s^2 + d^2 - 2sd
+                L2 = ss - 2.*np.take_along_axis(
+                    sd[:, _j], itpad[:, np.newaxis, :], axis=1)[:, 0, :]
+                L2 += data_data_all[:, _j, np.newaxis]
+
+                if hybrid_norm:
+                    L2 = np.sqrt(np.maximum(L2, 0.))
+
+                for _k in range(Norigins):
+                    rows = L2[_k*Nstations:(_k+1)*Nstations]
+                    values[_k] += dt*np.sum(rows[mask[:, _j] != 0], axis=0)
+
+        results[start:stop, :] = values.T
+
+        # optional progress messages
+        msg_handle(nb*Norigins)
+
+    return results
+
+
+def _precompute(data, greens, sources, stations, components, padding,
+    dtype=np.float64, origins=None):
+    """ Collapses data and Green's functions into NumPy arrays and 
+    cross-correlates them
+
+    Returns the mask, the three cross-correlation arrays passed to the misfit
+    kernel, and the factor by which Green's functions were rescaled
+
+    If ``origins`` are given, Green's function arrays for each origin are 
+    stacked along the station axis in the same order as ``origins``
+    """
+    # which components are absent from the data (boolean array)?
+    mask = _get_mask(data, stations, components)
+
+    data = _get_data(data, stations, components, dtype)
+
+    if origins is None:
+        greens = [_get_greens(greens, stations, components, dtype)]
+    else:
+        greens = [_get_greens(greens.select(origin), stations, components,
+            dtype) for origin in origins]
+
+    if dtype==np.float32:
+        # squared source weights can exceed the single precision range, so 
+        # we rescale Green's functions and sources by reciprocal powers of two
+        # (leaving synthetics, and therefore misfit values, unchanged)
+        scale = min([_get_scale(array) for array in greens])
+        for array in greens:
+            array *= scale
+    else:
+        scale = 1.
+
+    # sanity checks
+    for array in greens:
+        _check(data, array, sources)
+
+    data_data = _autocorr_1(data, dtype)
+    greens_greens = _stack(
+        [_autocorr_2(array, padding, dtype) for array in greens])
+    greens_data = _stack(
+        [_corr_1_2(data, array, padding, dtype) for array in greens])
+
+    return mask, data_data, greens_data, greens_greens, scale
+
+
+def precompute_shared(data, greens, time_shift_min, time_shift_max, cache,
+    comm, precision='float64', origins=None):
+    """ Computes cross-correlation arrays once per node and stores them in
+    MPI-3 shared memory
+
+    Collective over `comm`.  On each node, the first process collapses data
+    and Green's functions into NumPy arrays and cross-correlates them; the
+    results are then placed in a shared memory window and added to `cache`
+    on every process of the node, so that subsequent calls to `misfit` with
+    the same arguments (and same `cache`) reuse the shared arrays without
+    further communication
+
+    Returns the cached arrays
+    """
+    from mpi4py import MPI
+    from mtuq.util import shared_arrays
+
+    dtype = np.dtype(precision)
+
+    nt, dt = _get_time_sampling(data)
+    stations = _get_stations(data)
+    components = _get_components(data)
+    padding = _get_padding(time_shift_min, time_shift_max, dt)
+
+    node = comm.Split_type(MPI.COMM_TYPE_SHARED)
+
+    if node.rank == 0:
+        arrays = _precompute(
+            data, greens, None, stations, components, padding, dtype,
+            origins)
+    else:
+        arrays = None
+
+    scale = node.bcast(arrays[-1] if node.rank == 0 else None, root=0)
+    arrays = shared_arrays(node, arrays[:-1] if node.rank == 0 else None)
+    arrays = tuple(arrays) + (scale,)
+
+    node.Free()
+
+    key = _get_key(data, greens, padding, components, dtype, origins)
+    cache.put(key, arrays, list(data)+list(greens)+list(origins or []))
+
+    return arrays
+
+
+class Cache(object):
+    """ Cache for ``level2`` cross-correlation arrays
+
+    Repeated misfit evaluations with the same data and Green's functions
+    (for example, over successive source grids at the same origin) can skip 
+    the cross-correlation step by reusing arrays stored here.
+
+    Entries are keyed on the identity of the individual data streams and 
+    Green's tensors, together with time-shift padding, components and
+    precision.  Streams and tensors are assumed not to change in place 
+    between evaluations; if they are modified, `clear` must be called.
+
+    Least recently used entries are evicted once the total size of stored
+    arrays would exceed ``max_bytes``.
+    """
+
+    def __init__(self, max_bytes=2**30):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries = OrderedDict()
+
+
+    def get(self, key):
+        """ Returns cached arrays, or `None` if not found
+        """
+        self._purge()
+
+        if key not in self._entries:
+            return None
+
+        self._entries.move_to_end(key)
+        return self._entries[key][0]
+
+
+    def put(self, key, arrays, objects):
+        """ Stores arrays computed from the given streams and tensors
+        """
+        nbytes = sum([array.nbytes for array in arrays
+            if isinstance(array, np.ndarray)])
+
+        if nbytes > self.max_bytes:
+            return
+
+        self._purge()
+
+        if key in self._entries:
+            self._remove(key)
+
+        while self.nbytes + nbytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+        # stored arrays are shared between evaluations, so must not be 
+        # modified
+        for array in arrays:
+            if isinstance(array, np.ndarray):
+                array.flags.writeable = False
+
+        # weak references let us detect when a stream or tensor has been 
+        # garbage collected, after which its id may be reused
+        refs = [weakref.ref(obj) for obj in objects]
+
+        self._entries[key] = (arrays, refs, nbytes)
+        self.nbytes += nbytes
+
+
+    def clear(self):
+        """ Removes all entries
+        """
+        self._entries.clear()
+        self.nbytes = 0
+
+
+    def __len__(self):
+        return len(self._entries)
+
+
+    def _remove(self, key):
+        _, _, nbytes = self._entries.pop(key)
+        self.nbytes -= nbytes
+
+
+    def _purge(self):
+        # removes entries whose streams or tensors no longer exist
+        for key in list(self._entries.keys()):
+            _, refs, _ = self._entries[key]
+            if any([ref() is None for ref in refs]):
+                self._remove(key)
+
+
 #
 # utility functions
 #
@@ -99,13 +392,42 @@ def _get_time_sampling(dataset):
             return get_time_sampling(stream)
 
 
+def _get_scale(greens):
+    # power of two that brings Green's function amplitudes close to one
+    max_abs = np.abs(greens).max()
+    if max_abs==0. or not np.isfinite(max_abs):
+        return 1.
+    return 2.**-np.round(np.log2(max_abs))
+
+
+def _get_key(data, greens, padding, components, dtype, origins=None):
+    # cache key based on the identity of the individual streams and tensors
+    # (rather than the containers, which are often recreated by `select`)
+    return (
+        tuple([id(stream) for stream in data]),
+        tuple([id(tensor) for tensor in greens]),
+        tuple(padding),
+        tuple(components),
+        np.dtype(dtype).str,
+        tuple([id(origin) for origin in origins or []]),
+        )
+
+
+def _stack(arrays):
+    # stacks arrays along the station axis, avoiding a copy in the common
+    # single-origin case
+    if len(arrays)==1:
+        return arrays[0]
+    return np.concatenate(arrays, axis=0)
+
+
 def _get_padding(time_shift_min, time_shift_max, dt):
     padding_left = int(round(+time_shift_max/dt))
     padding_right = int(round(-time_shift_min/dt))
     return [padding_left, padding_right]
 
 
-def _get_greens(greens, stations, components):
+def _get_greens(greens, stations, components, dtype=np.float64):
     Ncomponents = len(components)
     Nstations = len(stations)
     Npts = len(greens[0][0])
@@ -121,7 +443,7 @@ def _get_greens(greens, stations, components):
         Ncomponents,
         Ngreens,
         Npts,
-        ))
+        ), dtype=dtype)
 
     for _i, station in enumerate(stations):
         tensor = greens.select(station)[0]
@@ -133,7 +455,7 @@ def _get_greens(greens, stations, components):
     return array
 
 
-def _get_data(data, stations, components):
+def _get_data(data, stations, components, dtype=np.float64):
     # Collects numeric trace data from all streams as a single NumPy array;
     # compared with iterating over streams and traces, provides a potentially
     # faster way of accessing numeric trace data
@@ -143,22 +465,7 @@ def _get_data(data, stations, components):
     #    Requires that all streams have the same time discretization
     #    (or else an error is raised)
 
-    nt, dt = _get_time_sampling(data)
-
-    ns = len(stations)
-    nc = len(components)
-    array = np.zeros((ns, nc, nt))
-
-    for _i, station in enumerate(stations):
-        stream = data.select(station)[0]
-        for _j, component in enumerate(components):
-            try:
-                trace = stream.select(component=component)[0]
-            except:
-                continue
-            array[_i, _j, :] = trace.data
-
-    return array
+    return data.to_array(stations, components, dtype=dtype)
 
 
 
@@ -180,22 +487,10 @@ def _get_components(data):
 
 
 def _get_mask(data, stations, components):
-    Ncomponents = len(components)
-    Nstations = len(stations)
+    traces = data._select_traces(stations, components)
 
-    mask = np.ones((
-        Nstations,
-        Ncomponents, 
-        ))
-
-    for _i, station in enumerate(stations):
-        for _j, component in enumerate(components):
-
-            stream = data.select(station)[0]
-            stream = stream.select(component=component)
-
-            if len(stream)==0:
-                mask[_i, _j] = 0.
+    mask = np.array([[float(trace is not None) for trace in row]
+        for row in traces]).reshape(len(stations), len(components))
 
     return mask
 
@@ -243,7 +538,7 @@ def _check(data, greens, sources):
         print()
         raise TypeError('Inconsistent shape')
 
-    if greens.shape[2] != sources.shape[1]:
+    if sources is not None and greens.shape[2] != sources.shape[1]:
         print()
         print('Number of Green''s functions in linear combination: %d' % greens.shape[2])
         print('Number of weights in linear combination: %d' % sources.shape[1])
@@ -251,24 +546,27 @@ def _check(data, greens, sources):
 
 
 def _to_array(sources):
-    dims = sources.dims
-    df = sources.to_dataframe()
+    dims = list(sources.dims)
+    array = sources.to_array()
+
+    def _get(dim):
+        return np.ascontiguousarray(array[:, dims.index(dim)])
 
     if _type(dims)=='MomentTensor':
         return np.ascontiguousarray(to_mij(
-            df['rho'].to_numpy(),
-            df['v'].to_numpy(),
-            df['w'].to_numpy(),
-            df['kappa'].to_numpy(),
-            df['sigma'].to_numpy(),
-            df['h'].to_numpy(),
+            _get('rho'),
+            _get('v'),
+            _get('w'),
+            _get('kappa'),
+            _get('sigma'),
+            _get('h'),
             ))
 
     elif _type(dims)=='Force':
         return np.ascontiguousarray(to_rtp(
-            df['F0'].to_numpy(),
-            df['phi'].to_numpy(),
-            df['h'].to_numpy(),
+            _get('F0'),
+            _get('phi'),
+            _get('h'),
             ))
 
 
@@ -294,48 +592,60 @@ def _type(dims):
 # cross-correlation utilities
 #
 
-def _corr_1_2(data, greens, padding):
+def _corr_1_2(data, greens, padding, dtype=np.float64):
     # correlates 1D and 2D data structures
     Ncomponents = greens.shape[1]
     Nstations = greens.shape[0]
     Ngreens = greens.shape[2]
+    Npts = greens.shape[3]
+    Npad = padding[0]+padding[1]+1
+
+    data = data.astype(np.float64, copy=False)
+    greens = greens.astype(np.float64, copy=False)
 
     corr = np.zeros((
         Nstations,
         Ncomponents,
         Ngreens,
-        padding[0]+padding[1]+1,
-        ))
+        Npad,
+        ), dtype=dtype)
+
+    if Npad>200:
+        # for long time-shift windows, frequency-domain correlation is faster;
+        # all traces are transformed in a single batched call
+        nfft = next_fast_len(Npts, real=True)
+        greens_fft = rfft(greens, nfft, axis=-1)
+        data_fft = rfft(data, nfft, axis=-1)
+        corr[...] = irfft(
+            greens_fft*np.conj(data_fft)[:, :, np.newaxis, :],
+            nfft, axis=-1)[..., :Npad]
+
+    elif Npad*(Npts-Npad+1) <= 8000:
+        # for short traces, the cost of correlating one trace at a time is
+        # mostly call overhead, so all traces are correlated at once over
+        # sliding windows of the Green's functions
+        windows = sliding_window_view(greens, Npts-Npad+1, axis=-1)
+        corr[...] = np.einsum('ijklm,ijm->ijkl', windows, data)
 
-    for _i in range(Nstations):
-        for _j in range(Ncomponents):
-            for _k in range(Ngreens):
-
-                corr[_i, _j, _k, :] = correlate(
-                    greens[_i, _j, _k, :], data[_i, _j, :])
+    else:
+        # for short time-shift windows, time-domain correlation is faster
+        corr = corr.reshape(-1, Npad)
+        for _i, (_greens, _data) in enumerate(zip(
+            greens.reshape(-1, Npts),
+            np.repeat(data.reshape(-1, data.shape[-1]), Ngreens, axis=0))):
+            corr[_i] = np.correlate(_greens, _data, 'valid')
+        corr = corr.reshape(Nstations, Ncomponents, Ngreens, Npad)
 
     return corr
 
 
-def _autocorr_1(data):
+def _autocorr_1(data, dtype=np.float64):
     # autocorrelates 1D data strucutres (reduces to dot product)
-    Ncomponents = data.shape[1]
-    Nstations = data.shape[0]
-
-    corr = np.zeros((
-        Nstations,
-        Ncomponents,
-        ))
+    data = data.astype(np.float64, copy=False)
+    return np.einsum('ijk,ijk->ij', data, data).astype(dtype)
 
-    for _i in range(Nstations):
-        for _j in range(Ncomponents):
-            corr[_i, _j] = np.dot(
-                data[_i, _j, :], data[_i, _j, :])
 
-    return corr
-
-
-def _autocorr_2(greens, padding):
+def _autocorr_2(greens, padding, dtype=np.float64):
     # autocorrelates 2D data structures
 
     Ncomponents = greens.shape[1]
@@ -343,30 +653,37 @@ def _autocorr_2(greens, padding):
     Ngreens = greens.shape[2]
     Npts = greens.shape[3]
 
-    ones = np.pad(np.ones(Npts), 
-        (padding[0], padding[1]), 'constant')
-
     corr = np.zeros((
         Nstations,
         Ncomponents, 
         padding[0]+padding[1]+1, 
         Ngreens, 
         Ngreens,
-        ))
+        ), dtype=dtype)
 
-    for _i in range(Nstations):
-        for _j in range(Ncomponents):
-            for _k1 in range(Ngreens):
-                for _k2 in range(Ngreens):
+    # correlating the product of two Green's functions with a zero-padded 
+    # boxcar reduces to summing the product over a sliding window, which we
+    # evaluate for all time shifts from cumulative sums
+    shifts = np.arange(padding[0]+padding[1]+1)
+    stop = np.minimum(Npts, Npts-padding[1]+shifts)
+    start = np.maximum(0, shifts-padding[1])
 
-                    if _k1<=_k2:
-                        corr[_i, _j, :, _k1, _k2] = correlate(
-                            greens[_i, _j, _k1, :]*greens[_i, _j, _k2, :],
-                            ones)
+    # only the upper triangle needs to be computed because of symmetry
+    i1, i2 = np.triu_indices(Ngreens)
 
-                    else:
-                        corr[_i, _j, :, _k1, _k2] = corr[_i, _j, :, _k2, _k1]
+    # looping over stations keeps temporary arrays small
+    for _i in range(Nstations):
+        array = greens[_i].astype(np.float64, copy=False)
 
-    return corr
+        # (Ncomponents, Ngreens*(Ngreens+1)/2, Npts+1)
+        cumsum = np.zeros((Ncomponents, len(i1), Npts+1))
+        np.cumsum(array[:, i1, :]*array[:, i2, :], axis=-1,
+            out=cumsum[:, :, 1:])
 
+        # (Ncomponents, Npad, Ngreens*(Ngreens+1)/2)
+        sums = (cumsum[:, :, stop] - cumsum[:, :, start]).transpose(0, 2, 1)
 
+        corr[_i][:, :, i1, i2] = sums
+        corr[_i][:, :, i2, i1] = sums
+
+    return corr
@@ -109,3 +109,16 @@ class Station(AttribDict):
             self.__dict__['endtime'] = self.starttime
 
 
+
+
+    def _key(self):
+        # hashable summary of the fields that usually distinguish stations;
+        # equal stations have equal keys, but stations with equal keys can
+        # still differ in other fields
+        return (
+            self.get('network'),
+            self.get('station'),
+            self.get('location'),
+            self.get('latitude'),
+            self.get('longitude'),
+            )
@@ -87,6 +87,124 @@ def gather2(comm, array):
         return
 
 
+def bcast2(comm, obj, root=0):
+    """ Broadcasts Python object containing NumPy arrays
+
+    For objects holding large amounts of numeric data, such as a `Dataset` or
+    `GreensTensorList`, provides improved performance over `bcast` by
+    sending array contents as a single raw buffer, using the lower-level
+    function `Bcast`, separately from a small pickle of everything else.
+    Received arrays are views into the buffer, so are not copied again
+    """
+    import pickle
+
+    if pickle.HIGHEST_PROTOCOL < 5:
+        # out-of-band buffers require Python 3.8 or later
+        return comm.bcast(obj, root=root)
+
+    if comm.rank == root:
+        buffers = []
+        header = pickle.dumps(obj, protocol=5,
+            buffer_callback=buffers.append)
+        buffers = [buffer.raw() for buffer in buffers]
+        sizes = [buffer.nbytes for buffer in buffers]
+    else:
+        header, sizes = None, None
+
+    header, sizes = comm.bcast((header, sizes), root=root)
+
+    # array contents are sent all at once, padded so that received arrays
+    # are aligned
+    offsets = np.cumsum([0]+[_ALIGN*int(ceil(size/_ALIGN)) for size in sizes])
+    data = np.empty(offsets[-1], dtype=np.uint8)
+
+    if comm.rank == root:
+        for buffer, start, size in zip(buffers, offsets, sizes):
+            data[start:start+size] = np.frombuffer(buffer, dtype=np.uint8)
+
+    # message sizes are limited by the range of a C int
+    for start in range(0, len(data), _MAX_MESSAGE):
+        comm.Bcast(data[start:start+_MAX_MESSAGE], root=root)
+
+    if comm.rank == root:
+        return obj
+
+    buffers = [data[start:start+size] for start, size in
+        zip(offsets, sizes)]
+
+    return pickle.loads(header, buffers=buffers)
+
+
+_ALIGN = 64
+_MAX_MESSAGE = 2**30
+
+
+def shared_arrays(comm, arrays=None):
+    """ Copies NumPy arrays into MPI-3 shared memory
+
+    Collective over `comm`, which must be a shared memory communicator
+    (see ``MPI.Comm.Split_type``).  Arrays are supplied by process 0 and
+    ignored on other processes.  Returns read-only views of the shared
+    copies on all processes, so that only one copy per node is held in
+    memory
+
+    .. note ::
+
+        Shared memory remains allocated until `free_shared_arrays` is
+        called or the MPI environment is finalized
+
+    """
+    from mpi4py import MPI
+
+    if comm.rank == 0:
+        header = [(array.shape, array.dtype.str) for array in arrays]
+    else:
+        header = None
+    header = comm.bcast(header, root=0)
+
+    shared = []
+    for _i, (shape, dtype) in enumerate(header):
+        dtype = np.dtype(dtype)
+        nbytes = int(np.prod(shape))*dtype.itemsize
+
+        # memory is allocated by process 0 and mapped by the others
+        win = MPI.Win.Allocate_shared(
+            nbytes if comm.rank == 0 else 0, dtype.itemsize, comm=comm)
+
+        buf, _ = win.Shared_query(0)
+        array = np.ndarray(shape, dtype=dtype, buffer=buf)
+        _windows[id(array)] = (win, array)
+
+        if comm.rank == 0:
+            array[...] = arrays[_i]
+
+        shared += [array]
+
+    # other processes must not read before process 0 has finished writing
+    comm.Barrier()
+
+    for array in shared:
+        array.flags.writeable = False
+
+    return shared
+
+
+def free_shared_arrays(arrays):
+    """ Frees MPI-3 shared memory allocated by `shared_arrays`
+
+    Collective over the communicator passed to `shared_arrays`.  The arrays
+    must not be used afterwards, so any references to them (for example,
+    in a ``level2`` cache) should be discarded first
+    """
+    for array in arrays:
+        win, _ = _windows.pop(id(array))
+        win.Free()
+
+
+# keeps shared memory windows from being garbage collected, until freed
+_windows = {}
+
+
 def is_mpi_env():
     try:
         import mpi4py
@@ -323,17 +441,22 @@ class ProgressCallback(object):
         self.stop = stop
         self.percent = percent
         self.msg_interval = percent/100.*stop
-        self.msg_count = int(100./percent*start/stop)
+        self.msg_count = int(ceil(100./percent*start/stop))
         self.iter = start
         self.next_iter = self.msg_count * self.msg_interval
 
 
-    def __call__(self):
+    def __call__(self, count=1):
+        # count is the number of iterations completed since the last call
         if self.iter >= self.next_iter:
+            # after several iterations at once, only the most recent of the
+            # messages due is displayed
+            while (self.msg_count+1) * self.msg_interval <= self.iter:
+                self.msg_count += 1
             print("  about %d percent finished" % (self.msg_count*self.percent))
             self.msg_count += 1
             self.next_iter = self.msg_count * self.msg_interval
-        self.iter += 1
+        self.iter += count
 
 
 def dataarray_idxmin(da):
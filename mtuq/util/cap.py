@@ -209,17 +209,19 @@ def cap_rise_time(Mw):
 
 def taper(array, taper_fraction=0.3, inplace=True):
     """ Reproduces CAP taper behavior. Similar to obspy Tukey?
+
+    (Multidimensional arrays are tapered along the last axis)
     """
     if inplace:
         array = array
     else:
         array = np.copy(array)
     f = taper_fraction
-    M = int(round(f*len(array)))
+    M = int(round(f*array.shape[-1]))
     I = np.linspace(0.,1.,M)
     taper = 0.5*(1-np.cos(np.pi*I))
-    array[:M] *= taper
-    array[-1:-M-1:-1] *= taper
+    array[..., :M] *= taper
+    array[..., -1:-M-1:-1] *= taper
     if not inplace:
         return array
 
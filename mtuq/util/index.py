@@ -0,0 +1,121 @@
+
+
+class IndexedListMixin(object):
+    """ Indexes list items by station and origin
+
+    Mixin for list subclasses whose items have `station` and `origin`
+    attributes (see ``mtuq.Dataset`` and ``mtuq.GreensTensorList``), so that
+    selecting items by station or origin need not compare every item
+
+    .. rubric :: Usage
+
+    .. code::
+
+        class Container(IndexedListMixin, list):
+            def append(self, item):
+                super(Container, self).append(item)
+                if getattr(self, '_index', None) is not None:
+                    self._index_add(item)
+
+    .. note::
+
+        The index is built lazily by `_get_index`, updated by `append` as
+        above, and rebuilt after other list operations, but not if the
+        station or origin attributes of items already in the list are
+        modified in place.  Subclasses look up items using
+        `_get_candidates`, which falls back to all items if some lack
+        metadata that can be indexed.
+
+    """
+
+    def _get_index(self):
+        # lazily builds a hash index mapping station and origin keys to
+        # items, in list order
+        if getattr(self, '_index', None) is None:
+            self._index = {'station': {}, 'origin': {}}
+            for item in self:
+                self._index_add(item)
+        return self._index
+
+
+    def _get_candidates(self, attr, selector):
+        # returns items that may match the given station or origin selector,
+        # in list order, for callers to narrow down by comparison
+        index = self._get_index()[attr]
+        if None in index:
+            # items lacking metadata of the expected type can only be
+            # matched by comparison, so all items are candidates
+            return list(self)
+        return index.get(selector._key(), [])
+
+
+    def _index_add(self, item):
+        for attr in ('station', 'origin'):
+            try:
+                key = getattr(item, attr)._key()
+            except AttributeError:
+                # see `_get_candidates`
+                key = None
+            self._index[attr].setdefault(key, []).append(item)
+
+
+    def _invalidate_index(self):
+        self._index = None
+
+
+    # any list operation other than `append` invalidates the index
+    def __setitem__(self, *args):
+        super(IndexedListMixin, self).__setitem__(*args)
+        self._invalidate_index()
+
+    def __delitem__(self, *args):
+        super(IndexedListMixin, self).__delitem__(*args)
+        self._invalidate_index()
+
+    def __iadd__(self, *args):
+        result = super(IndexedListMixin, self).__iadd__(*args)
+        self._invalidate_index()
+        return result
+
+    def __imul__(self, *args):
+        result = super(IndexedListMixin, self).__imul__(*args)
+        self._invalidate_index()
+        return result
+
+    def extend(self, *args):
+        super(IndexedListMixin, self).extend(*args)
+        self._invalidate_index()
+
+    def insert(self, *args):
+        super(IndexedListMixin, self).insert(*args)
+        self._invalidate_index()
+
+    def remove(self, *args):
+        super(IndexedListMixin, self).remove(*args)
+        self._invalidate_index()
+
+    def pop(self, *args):
+        result = super(IndexedListMixin, self).pop(*args)
+        self._invalidate_index()
+        return result
+
+    def clear(self):
+        super(IndexedListMixin, self).clear()
+        self._invalidate_index()
+
+    def sort(self, *args, **kwargs):
+        super(IndexedListMixin, self).sort(*args, **kwargs)
+        self._invalidate_index()
+
+    def reverse(self):
+        super(IndexedListMixin, self).reverse()
+        self._invalidate_index()
+
+
+    def __getstate__(self):
+        # the index is rebuilt on demand rather than copied or pickled, so
+        # that copies never share it
+        state = self.__dict__.copy()
+        state['_index'] = None
+        return state
+
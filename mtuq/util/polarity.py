@@ -4,6 +4,7 @@ import numpy as np
 from obspy.taup import TauPyModel
 from obspy.geodetics import kilometers2degrees as _to_deg
 from mtuq.util.cap import WeightParser
+from mtuq.util.traveltimes import TravelTimeTable
 
 def extract_polarity(polarity_in, polarity_keyword=None):
     """
@@ -50,7 +51,19 @@ def calculate_takeoff_angle(taup, source_depth_in_km, **kwargs):
     """
     Compute P arrival source-receiver takeoff angle, from the source-receiver
     geometry and a valid 1D obspy velocity model (expected in *.npz format).
+
+    .. note :
+    ``taup`` can also be a `mtuq.util.traveltimes.TravelTimeTable`, in which
+    case the takeoff angle is looked up rather than computed.
+
     """
+    if isinstance(taup, TravelTimeTable):
+        takeoff_angle = taup.get_takeoff_angle(
+            source_depth_in_km, kwargs['distance_in_degree'], 'P')
+
+        if np.isnan(takeoff_angle):
+            return None
+        return takeoff_angle
 
     try:
         arrivals = taup.get_travel_times(source_depth_in_km, **kwargs)
@@ -71,7 +84,7 @@ def calculate_takeoff_angle(taup, source_depth_in_km, **kwargs):
         # if taup fails, use dummy takeoff angle
         return None
 
-def extract_takeoff_angle(greens, taup_model='ak135'):
+def extract_takeoff_angle(greens, taup_model='ak135', table=None):
     """
     Extract takeoff angle from Green's function input (FK Green's function
     database), or compute it on the fly (Axisem database) using obspy.taup
@@ -81,6 +94,10 @@ def extract_takeoff_angle(greens, taup_model='ak135'):
     This function is a wrapper that determine the type of input, and then calls
     mtuq.util.polarity.calculate_takeoff_angle when required (taup mode).
 
+    If ``table`` is given (a `mtuq.util.traveltimes.TravelTimeTable`),
+    takeoff angles are instead looked up in the table, which is faster for
+    many stations but agrees with obspy.taup only to within about one degree.
+
     """
     #Determine Green's function origin:
     solver = _get_tag(greens[0].tags, 'solver')
@@ -94,6 +111,11 @@ def extract_takeoff_angle(greens, taup_model='ak135'):
     # List takeoff_angle and azimuth out of the provided data
     if mode == 'FK':
         takeoff_angles = [sta[-1].stats.sac['user1'] for sta in greens]
+    elif mode == 'taup' and table is not None:
+        depths = [sta.station.sac['evdp'] for sta in greens]
+        distances = [_to_deg(sta.station.sac['dist']) for sta in greens]
+        takeoff_angles = [None if np.isnan(angle) else angle for angle in
+            table.get_takeoff_angle(depths, distances, 'P')]
     elif mode == 'taup':
         model = TauPyModel(taup_model)
         takeoff_angles = [calculate_takeoff_angle(model,
@@ -0,0 +1,243 @@
+"""
+Process pool utilities
+
+Used by ``Dataset.map`` and ``GreensTensorList.map`` to process streams on
+several cores of a single machine
+"""
+
+import numpy as np
+import pickle
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from math import ceil
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    # Python 3.7
+    shared_memory = None
+
+if pickle.HIGHEST_PROTOCOL < 5:
+    # out-of-band buffers require Python 3.8, so items are pickled in the
+    # usual way
+    shared_memory = None
+
+
+# padding that keeps arrays received through shared memory aligned
+_ALIGN = 64
+
+
+def pool_map(function, items, sequences=[], workers=None, chunk_size=None):
+    """ Maps function to items using a local process pool
+
+    Returns a list of results in the same order as `items`.  If one or more
+    sequences are given, the function is called with an argument list
+    consisting of the corresponding item of each sequence, as in the
+    Python built-in ``map``
+
+    .. rubric :: Input arguments
+
+    ``function`` (`callable`):
+    Function to apply, which must be picklable (module-level functions and
+    objects such as `mtuq.ProcessData` are)
+
+    ``items`` (`list`):
+    ObsPy streams, `GreensTensor` objects or other picklable items
+
+    ``sequences`` (`list` of sequences):
+    Optional additional arguments
+
+    ``workers`` (`int`):
+    Number of worker processes
+
+    ``chunk_size`` (`int`):
+    Number of items sent to a worker at a time (by default, chosen so that
+    each worker receives a few chunks)
+
+
+    .. note ::
+
+      Items are sent to workers in chunks, and array contents of each chunk
+      (such as trace data) are passed through shared memory rather than
+      pickled, in both directions.  At most twice as many chunks as there
+      are workers are held in shared memory at a time.  The function itself
+      is sent only once to each worker.  With Python 3.7, array contents
+      are pickled along with everything else.
+
+    """
+    items = list(items)
+    nitems = len(items)
+
+    if workers is None or workers==1 or nitems==0:
+        return [function(item, *[sequence[_i] for sequence in sequences])
+            for _i, item in enumerate(items)]
+
+    assert workers >= 1,\
+        ValueError("Bad input argument: workers")
+
+    if chunk_size is None:
+        chunk_size = max(1, int(ceil(nitems/(4.*workers))))
+
+    assert chunk_size >= 1,\
+        ValueError("Bad input argument: chunk_size")
+
+    chunks = []
+    for start in range(0, nitems, chunk_size):
+        stop = min(start+chunk_size, nitems)
+        chunks += [[(items[_i], [sequence[_i] for sequence in sequences])
+            for _i in range(start, stop)]]
+
+    # chunks are dumped to shared memory only shortly before they are
+    # needed, so that only a few are held in memory at a time
+    chunks = iter(chunks)
+    max_pending = 2*workers
+
+    results = []
+    pending = deque()
+    executor = ProcessPoolExecutor(max_workers=workers,
+        initializer=_initialize, initargs=(function,))
+    try:
+        for chunk in islice(chunks, max_pending):
+            pending.append(_submit(executor, chunk))
+
+        # results are collected in submission order
+        while pending:
+            future, block = pending.popleft()
+            try:
+                results += _load(future.result(), unlink=True)
+            finally:
+                _unlink(block)
+
+            for chunk in islice(chunks, 1):
+                pending.append(_submit(executor, chunk))
+
+    finally:
+        # if an error occurred, chunks not yet started are cancelled
+        # (shutdown(cancel_futures=True) requires Python 3.9)
+        for future, _ in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+        # chunks still pending have either been cancelled or completed
+        # without their results being collected
+        for future, block in pending:
+            _unlink(block)
+            if not future.cancelled() and future.exception() is None:
+                _discard(future.result())
+
+    return results
+
+
+def _submit(executor, chunk):
+    payload, block = _dump(chunk)
+    try:
+        return executor.submit(_run, payload), block
+    except:
+        _unlink(block)
+        raise
+
+
+#
+# worker functions
+#
+
+_function = None
+
+def _initialize(function):
+    global _function
+    _function = function
+
+
+def _run(payload):
+    chunk = _load(payload)
+    return _dump([_function(item, *args) for item, args in chunk])[0]
+
+
+#
+# serialization
+#
+
+def _dump(obj):
+    """ Pickles object, placing array contents in a shared memory block
+
+    Returns a payload that can be passed to `_load` in another process,
+    together with the shared memory block (or `None`)
+    """
+    if shared_memory is None:
+        return (pickle.dumps(obj, protocol=4), None, None), None
+
+    buffers = []
+    header = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+    buffers = [buffer.raw() for buffer in buffers]
+    sizes = [buffer.nbytes for buffer in buffers]
+
+    if sum(sizes)==0:
+        return (header, None, sizes), None
+
+    offsets = _get_offsets(sizes)
+    block = shared_memory.SharedMemory(create=True, size=int(offsets[-1]))
+    try:
+        data = np.ndarray(offsets[-1], dtype=np.uint8, buffer=block.buf)
+        for buffer, start, size in zip(buffers, offsets, sizes):
+            data[start:start+size] = np.frombuffer(buffer, dtype=np.uint8)
+        del data
+    finally:
+        block.close()
+
+    return (header, block.name, sizes), block
+
+
+def _load(payload, unlink=False):
+    """ Unpickles object created by `_dump`
+    """
+    header, name, sizes = payload
+
+    if name is None:
+        if sizes is None:
+            return pickle.loads(header)
+        return pickle.loads(header, buffers=[b'']*len(sizes))
+
+    # array contents are copied out of shared memory all at once, so that
+    # the block can be released immediately
+    offsets = _get_offsets(sizes)
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        data = np.array(np.ndarray(offsets[-1], dtype=np.uint8,
+            buffer=block.buf))
+    finally:
+        block.close()
+        if unlink:
+            block.unlink()
+
+    buffers = [data[start:start+size] for start, size in zip(offsets, sizes)]
+    return pickle.loads(header, buffers=buffers)
+
+
+def _unlink(block):
+    # removes a shared memory block created by `_dump`, if it still exists
+    if block is None:
+        return
+    try:
+        block.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _discard(payload):
+    # removes the shared memory block of a payload that will never be loaded
+    header, name, sizes = payload
+    if name is None:
+        return
+    try:
+        block = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    block.close()
+    _unlink(block)
+
+
+def _get_offsets(sizes):
+    return np.cumsum([0]+[_ALIGN*int(ceil(size/_ALIGN)) for size in sizes])
+
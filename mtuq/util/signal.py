@@ -1,10 +1,11 @@
 
 import numpy as np
+import warnings
 from copy import copy
 from mtuq.util.math import isclose
 from obspy.geodetics import gps2dist_azimuth, kilometers2degrees
 from obspy.signal.filter import highpass, lowpass
-from scipy.signal import fftconvolve
+from scipy.signal import detrend, fftconvolve, iirfilter, sosfilt
 
 
 def cut(trace, t1, t2):
@@ -13,23 +14,117 @@ def cut(trace, t1, t2):
     t1: desired start time
     t2: desired end time
     """
-    if t1 < float(trace.stats.starttime):
+    it1, it2 = get_window_indices(
+        float(trace.stats.starttime), float(trace.stats.endtime),
+        float(trace.stats.delta), t1, t2)
+
+    trace.data = trace.data[it1:it2]
+    trace.stats.starttime = t1
+    trace.stats.npts = it2-it1
+
+
+def get_window_indices(starttime, endtime, delta, t1, t2):
+    """ 
+    starttime: trace start time(s)
+    endtime: trace end time(s)
+    delta: time increment
+    t1: desired start time(s)
+    t2: desired end time(s)
+
+    Returns the index range used by `cut`.  Accepts either floats or
+    NumPy arrays, so that many traces can be handled at once
+    """
+    if np.any(np.asarray(t1) < starttime):
         raise Exception('The chosen window begins before the trace.  Consider '
            'using a later window, or to automatically pad the beginning of the '
            'trace with zeros, use mtuq.util.signal.resample instead')
 
-    if t2 > float(trace.stats.endtime):
+    if np.any(np.asarray(t2) > endtime):
         raise Exception('The chosen window ends after the trace.  Consider '
            'using an earlier window, or to automatically pad the end of the '
            'trace with zeros, use mtuq.util.signal.resample instead')
 
-    t0 = float(trace.stats.starttime)
-    dt = float(trace.stats.delta)
-    it1 = int((t1-t0)/dt)
-    it2 = int((t2-t0)/dt)
-    trace.data = trace.data[it1:it2]
-    trace.stats.starttime = t1
-    trace.stats.npts = it2-it1
+    it1 = np.asarray((t1-starttime)/delta).astype(int)
+    it2 = np.asarray((t2-starttime)/delta).astype(int)
+
+    if it1.ndim==0:
+        return int(it1), int(it2)
+    return it1, it2
+
+
+def detrend_array(data):
+    """ 
+    data: numpy array of shape (ntraces, npts)
+
+    Array equivalent of ObsPy's ``detrend('demean')`` followed by
+    ``detrend('linear')``, applied along the last axis
+    """
+    data = np.asarray(data, dtype=np.float64)
+    return detrend(detrend(data, axis=-1, type='constant'),
+        axis=-1, type='linear')
+
+
+def taper_array(data, max_percentage=0.05, type='hann'):
+    """ 
+    data: numpy array of shape (ntraces, npts), modified in place
+
+    Array equivalent of ObsPy's ``taper(max_percentage, type)``, applied 
+    along the last axis
+    """
+    from obspy.core.trace import Trace
+
+    # the taper only depends on the number of samples, so is obtained once
+    # from ObsPy itself
+    window = Trace(np.ones(data.shape[-1])).taper(
+        max_percentage, type=type).data
+
+    data *= window
+    return data
+
+
+def filter_array(data, df, filter_type, corners=4, **parameters):
+    """ 
+    data: numpy array of shape (ntraces, npts)
+    df: sampling rate
+    filter_type: 'bandpass', 'lowpass' or 'highpass'
+
+    Array equivalent of ObsPy's ``filter(filter_type, zerophase=False,
+    **parameters)``, applied along the last axis
+    """
+    fe = 0.5*df
+
+    if filter_type == 'bandpass':
+        freqs = [parameters['freqmin']/fe, parameters['freqmax']/fe]
+        btype = 'band'
+
+        # same special cases as obspy.signal.filter.bandpass
+        if freqs[1] - 1.0 > -1e-6:
+            warnings.warn("Selected high corner frequency of bandpass is at "
+                "or above Nyquist. Applying a high-pass instead.")
+            return filter_array(data, df, 'highpass', corners,
+                freq=parameters['freqmin'])
+
+        if freqs[0] > 1:
+            raise ValueError("Selected low corner frequency is above Nyquist.")
+
+    elif filter_type == 'lowpass':
+        freqs = min(parameters['freq']/fe, 1.)
+        btype = 'lowpass'
+
+    elif filter_type == 'highpass':
+        freqs = parameters['freq']/fe
+        btype = 'highpass'
+
+        if freqs > 1:
+            raise ValueError("Selected corner frequency is above Nyquist.")
+
+    else:
+        raise ValueError('Bad parameter: filter_type')
+
+    sos = iirfilter(corners, freqs, btype=btype, ftype='butter', 
+        output='sos')
+
+    return sosfilt(sos, data, axis=-1)
 
 
 def resample(data, t1_old, t2_old, dt_old, t1_new, t2_new, dt_new):
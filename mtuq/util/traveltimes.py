@@ -0,0 +1,595 @@
+"""
+Interpolated travel time tables
+
+Computing P and S travel times with ``obspy.taup`` requires a ray
+calculation for every source-receiver pair.  Tables in this module instead
+tabulate first arrival times and takeoff angles over a regular grid of
+source depths and epicentral distances, so that looking them up reduces
+to interpolation
+"""
+
+import hashlib
+import numpy as np
+import os
+import tempfile
+import threading
+import warnings
+
+from os.path import basename, exists, expanduser, getmtime, isfile, join
+
+
+# P and S picks follow the convention of ``mtuq.util.signal.get_arrival``:
+# the first arrival of the upgoing phase if there is one, otherwise the first
+# arrival of the downgoing phase
+PHASES = {
+    'P': ['p', 'P'],
+    'S': ['s', 'S'],
+    }
+
+# bump whenever the contents of stored rows change
+_VERSION = 3
+
+# offset in km of the depths tabulated above and below each discontinuity
+_EPSILON = 1.e-3
+
+# relative difference in ray parameter between tabulated depths, above which
+# values are computed at the exact depth
+_TOLERANCE = 0.01
+
+
+class TravelTimeTable(object):
+    """ P and S first arrival times and takeoff angles over a grid of source
+    depths and epicentral distances
+
+    .. rubric :: Usage
+
+    .. code::
+
+        table = get_table('ak135')
+        picks = table.get_picks(depth_in_km, distance_in_deg)
+        takeoff_angle = table.get_takeoff_angle(depth_in_km, distance_in_deg)
+
+    Arguments can be floats or NumPy arrays.  Where a phase does not exist,
+    `NaN` is returned.
+
+
+    .. rubric :: Input arguments
+
+    ``model`` (`str`):
+    Name of built-in ObsPy TauP model or path to custom ObsPy TauP model
+
+    ``depth_spacing`` (`float`):
+    Spacing of tabulated source depths in km
+
+    ``distance_spacing`` (`float`):
+    Spacing of tabulated epicentral distances in degrees
+
+    ``max_distance`` (`float`):
+    Largest tabulated epicentral distance in degrees
+
+    ``path`` (`str`):
+    Directory in which tabulated values are stored for reuse by later
+    processes (defaults to ``~/.cache/mtuq/traveltimes``; if `False`,
+    values are kept in memory only)
+
+
+    .. note ::
+
+      The table is filled in lazily, one source depth at a time, as
+      lookups require it.  Each depth takes a fraction of a second, after
+      which lookups at that depth take no ray calculations at all.  The TauP
+      model itself is only loaded if values have to be computed.
+
+    .. note ::
+
+      Travel times are interpolated in distance by cubic polynomials
+      matching both the tabulated times and their slopes (the ray
+      parameter), and linearly in depth.  Takeoff angles are obtained from
+      the slopes of the same polynomials.  Besides the regular grid, depths
+      just above and below each discontinuity of the model are tabulated,
+      so that values are never interpolated across one.  Where neighboring
+      depths disagree on the distance range of a phase or on the branch of
+      the travel time curve that arrives first, values are tabulated at the
+      exact depth instead.
+
+    .. note ::
+
+      Tabulated values come from the travel time curves of ``obspy.taup``,
+      but without the iterative refinement that
+      ``TauPyModel.get_travel_times`` applies.  Differences from
+      ``get_travel_times`` are typically well below 0.01 s, and differences
+      in takeoff angle below 1 degree.
+
+    """
+    def __init__(self, model='ak135', depth_spacing=1.,
+        distance_spacing=0.05, max_distance=180., path=None):
+
+        assert depth_spacing > 0,\
+            ValueError("Bad input argument: depth_spacing")
+
+        assert distance_spacing > 0,\
+            ValueError("Bad input argument: distance_spacing")
+
+        assert 0 < max_distance <= 180.,\
+            ValueError("Bad input argument: max_distance")
+
+        if path is None:
+            path = join(expanduser('~'), '.cache', 'mtuq', 'traveltimes')
+
+        self.model = model
+        self.depth_spacing = depth_spacing
+        self.distance_spacing = distance_spacing
+        self.max_distance = max_distance
+        self.path = path
+
+        self.distances = np.arange(
+            0., max_distance+0.5*distance_spacing, distance_spacing)
+
+        self._rows = {}
+        self._discontinuities = None
+        self._taup = None
+        self._lock = threading.Lock()
+
+
+    def get_picks(self, depth_in_km, distance_in_deg):
+        """ Returns P and S first arrival times as a `dict` (see ``PHASES``)
+        """
+        return {pick: self._lookup(depth_in_km, distance_in_deg, pick, '')
+            for pick in PHASES}
+
+
+    def get_takeoff_angle(self, depth_in_km, distance_in_deg, phase='P'):
+        """ Returns takeoff angle in degrees of the given first arrival
+        """
+        assert phase in PHASES,\
+            ValueError("Bad input argument: phase")
+
+        return self._lookup(depth_in_km, distance_in_deg, phase, '_takeoff')
+
+
+    def _lookup(self, depth_in_km, distance_in_deg, pick, suffix):
+        depth = np.asarray(depth_in_km, dtype=float)
+        distance = np.asarray(distance_in_deg, dtype=float)
+        depth, distance = np.broadcast_arrays(depth, distance)
+
+        if np.any(depth < 0.):
+            raise ValueError("Source depth must not be negative")
+
+        if np.any(distance < 0.) or np.any(distance > self.distances[-1]):
+            raise ValueError("Distance outside table range: %f degrees" %
+                self.distances[-1])
+
+        values = np.full(depth.shape, np.nan)
+        for name in PHASES[pick]:
+            missing = np.isnan(values)
+            if not np.any(missing):
+                break
+            values[missing] = self._interpolate(
+                depth[missing], distance[missing], name, suffix)
+
+        if values.ndim==0:
+            return float(values)
+        return values
+
+
+    def _interpolate(self, depth, distance, name, suffix):
+        """ Interpolates tabulated values of the given phase, returning `NaN`
+        where the phase does not exist
+        """
+        z0, z1 = self._get_brackets(depth)
+        w = np.clip((depth-z0)/np.where(z1 > z0, z1-z0, 1.), 0., 1.)
+
+        y = distance/self.distance_spacing
+        j = np.minimum(np.floor(y).astype(int), len(self.distances)-2)
+        wy = y - j
+
+        values = np.full(depth.shape, np.nan)
+        for _z0, _z1 in set(zip(z0, z1)):
+            selected = np.where((z0==_z0) & (z1==_z1))[0]
+            rows = [self._get_row(_z0), self._get_row(_z1)]
+
+            inside = [_inside(row, name, distance[selected]) for row in rows]
+
+            values[selected] = np.where(inside[0] & inside[1],
+                _average([self._evaluate(row, name, suffix, j[selected],
+                    wy[selected]) for row in rows], w[selected]),
+                np.nan)
+
+            # the distance range of a phase can change abruptly with depth
+            # (for example, that of upgoing phases below a discontinuity), and
+            # so can the branch of the travel time curve that arrives first,
+            # so where the rows disagree on either, values are taken from the
+            # exact depth instead
+            uncertain = (inside[0] != inside[1]) | (inside[0] & inside[1] &
+                _differ(rows, name, j[selected], wy[selected]))
+            uncertain = selected[uncertain]
+
+            for _z in np.unique(depth[uncertain]):
+                _selected = uncertain[depth[uncertain]==_z]
+                row = self._get_row(_z)
+
+                values[_selected] = np.where(
+                    _inside(row, name, distance[_selected]),
+                    self._evaluate(row, name, suffix, j[_selected],
+                        wy[_selected]),
+                    np.nan)
+
+        if suffix:
+            values = _takeoff_angle(name, values)
+
+        return values
+
+
+    def _get_brackets(self, depth):
+        """ Returns tabulated depths above and below the given depths
+
+        Tabulated depths include the regular grid and depths just above and
+        below each discontinuity of the model, so that values are never
+        interpolated across a discontinuity
+        """
+        z0 = np.floor(depth/self.depth_spacing)*self.depth_spacing
+        z1 = np.where(z0 < depth, z0+self.depth_spacing, z0)
+
+        for depth_in_km in self._get_discontinuities():
+            z0 = np.where((z0 <= depth_in_km) & (depth_in_km < depth),
+                depth_in_km+_EPSILON, z0)
+            z1 = np.where((depth < depth_in_km) & (depth_in_km <= z1),
+                depth_in_km-_EPSILON, z1)
+
+            # sources at a discontinuity are handled by TauP itself
+            at = (depth==depth_in_km)
+            z0 = np.where(at, depth, z0)
+            z1 = np.where(at, depth, z1)
+
+        return np.round(z0, 6), np.round(z1, 6)
+
+
+    def _evaluate(self, row, name, suffix, j, w):
+        """ Interpolates tabulated values of the given phase in distance
+        """
+        t0, t1 = row[name][j], row[name][j+1]
+        p0 = row[name+'_slowness'][j]*self.distance_spacing
+        p1 = row[name+'_slowness'][j+1]*self.distance_spacing
+
+        # travel times extrapolated linearly from either end of the interval
+        # (where the phase exists at only one end, or where the earliest
+        # arrival switches between branches of the travel time curve, the
+        # earlier of the two is used)
+        t0 = t0 + w*p0
+        t1 = t1 - (1.-w)*p1
+        first = np.where(np.isnan(t1), True,
+            np.where(np.isnan(t0), False, t0 <= t1))
+
+        switch = (row[name+'_switch'][j] > 0.) | np.isnan(t0) | np.isnan(t1)
+
+        # travel times are interpolated by cubic Hermite polynomials with
+        # slopes given by the ray parameter
+        v0, v1 = row[name][j], row[name][j+1]
+
+        if suffix:
+            # takeoff angles are obtained from the slope of the polynomial
+            # (the sine of the takeoff angle is returned, which varies
+            # smoothly with depth even where the angle itself does not)
+            slope = ((6*w**2 - 6*w)*v0 + (3*w**2 - 4*w + 1)*p0 +
+                     (-6*w**2 + 6*w)*v1 + (3*w**2 - 2*w)*p1)
+            slope = np.where(switch, np.where(first, p0, p1), slope)
+
+            # where the distance range of the phase ends within the interval,
+            # ray parameters are interpolated linearly towards the end of the
+            # range instead, as they change rapidly there
+            distance = (j+w)*self.distance_spacing
+            for node, end, ends in [
+                (j, 1, ~np.isnan(v0) & np.isnan(v1)),
+                (j+1, 0, np.isnan(v0) & ~np.isnan(v1))]:
+                x0 = self.distances[node[ends]]
+                x1 = row[name+'_range'][end]
+                s0 = row[name+'_slowness'][node[ends]]
+                s1 = row[name+'_limits'][end]
+                slope[ends] = self.distance_spacing*(s0 + (s1-s0)*
+                    (distance[ends]-x0)/np.where(x1 != x0, x1-x0, 1.))
+
+            return row[name+suffix][0]/self.distance_spacing*slope
+
+        cubic = ((2*w**3 - 3*w**2 + 1)*v0 + (w**3 - 2*w**2 + w)*p0 +
+                 (-2*w**3 + 3*w**2)*v1 + (w**3 - w**2)*p1)
+
+        return np.where(switch, np.where(first, t0, t1), cubic)
+
+
+    def _get_row(self, depth_in_km):
+        """ Returns tabulated values at the given depth, computing them if
+        necessary
+        """
+        depth_in_km = round(float(depth_in_km), 6)
+
+        with self._lock:
+            if depth_in_km in self._rows:
+                return self._rows[depth_in_km]
+
+            filename = self._filename('%.6f.npz' % depth_in_km)
+            row = _read(filename)
+
+            if row is None:
+                # values are used in the same form as when read back, so
+                # that tables computed anew and tables read from disk agree
+                # exactly
+                row = {key: np.asarray(value, dtype=float) for key, value in
+                    self._compute_row(depth_in_km).items()}
+                _write(filename, row)
+
+            self._rows[depth_in_km] = row
+            return row
+
+
+    def _get_discontinuities(self):
+        """ Returns depths of velocity discontinuities in the model, reading
+        them from disk if possible, so that the model need not be loaded
+        """
+        if self._discontinuities is None:
+            filename = self._filename('discontinuities.npz')
+            stored = _read(filename)
+
+            if stored is None:
+                depths = self._get_taup().model.s_mod.v_mod.\
+                    get_discontinuity_depths()
+                stored = {'depths': np.asarray(depths, dtype=float)}
+                _write(filename, stored)
+
+            # the surface is not an interior discontinuity
+            depths = stored['depths']
+            self._discontinuities = depths[depths > 0.]
+
+        return self._discontinuities
+
+
+    def _compute_row(self, depth_in_km):
+        from obspy.taup.seismic_phase import SeismicPhase
+
+        taup = self._get_taup()
+        tau_model = taup.model.depth_correct(depth_in_km)
+
+        row = {}
+        for names in PHASES.values():
+            for name in names:
+                try:
+                    phase = SeismicPhase(name, tau_model)
+                    assert len(phase.dist) > 0
+                except Exception:
+                    # phase does not exist at this depth
+                    phase = None
+
+                if phase is not None:
+                    times, slowness, switch, distance_range, limits =\
+                        _tabulate(phase, np.radians(self.distances))
+                    takeoff = _takeoff_coefficient(phase, depth_in_km)
+                else:
+                    times = slowness = np.full(len(self.distances), np.nan)
+                    switch = np.zeros(len(self.distances))
+                    distance_range = limits = np.full(2, np.nan)
+                    takeoff = np.full(1, np.nan)
+
+                row[name] = times
+                row[name+'_slowness'] = slowness
+                row[name+'_takeoff'] = takeoff
+                row[name+'_switch'] = switch
+                row[name+'_range'] = distance_range
+                row[name+'_limits'] = limits
+
+        return row
+
+
+    def _get_taup(self):
+        # the model is loaded only if values need to be computed
+        if self._taup is None:
+            from obspy.taup import TauPyModel
+            self._taup = TauPyModel(self.model)
+        return self._taup
+
+
+    def _filename(self, name):
+        if not self.path:
+            return None
+
+        # tables depend on the model and grid, and for custom models also on
+        # the model file
+        key = [str(self.model), self.depth_spacing, self.distance_spacing,
+            self.max_distance, _VERSION]
+        if isfile(self.model):
+            key += [getmtime(self.model)]
+
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()[:16]
+        dirname = '%s_%s' % (basename(str(self.model)).split('.')[0], digest)
+        return join(self.path, dirname, name)
+
+
+    def __getstate__(self):
+        # the TauP model and lock are recreated on demand rather than pickled
+        state = self.__dict__.copy()
+        state['_taup'] = None
+        state['_lock'] = None
+        return state
+
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+
+def get_table(model='ak135', **kwargs):
+    """ Returns a `TravelTimeTable` for the given model, shared by all
+    callers in the current process
+    """
+    key = (str(model), tuple(sorted(kwargs.items())))
+    if key not in _tables:
+        _tables[key] = TravelTimeTable(model, **kwargs)
+    return _tables[key]
+
+
+_tables = {}
+
+
+def _read(filename):
+    if filename is None or not exists(filename):
+        return None
+    try:
+        with np.load(filename) as archive:
+            return {key: archive[key].astype(float) for key in archive}
+    except Exception:
+        # incomplete or corrupt files are simply recomputed
+        return None
+
+
+def _write(filename, arrays):
+    # values are stored in double precision, so that values read back agree
+    # exactly with those just computed
+    if filename is None:
+        return
+    try:
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+
+        # other processes may read the same file, so it is written under a
+        # temporary name and then renamed
+        fd, temp = tempfile.mkstemp(dir=os.path.dirname(filename),
+            suffix='.npz')
+    except OSError as error:
+        warnings.warn("Travel time table could not be saved: %s" % error)
+        return
+
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            np.savez(file, **{key: np.asarray(value, dtype=np.float64)
+                for key, value in arrays.items()})
+        os.replace(temp, filename)
+
+    except OSError as error:
+        warnings.warn("Travel time table could not be saved: %s" % error)
+
+    finally:
+        if exists(temp):
+            os.remove(temp)
+
+
+def _inside(row, name, distance):
+    # whether distances lie within the distance range of the phase (never
+    # true if the phase does not exist)
+    lower, upper = row[name+'_range']
+    return (lower <= distance) & (distance <= upper)
+
+
+def _differ(rows, name, j, w):
+    # whether the earliest arrivals in two rows may belong to different
+    # branches of the travel time curve
+    slowness = [(1.-w)*row[name+'_slowness'][j] + w*row[name+'_slowness'][j+1]
+        for row in rows]
+    scale = np.maximum(np.abs(slowness[0]), np.abs(slowness[1]))
+
+    with np.errstate(invalid='ignore'):
+        return ((rows[0][name+'_switch'][j] > 0.) |
+                (rows[1][name+'_switch'][j] > 0.) |
+                (np.abs(slowness[0]-slowness[1]) > _TOLERANCE*scale))
+
+
+def _average(values, weight):
+    # linear interpolation between two values, using whichever is available
+    # if the other is NaN
+    v0, v1 = values
+    return np.where(np.isnan(v0), v1,
+        np.where(np.isnan(v1), v0, (1.-weight)*v0 + weight*v1))
+
+
+def _tabulate(phase, distances):
+    """ Evaluates earliest arrival times and ray parameters (in s/deg) of a
+    ``SeismicPhase`` at the given distances (in radians), along with the
+    distance range of the phase and ray parameters at either end of it
+
+    Consecutive samples of the phase are treated as segments of the travel
+    time curve, as in ``SeismicPhase.calc_time``; times are interpolated by
+    cubic Hermite polynomials with slopes given by the ray parameter, and ray
+    parameters by the slopes of these polynomials
+
+    Also flags intervals between distances over which the earliest arrival
+    switches from one branch of the travel time curve to another (branches
+    being separated by cusps, where the curve reverses direction)
+    """
+    dist = np.asarray(phase.dist, dtype=float)
+    time = np.asarray(phase.time, dtype=float)
+    ray_param = np.asarray(phase.ray_param, dtype=float)
+
+    times = np.full(len(distances), np.inf)
+    ray_params = np.full(len(distances), np.nan)
+    segments = np.full(len(distances), -1)
+
+    for _i in range(len(dist)-1):
+        d0, d1 = dist[_i], dist[_i+1]
+        h = d1 - d0
+        if h==0.:
+            continue
+
+        start = np.searchsorted(distances, min(d0, d1), side='left')
+        stop = np.searchsorted(distances, max(d0, d1), side='right')
+        if start==stop:
+            continue
+
+        s = (distances[start:stop] - d0)/h
+
+        t = ((2*s**3 - 3*s**2 + 1)*time[_i] +
+             (s**3 - 2*s**2 + s)*h*ray_param[_i] +
+             (-2*s**3 + 3*s**2)*time[_i+1] +
+             (s**3 - s**2)*h*ray_param[_i+1])
+
+        # ray parameters are given by the slope of the same polynomial
+        p = ((6*s**2 - 6*s)*time[_i]/h +
+             (3*s**2 - 4*s + 1)*ray_param[_i] +
+             (-6*s**2 + 6*s)*time[_i+1]/h +
+             (3*s**2 - 2*s)*ray_param[_i+1])
+
+        earlier = t < times[start:stop]
+        times[start:stop][earlier] = t[earlier]
+        ray_params[start:stop][earlier] = p[earlier]
+        segments[start:stop][earlier] = _i
+
+    found = np.isfinite(times)
+    times[~found] = np.nan
+
+    # numbers branches of the curve, starting a new branch wherever the
+    # direction of the curve changes
+    direction = np.sign(np.diff(dist))
+    branches = np.concatenate([[0], np.cumsum(
+        (direction[1:] != direction[:-1]) | (direction[1:]==0.))])
+
+    switch = np.zeros(len(distances))
+    both = found[:-1] & found[1:]
+    switch[:-1][both] = (branches[segments[:-1][both]] !=
+        branches[segments[1:][both]])
+
+    distance_range = np.degrees([dist.min(), dist.max()])
+    limits = np.radians([ray_param[dist.argmin()], ray_param[dist.argmax()]])
+
+    return times, np.radians(ray_params), switch, distance_range, limits
+
+
+def _takeoff_coefficient(phase, depth_in_km):
+    """ Returns the factor relating the ray parameter (in s/deg) of a
+    ``SeismicPhase`` to the sine of its takeoff angle, as in
+    ``SeismicPhase.calc_takeoff_angle``
+    """
+    v_mod = phase.tau_model.s_mod.v_mod
+    if phase.down_going[0]:
+        velocity = v_mod.evaluate_below(depth_in_km, phase.name[0])
+    else:
+        velocity = v_mod.evaluate_above(depth_in_km, phase.name[0])
+
+    radius = phase.tau_model.radius_of_planet
+    return np.degrees(np.atleast_1d(velocity)/(radius - depth_in_km))
+
+
+def _takeoff_angle(name, sine):
+    # takeoff angles from their sines, which are in the 90-180 range for
+    # upgoing phases (those named in lowercase)
+    with np.errstate(invalid='ignore'):
+        takeoff_angle = np.degrees(np.arcsin(np.clip(sine, -1., 1.)))
+    if name.islower():
+        takeoff_angle = 180. - takeoff_angle
+    return takeoff_angle
+
@@ -0,0 +1,126 @@
+
+#
+# Synthetic stations, Green's functions and data for tests that compare
+# optimized code paths against the original ones, so that such tests run
+# without downloading or unpacking anything
+#
+
+import numpy as np
+
+from copy import deepcopy
+from obspy.core import Stream, Trace
+from mtuq import Dataset, GreensTensorList, Origin, Station
+from mtuq.event import MomentTensor
+from mtuq.greens_tensor.FK import GreensTensor
+from mtuq.io.clients.FK_SAC import CHANNELS
+
+
+def get_origin(depth_in_km=10., latitude=61.45, longitude=-149.74):
+    return Origin({
+        'time': '2009-04-07T20:12:55.000000Z',
+        'latitude': latitude,
+        'longitude': longitude,
+        'depth_in_m': depth_in_km*1000.,
+        })
+
+
+def get_stations(nstations, npts, dt, seed=0):
+    rng = np.random.default_rng(seed)
+
+    stations = []
+    for _i in range(nstations):
+        station = Station({
+            'latitude': 61.45+rng.uniform(-2., 2.),
+            'longitude': -149.74+rng.uniform(-3., 3.),
+            'network': 'XX',
+            'station': 'S%03d' % _i,
+            'location': '',
+            'starttime': '2009-04-07T20:12:55.000000Z',
+            'delta': dt,
+            'npts': npts,
+            })
+        station.id = 'XX.S%03d.' % _i
+        stations += [station]
+
+    return stations
+
+
+def get_greens(stations, origins, npts, dt, seed=1):
+    """ Returns Green's functions consisting of smoothed random noise
+    """
+    rng = np.random.default_rng(seed)
+
+    tensors = []
+    for origin in origins:
+        for station in stations:
+            traces = []
+            for channel in CHANNELS:
+                trace = Trace(_smooth(rng, npts), {
+                    'delta': dt,
+                    'npts': npts,
+                    'starttime': station.starttime,
+                    'channel': channel,
+                    })
+                trace.stats._component = channel[0]
+                traces += [trace]
+
+            tensors += [GreensTensor(traces=traces, station=station,
+                origin=origin, tags=['model:test', 'solver:FK',
+                'type:greens', 'units:m'])]
+
+    return GreensTensorList(tensors)
+
+
+def get_data(stations, origin, greens, npts, dt, seed=2):
+    """ Returns synthetics for a random moment tensor, with random time
+    shifts and noise added, and some transverse components missing
+    """
+    rng = np.random.default_rng(seed)
+    mt = MomentTensor(rng.standard_normal(6))
+
+    streams = []
+    for _i, station in enumerate(stations):
+        tensor = deepcopy(greens.select(origin)[_i])
+        synthetics = tensor.get_synthetics(mt, components=['Z','R','T'])
+
+        stream = Stream()
+        for trace in synthetics:
+            if _i % 4 == 3 and trace.stats.channel == 'T':
+                continue
+            stream += Trace(
+                np.roll(trace.data, rng.integers(-5, 5)) +
+                    0.1*_smooth(rng, npts), {
+                'delta': dt,
+                'npts': npts,
+                'starttime': station.starttime,
+                'channel': 'BH'+trace.stats.channel,
+                'network': station.network,
+                'station': station.station,
+                'location': station.location,
+                })
+        stream.station = station
+        stream.origin = origin
+        streams += [stream]
+
+    return Dataset(streams, tags=['units:m', 'type:velocity'])
+
+
+def get_problem(nstations=8, npts=300, dt=0.1, norigins=1):
+    """ Returns data, Green's functions, origins and stations
+    """
+    origins = [get_origin(10.+2.*_i) for _i in range(norigins)]
+    stations = get_stations(nstations, npts, dt)
+    greens = get_greens(stations, origins, npts, dt)
+    data = get_data(stations, origins[0], greens, npts, dt)
+    return data, greens, origins, stations
+
+
+def relative_error(a, b):
+    a, b = np.asarray(a), np.asarray(b)
+    return np.abs(a-b).max()/np.abs(a).max()
+
+
+def _smooth(rng, npts):
+    kernel = np.exp(-np.linspace(-3., 3., 31)**2)
+    return np.convolve(rng.standard_normal(npts), kernel, 'same')
+
@@ -0,0 +1,104 @@
+
+import numpy as np
+
+import mtuq.util
+from mtuq.grid import FullMomentTensorGridRandom
+from mtuq.misfit import Misfit
+from mtuq.util import bcast2
+from synthetics import get_problem, relative_error
+
+
+
+if __name__=='__main__':
+    #
+    # Checks that datasets and Green's tensors broadcast by bcast2, which
+    # sends array contents separately from everything else, agree with those
+    # broadcast by bcast
+    #
+    # Can be run with any number of MPI processes, for example
+    #
+    #   mpirun -n 4 python test_bcast.py
+    #
+    from mpi4py import MPI
+    comm = MPI.COMM_WORLD
+
+    def check_streams(expected, actual):
+        assert type(expected)==type(actual)
+        assert len(expected)==len(actual)
+        for stream1, stream2 in zip(expected, actual):
+            assert stream1.station==stream2.station
+            assert stream1.origin==stream2.origin
+            assert stream1.__dict__.keys()==stream2.__dict__.keys()
+            assert len(stream1)==len(stream2)
+            for trace1, trace2 in zip(stream1, stream2):
+                assert trace1.stats==trace2.stats
+                assert trace1.data.dtype==trace2.data.dtype
+                assert np.array_equal(trace1.data, trace2.data)
+
+
+    for root in sorted({0, comm.size-1}):
+        data, greens, origins, _ = get_problem(nstations=8, npts=300, dt=0.1,
+            norigins=2)
+
+        if comm.rank==root:
+            objects = (data, greens)
+        else:
+            objects = None
+
+        expected = comm.bcast(objects, root=root)
+        actual = bcast2(comm, objects, root=root)
+
+        for _expected, _actual in zip(expected, actual):
+            check_streams(_expected, _actual)
+
+        # misfit values are unaffected
+        misfit = Misfit(norm='L2', time_shift_min=-2., time_shift_max=+2.,
+            time_shift_groups=['ZR','T'])
+
+        sources = FullMomentTensorGridRandom(npts=100, magnitudes=[4.5])
+
+        error = relative_error(
+            misfit(expected[0], expected[1].select(origins[0]), sources),
+            misfit(actual[0], actual[1].select(origins[0]), sources))
+
+        # largest error over all processes
+        error = comm.allreduce(error, op=MPI.MAX)
+
+        if comm.rank==0:
+            print('  root: %d, Dataset and GreensTensorList agree, '
+                'misfit relative error: %.1e' % (root, error))
+
+        assert error==0.
+
+
+    #
+    # Checks arrays of several types and layouts, sent in several messages
+    #
+    max_message = mtuq.util._MAX_MESSAGE
+    mtuq.util._MAX_MESSAGE = 1000
+
+    rng = np.random.default_rng(0)
+    expected = {
+        'float64': rng.standard_normal(1001),
+        'float32': rng.standard_normal((3, 7)).astype(np.float32),
+        'int': np.arange(17),
+        'strided': rng.standard_normal((10, 10))[:, ::3],
+        'empty': np.zeros(0),
+        'other': ['a', 1.],
+        }
+
+    actual = bcast2(comm, expected if comm.rank==0 else None)
+
+    assert actual.keys()==expected.keys()
+    for key in expected:
+        if isinstance(expected[key], np.ndarray):
+            assert actual[key].dtype==expected[key].dtype
+            assert np.array_equal(actual[key], expected[key])
+        else:
+            assert actual[key]==expected[key]
+
+    mtuq.util._MAX_MESSAGE = max_message
+
+    if comm.rank==0:
+        print('  arrays of several types and layouts agree')
+
@@ -0,0 +1,273 @@
+
+import numpy as np
+import obspy
+import os
+
+from copy import deepcopy
+from obspy.core import Trace, UTCDateTime
+from obspy.geodetics import gps2dist_azimuth
+from tempfile import TemporaryDirectory
+from mtuq.io.clients.FK_SAC import Client, EXTENSIONS
+from mtuq.util.signal import resample
+from synthetics import get_origin, get_stations, relative_error
+
+
+
+def write_fk_tree(path, model, depth, distances, npts=600, dt=0.05, seed=3):
+    """ Writes an FK directory tree containing smoothed random noise
+    """
+    rng = np.random.default_rng(seed)
+
+    dirname = '%s/%s/%s_%d' % (path, model, model, depth)
+    os.makedirs(dirname)
+
+    for dst in distances:
+        # start times increase with distance, as if a little before the
+        # first arrival
+        starttime = UTCDateTime(dst/20.)
+        for ext in EXTENSIONS:
+            data = np.convolve(rng.standard_normal(npts), np.hanning(20),
+                'same').astype(np.float32)
+            Trace(data, {'delta': dt, 'starttime': starttime}).write(
+                '%s/%d.grn.%s' % (dirname, dst, ext), format='sac')
+
+    return '%s/%s' % (path, model)
+
+
+def get_distances(stations, origin):
+    return [gps2dist_azimuth(origin.latitude, origin.longitude,
+        station.latitude, station.longitude)[0]/1000. for station in stations]
+
+
+def read_directly(path, stations, origin, distances, lookup):
+    """ Reads Green's functions one SAC file at a time, choosing distances
+    from those given and interpolating between them as in ``lookup``
+    """
+    model = os.path.basename(path)
+    dep = int(np.ceil(origin.depth_in_m/1000.))
+    distances = sorted(distances)
+
+    arrays = []
+    for station, distance in zip(stations, get_distances(stations, origin)):
+        lower = max([dst for dst in distances if dst <= distance])
+        upper = min([dst for dst in distances if dst >= distance])
+
+        if lookup=='ceil':
+            selected = [(upper, 1.)]
+        elif lookup=='nearest':
+            if distance-lower < upper-distance:
+                selected = [(lower, 1.)]
+            else:
+                selected = [(upper, 1.)]
+        elif lower==upper:
+            selected = [(upper, 1.)]
+        else:
+            weight = (distance-lower)/(upper-lower)
+            selected = [(lower, 1.-weight), (upper, weight)]
+
+        array = np.zeros((len(EXTENSIONS), station.npts))
+        for _i, ext in enumerate(EXTENSIONS):
+            for dst, weight in selected:
+                trace = obspy.read('%s/%s_%d/%d.grn.%s' %
+                    (path, model, dep, dst, ext), format='sac')[0]
+                array[_i] += 1.e-15*weight*resample(trace.data,
+                    float(origin.time)+float(trace.stats.starttime),
+                    float(origin.time)+float(trace.stats.endtime),
+                    trace.stats.delta, float(station.starttime),
+                    float(station.endtime), station.delta)
+        arrays += [array]
+
+    return arrays
+
+
+def compare(expected, actual):
+    # relative error over all traces of two lists of Green's tensors (or of
+    # arrays of trace data, as returned by `read_directly`)
+    def get_data(tensor):
+        if isinstance(tensor, np.ndarray):
+            return tensor
+        return np.array([trace.data for trace in tensor])
+
+    assert len(expected)==len(actual)
+    for tensor1, tensor2 in zip(expected, actual):
+        if not isinstance(tensor1, np.ndarray) and\
+           not isinstance(tensor2, np.ndarray):
+            assert tensor1.station==tensor2.station
+            assert [trace.stats.channel for trace in tensor1]==\
+                [trace.stats.channel for trace in tensor2]
+
+    return relative_error(list(map(get_data, expected)),
+        list(map(get_data, actual)))
+
+
+def check(label, expected, actual, tolerance=1.e-12):
+    error = compare(expected, actual)
+    print('  %s, relative error: %.1e' % (label, error))
+    assert error < tolerance
+
+
+
+if __name__=='__main__':
+    #
+    # Checks that optional settings of database clients, which change only
+    # how Green's functions are read, agree with the default settings
+    #
+    # Uses a small FK directory tree of synthetic Green's functions written
+    # to a temporary directory, so that nothing needs to be downloaded or
+    # unpacked
+    #
+    stations = get_stations(nstations=8, npts=300, dt=0.1)
+    origin = get_origin(depth_in_km=10.)
+
+    # Green's functions at the whole-kilometer distances on either side of
+    # each station
+    distances = set()
+    for distance in get_distances(stations, origin):
+        distances |= {int(np.floor(distance)), int(np.ceil(distance))}
+
+    tmpdir = TemporaryDirectory()
+    path = write_fk_tree(tmpdir.name, 'test', 10, sorted(distances))
+
+    expected = Client(path).get_greens_tensors(stations, [origin])
+
+
+    #
+    # Green's tensors read from an on-disk cache versus read from the
+    # directory tree
+    #
+    print('cache\n')
+
+    cache_path = '%s/cache' % tmpdir.name
+    client = Client(path)
+    client.set_cache(cache_path)
+
+    for _i in range(2):
+        # the first time, tensors are read and written to the cache, the
+        # second time, read from the cache
+        check('evaluation %d' % (_i+1), expected,
+            client.get_greens_tensors(stations, [origin]))
+        assert len(os.listdir(cache_path))==len(stations)
+
+    # tensors cached for one event are reused for another event at the same
+    # location, with start times relative to the other event's origin time
+    later = get_origin(depth_in_km=10.)
+    later.time += 3600.
+    _stations = deepcopy(stations)
+    for station in _stations:
+        station['starttime'] = station.starttime+3600.
+
+    check('later event', Client(path).get_greens_tensors(_stations, [later]),
+        client.get_greens_tensors(_stations, [later]))
+    assert len(os.listdir(cache_path))==len(stations)
+
+    for tensor1, tensor2 in zip(expected,
+        client.get_greens_tensors(_stations, [later])):
+        for trace1, trace2 in zip(tensor1, tensor2):
+            assert trace2.stats.starttime-trace1.stats.starttime==3600.
+
+    # preloading traces does not change the cache key, whereas settings that
+    # change the tensors do
+    client = Client(path, preload=True)
+    client.set_cache(cache_path)
+    client.get_greens_tensors(stations, [origin])
+    assert len(os.listdir(cache_path))==len(stations)
+
+    client = Client(path, lookup='linear')
+    client.set_cache(cache_path)
+    client.get_greens_tensors(stations, [origin])
+    assert len(os.listdir(cache_path))==2*len(stations)
+
+    print('')
+
+
+    #
+    # Green's tensors read by several threads or processes versus read one
+    # at a time
+    #
+    print('workers\n')
+
+    for pool in ['thread', 'process']:
+        for workers in [1, 2, 3]:
+            check('pool: %s, workers: %d' % (pool, workers), expected,
+                Client(path).get_greens_tensors(stations, [origin],
+                workers=workers, pool=pool))
+
+    # errors raised by workers are passed on unchanged
+    missing = get_origin(depth_in_km=20.)
+    for pool in ['thread', 'process']:
+        try:
+            Client(path).get_greens_tensors(stations, [origin, missing],
+                workers=2, pool=pool)
+        except FileNotFoundError:
+            pass
+        else:
+            raise Exception('Missing Green\'s functions not detected')
+
+    print('')
+
+
+    #
+    # Green's tensors read using preloaded traces and each distance lookup
+    # mode versus read one SAC file at a time
+    #
+    print('preload and lookup\n')
+
+    check('read_directly, lookup: ceil', expected,
+        read_directly(path, stations, origin, distances, 'ceil'))
+
+    for lookup in ['ceil', 'nearest', 'linear']:
+        reference = read_directly(path, stations, origin, distances, lookup)
+        for preload in [False, True]:
+            client = Client(path, preload=preload, lookup=lookup)
+
+            # reading the same Green's functions again gives the same results,
+            # so preloaded traces are not modified by the first read
+            for _i in range(2):
+                greens = client.get_greens_tensors(stations, [origin])
+                check('preload: %s, lookup: %s' % (preload, lookup),
+                    reference, greens)
+
+            for tensor in greens:
+                for trace in tensor:
+                    assert trace.stats.npts==len(trace.data)==\
+                        tensor.station.npts
+
+    # with preloaded traces, distances need not be spaced at 1 km
+    sparse = list(range(60, 300, 7))
+    sparse_path = write_fk_tree(tmpdir.name, 'sparse', 10, sparse)
+
+    for lookup in ['ceil', 'nearest', 'linear']:
+        check('sparse distances, preload: True, lookup: %s' % lookup,
+            read_directly(sparse_path, stations, origin, sparse, lookup),
+            Client(sparse_path, preload=True, lookup=lookup
+            ).get_greens_tensors(stations, [origin]))
+
+    print('')
+
+
+    #
+    # Green's tensors read from an FK archive versus read from the directory
+    # tree from which the archive was converted
+    #
+    from mtuq.io.clients.FK_NPY import Client as ClientNPY, convert
+
+    print('FK archive\n')
+
+    for tree, preload in [(path, False), (sparse_path, True)]:
+        filename = '%s.npy' % tree
+        convert(tree, filename)
+
+        for lookup in ['ceil', 'nearest', 'linear']:
+            check('%s, lookup: %s' % (os.path.basename(filename), lookup),
+                Client(tree, preload=preload, lookup=lookup
+                ).get_greens_tensors(stations, [origin]),
+                ClientNPY(filename, model=os.path.basename(tree),
+                lookup=lookup).get_greens_tensors(stations, [origin]))
+
+    # memory maps are reopened by worker processes
+    check('test.npy, pool: process, workers: 2', expected,
+        ClientNPY('%s.npy' % path, model='test').get_greens_tensors(
+        stations, [origin], workers=2, pool='process'))
+
+    print('')
+
@@ -0,0 +1,167 @@
+
+import numpy as np
+
+from copy import deepcopy
+from synthetics import get_problem
+
+
+
+if __name__=='__main__':
+    #
+    # Checks that indexed and vectorized methods of Dataset, GreensTensorList
+    # and GreensTensor agree with straightforward implementations
+    #
+    # Uses synthetic data and Green's functions, so that nothing needs to be
+    # downloaded or unpacked
+    #
+    data, greens, origins, stations = get_problem(nstations=8, npts=300,
+        dt=0.1, norigins=3)
+
+
+    #
+    # GreensTensorList.select, which looks up tensors in an index, versus
+    # comparing every tensor, including after list operations that change
+    # which tensors the list contains
+    #
+    def same(list1, list2):
+        # whether both lists contain the same objects, in the same order
+        return list(map(id, list1))==list(map(id, list2))
+
+    def check_greens(greens):
+        for station in stations:
+            assert same(greens.select(station),
+                [tensor for tensor in greens if tensor.station==station])
+
+        for origin in origins:
+            assert same(greens.select(origin),
+                [tensor for tensor in greens if tensor.origin==origin])
+
+    greens = deepcopy(greens)
+    check_greens(greens)
+
+    extra = deepcopy(greens[:3])
+    for operation in [
+        lambda greens: greens.reverse(),
+        lambda greens: greens.sort(key=lambda tensor: tensor.station.station),
+        lambda greens: greens.pop(),
+        lambda greens: greens.remove(greens[0]),
+        lambda greens: greens.insert(2, extra[0]),
+        lambda greens: greens.append(extra[1]),
+        lambda greens: greens.extend(extra[2:]),
+        lambda greens: greens.__setitem__(0, extra[0]),
+        lambda greens: greens.__delitem__(slice(0, 2)),
+        ]:
+        operation(greens)
+        check_greens(greens)
+
+    # tensors whose stations and origins cannot be indexed, such as plain
+    # dictionaries of the same fields, are found by comparison
+    from obspy.core.util import AttribDict
+
+    greens = deepcopy(greens)
+    for tensor in greens[:2]:
+        tensor.station = AttribDict(tensor.station.__dict__.copy())
+        tensor.origin = AttribDict(tensor.origin.__dict__.copy())
+    greens._invalidate_index()
+    check_greens(greens)
+
+    print('GreensTensorList.select agrees with comparing every tensor\n')
+
+
+    #
+    # Dataset.select, which looks up streams in an index, versus comparing
+    # every stream
+    #
+    def check_data(data):
+        for station in stations:
+            assert same(data.select(station),
+                [stream for stream in data if stream.station==station])
+
+        for origin in origins:
+            assert same(data.select(origin),
+                [stream for stream in data if stream.origin==origin])
+
+    data = deepcopy(data)
+    check_data(data)
+
+    for operation in [
+        lambda data: data.reverse(),
+        lambda data: data.pop(0),
+        lambda data: data.append(deepcopy(data[0])),
+        lambda data: data.__iadd__(deepcopy(data[:2])),
+        lambda data: data.sort_by_distance(),
+        ]:
+        operation(data)
+        check_data(data)
+
+    data = deepcopy(data)
+    for stream in data[:2]:
+        stream.station = AttribDict(stream.station.__dict__.copy())
+        stream.origin = AttribDict(stream.origin.__dict__.copy())
+    data._invalidate_index()
+    check_data(data)
+
+    print('Dataset.select agrees with comparing every stream\n')
+
+
+    #
+    # Dataset.to_array versus collecting trace data one trace at a time
+    #
+    data, _, _, _ = get_problem(nstations=8, npts=300, dt=0.1)
+    components = ['Z', 'R', 'T']
+
+    expected = np.zeros((len(stations), len(components), 300))
+    for _i, station in enumerate(stations):
+        stream = [stream for stream in data if stream.station==station][0]
+        for _j, component in enumerate(components):
+            traces = stream.select(component=component)
+            if len(traces) > 0:
+                expected[_i, _j] = traces[0].data
+
+    for dtype in [np.float64, np.float32]:
+        array = data.to_array(stations, components, dtype=dtype)
+        assert array.dtype==dtype
+        assert np.allclose(array, expected, rtol=1.e-6)
+
+    # missing traces are filled with zeros
+    assert not np.any(array[3, 2])
+
+    print('Dataset.to_array agrees with collecting one trace at a time\n')
+
+
+    #
+    # get_synthetics_array of GreensTensor and GreensTensorList, which
+    # generate synthetics for many sources by matrix products, versus
+    # get_synthetics for one source at a time
+    #
+    from mtuq.event import MomentTensor
+
+    _, greens, _, _ = get_problem(nstations=8, npts=300, dt=0.1)
+    components = ['Z', 'R', 'T']
+
+    rng = np.random.default_rng(0)
+    sources = rng.standard_normal((20, 6))
+
+    expected = np.zeros((len(sources), len(greens), len(components), 300))
+    for _i, source in enumerate(sources):
+        for _j, tensor in enumerate(greens):
+            synthetics = tensor.get_synthetics(MomentTensor(source),
+                components=components)
+            for _k, component in enumerate(components):
+                expected[_i, _j, _k] = synthetics.select(
+                    component=component)[0].data
+
+    assert np.allclose(greens.get_synthetics_array(sources, components),
+        expected, rtol=1.e-10, atol=1.e-12*abs(expected).max())
+
+    for _j, tensor in enumerate(greens):
+        assert np.allclose(tensor.get_synthetics_array(sources, components),
+            expected[:, _j], rtol=1.e-10, atol=1.e-12*abs(expected).max())
+
+    # lists of source objects are accepted as well as arrays
+    assert np.allclose(greens.get_synthetics_array(
+        [MomentTensor(source) for source in sources], components), expected,
+        rtol=1.e-10, atol=1.e-12*abs(expected).max())
+
+    print('get_synthetics_array agrees with get_synthetics\n')
+
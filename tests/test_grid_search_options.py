@@ -0,0 +1,178 @@
+
+import itertools
+import numpy as np
+
+from mtuq.grid import DoubleCoupleGridRegular, FullMomentTensorGridRandom,\
+    UnstructuredGrid
+from mtuq.grid_search import grid_search, grid_search_adaptive
+from mtuq.misfit import Misfit
+from synthetics import get_problem, relative_error
+
+
+
+if __name__=='__main__':
+    #
+    # Checks that optional settings of grid_search, which change only how
+    # the search is carried out, agree with a plain grid search
+    #
+    # Uses synthetic data and Green's functions, so that nothing needs to be
+    # downloaded or unpacked.  Can be run with or without MPI, for example
+    #
+    #   mpirun -n 4 python test_grid_search_options.py
+    #
+    try:
+        from mpi4py import MPI
+        comm = MPI.COMM_WORLD
+    except ImportError:
+        comm = None
+    rank = comm.rank if comm else 0
+
+    data, greens, origins, _ = get_problem(nstations=8, npts=300, dt=0.1,
+        norigins=3)
+
+    misfit = Misfit(norm='L2', time_shift_min=-2., time_shift_max=+2.,
+        time_shift_groups=['ZR','T'])
+
+    grids = {
+        'regular': DoubleCoupleGridRegular(npts_per_axis=8, magnitudes=[4.5]),
+        'random': FullMomentTensorGridRandom(npts=500, magnitudes=[4.5]),
+        }
+
+    def search(sources, **kwargs):
+        return grid_search(data, greens, misfit, origins, sources,
+            verbose=0, timed=False, msg_interval=0, **kwargs)
+
+    def check(label, expected, actual, tolerance=1.e-12):
+        # with MPI, results are gathered on rank 0
+        if rank==0:
+            error = relative_error(expected.values, actual.values)
+            print('  %s, relative error: %.1e' % (label, error))
+            assert error < tolerance
+
+    def get_values(results):
+        # misfit values as an array of shape (len(sources), len(origins)),
+        # from either a DataArray or a DataFrame
+        if hasattr(results, 'dims'):
+            return results.values.reshape(-1, len(origins))
+        return results[0].values.reshape(len(origins), -1).T
+
+
+    for name, sources in grids.items():
+        if rank==0:
+            print('%s grid\n' % name)
+
+        expected = search(sources)
+
+
+        # sources evaluated in chunks
+        for chunk_size in [1, 77, 10000]:
+            check('chunk_size: %d' % chunk_size, expected,
+                search(sources, chunk_size=chunk_size))
+
+
+        # chunks handed out to MPI processes as they become idle (without
+        # MPI, the scheduler is ignored)
+        for chunk_size in [50, 10000]:
+            check('scheduler: dynamic, chunk_size: %d' % chunk_size, expected,
+                search(sources, scheduler='dynamic', chunk_size=chunk_size))
+
+
+        # all origins evaluated at once
+        for kwargs in [{}, {'chunk_size': 77},
+            {'scheduler': 'dynamic', 'chunk_size': 50}]:
+            check('fuse_origins%s' % (', %s' % kwargs if kwargs else ''),
+                expected, search(sources, fuse_origins=True, **kwargs))
+
+
+        # only the lowest misfit values retained
+        for keep_best in [1, 10]:
+            best = search(sources, keep_best=keep_best, chunk_size=77)
+
+            if rank==0:
+                values = get_values(expected)
+                origin_idx = best.index.get_level_values('origin_idx')
+                source_idx = best.index.get_level_values('source_idx')
+
+                # the retained values are the lowest of all, sorted, and
+                # belong to the sources and origins given in the index
+                assert np.allclose(best[0].values,
+                    np.sort(values.flatten())[:keep_best], rtol=1.e-12)
+                assert np.allclose(best[0].values,
+                    values[source_idx, origin_idx], rtol=1.e-12)
+
+                print('  keep_best: %d, lowest misfit values agree' %
+                    keep_best)
+
+
+        # only the minimum misfit over all other dimensions retained
+        if name=='regular':
+            dims = ['kappa', 'origin_idx']
+            marginals = search(sources, marginals=dims, chunk_size=77)
+
+            if rank==0:
+                others = [dim for dim in expected.dims if dim not in dims]
+                check('marginals: %s' % dims,
+                    expected.min(dim=others).transpose(*dims), marginals)
+
+        if rank==0:
+            print('')
+
+
+    #
+    # Checks grid points returned by Grid.to_array and Grid.get, which
+    # unravel indices all at once, against the product of grid coordinates
+    #
+    sources = grids['regular']
+    expected = np.array(list(itertools.product(*sources.coords)))
+
+    assert np.array_equal(sources.to_array(), expected)
+
+    assert np.array_equal(np.vstack([chunk.to_array()
+        for chunk in sources.chunks(77)]), expected)
+
+    for _i in [0, 1, 100, len(sources)-1]:
+        assert np.array_equal(sources.get(_i, callback=None), expected[_i])
+
+    if rank==0:
+        print('Grid.to_array and Grid.get agree with grid coordinates\n')
+
+
+    #
+    # Checks that misfit values returned by adaptive grid searches agree with
+    # those of plain grid searches over the same grid points
+    #
+    sources = grids['regular']
+    coarse = search(sources)
+
+    for levels in [0, 2]:
+        adaptive = grid_search_adaptive(data, greens, misfit, origins,
+            sources, levels=levels, keep_best=5, verbose=0, timed=False,
+            msg_interval=0)
+
+        points = None
+        if rank==0:
+            dims = tuple(sources.dims)
+            points = adaptive.xs(0, level='origin_idx').reset_index()
+            points = UnstructuredGrid(dims=dims,
+                coords=[points[dim].values for dim in dims])
+
+            # no grid point is evaluated more than once
+            assert len(np.unique(points.to_array(), axis=0))==len(points)
+
+            if levels==0:
+                # without refinement, only the coarse grid is searched
+                assert len(points)==len(sources)
+            else:
+                # refined grids reach misfit at least as low as the coarse
+                # grid
+                assert adaptive[0].min() <= get_values(coarse).min()
+
+        if comm:
+            points = comm.bcast(points, root=0)
+
+        check('grid_search_adaptive, levels: %d' % levels,
+            search(points), adaptive)
+
+    if rank==0:
+        print('')
+
@@ -0,0 +1,151 @@
+
+import numpy as np
+
+from copy import deepcopy
+from mtuq.grid import FullMomentTensorGridRandom
+from mtuq.misfit import Misfit
+from synthetics import get_problem, relative_error
+
+
+
+if __name__=='__main__':
+    #
+    # Checks that optional settings of the level2 misfit function, which
+    # change only how misfit is computed, agree with the default settings
+    #
+    # Uses synthetic data and Green's functions, so that nothing needs to be
+    # downloaded or unpacked
+    #
+    data, greens, origins, _ = get_problem(nstations=8, npts=300, dt=0.1,
+        norigins=2)
+
+    sources = FullMomentTensorGridRandom(npts=1000, magnitudes=[4.5])
+
+    def evaluate(norm='L2', time_shift_max=2., **kwargs):
+        misfit = Misfit(norm=norm, time_shift_min=-time_shift_max,
+            time_shift_max=+time_shift_max, time_shift_groups=['ZR','T'],
+            **kwargs)
+        return misfit(data, deepcopy(greens).select(origins[0]), sources)
+
+
+    for norm in ['L2', 'hybrid']:
+        print('norm: %s\n' % norm)
+
+        expected = evaluate(norm)
+
+
+        # number of OpenMP threads
+        for num_threads in [1, 2, 3]:
+            error = relative_error(expected,
+                evaluate(norm, num_threads=num_threads))
+            print('  num_threads: %d, relative error: %.1e' %
+                (num_threads, error))
+            assert error < 1.e-12
+
+
+        # matrix products over blocks of sources
+        for block_size in [1, 100, 4096]:
+            error = relative_error(expected,
+                evaluate(norm, block_size=block_size))
+            print('  block_size: %d, relative error: %.1e' %
+                (block_size, error))
+            assert error < 1.e-10
+
+
+        # single precision
+        for block_size in [None, 100]:
+            values = evaluate(norm, precision='float32',
+                block_size=block_size)
+            error = relative_error(expected, values)
+            print('  precision: float32, block_size: %s, relative error: '
+                '%.1e' % (block_size, error))
+            assert np.all(np.isfinite(values))
+            assert error < 1.e-4
+
+        print('')
+
+
+    #
+    # Checks that evaluating all origins at once by matrix products agrees
+    # with the default settings
+    #
+    misfit = Misfit(norm='L2', time_shift_min=-2., time_shift_max=+2.,
+        time_shift_groups=['ZR','T'])
+
+    blocked = Misfit(norm='L2', time_shift_min=-2., time_shift_max=+2.,
+        time_shift_groups=['ZR','T'], block_size=100)
+
+    expected = misfit(data, deepcopy(greens), sources, origins=origins)
+    values = blocked(data, deepcopy(greens), sources, origins=origins)
+
+    error = relative_error(expected, values)
+    print('block_size with origins, relative error: %.1e\n' % error)
+    assert error < 1.e-10
+
+
+    #
+    # Checks that each of the ways in which data and Green's functions are
+    # cross-correlated (sliding windows for short traces, one trace at a time
+    # for longer traces, FFTs for long time-shift windows) agrees with
+    # correlating one trace at a time
+    #
+    from mtuq.misfit.waveform.level2 import _corr_1_2
+
+    rng = np.random.default_rng(0)
+
+    for npts, padding in [(100, (5, 5)), (300, (20, 20)), (300, (150, 150))]:
+        data_array = rng.standard_normal((4, 3, npts))
+        greens_array = rng.standard_normal((4, 3, 6, npts+sum(padding)))
+
+        expected = np.zeros((4, 3, 6, sum(padding)+1))
+        for _i in range(4):
+            for _j in range(3):
+                for _k in range(6):
+                    expected[_i, _j, _k] = np.correlate(
+                        greens_array[_i, _j, _k], data_array[_i, _j], 'valid')
+
+        for dtype in [np.float64, np.float32]:
+            corr = _corr_1_2(data_array, greens_array, padding, dtype)
+            error = relative_error(expected, corr)
+            print('npts: %d, padding: %s, dtype: %s, relative error: %.1e' %
+                (npts, padding, dtype.__name__, error))
+            assert corr.dtype==dtype
+            assert error < (1.e-6 if dtype==np.float32 else 1.e-12)
+
+    print('')
+
+
+    #
+    # Checks that cross-correlation arrays kept between evaluations give the
+    # same misfit values as arrays computed anew, including after the data
+    # change
+    #
+    misfit = Misfit(norm='L2', time_shift_min=-2., time_shift_max=+2.,
+        time_shift_groups=['ZR','T'])
+
+    cached = Misfit(norm='L2', time_shift_min=-2., time_shift_max=+2.,
+        time_shift_groups=['ZR','T'], cache=True)
+
+    other_data, _, _, _ = get_problem(nstations=8, npts=300, dt=0.1)
+    for stream in other_data:
+        for trace in stream:
+            trace.data *= -1.
+
+    for _i, (_data, origin) in enumerate([(data, origins[0]),
+        (data, origins[0]), (data, origins[1]), (other_data, origins[0])]):
+
+        _greens = greens.select(origin)
+
+        expected = misfit(_data, deepcopy(_greens), sources)
+        values = cached(_data, _greens, sources)
+
+        error = relative_error(expected, values)
+        print('cache, evaluation %d, entries: %d, relative error: %.1e' %
+            (_i+1, len(cached._cache._entries), error))
+        assert error < 1.e-12
+
+    # the second evaluation repeats the first, so takes arrays from the cache
+    assert len(cached._cache._entries)==3
+
+    print('')
+
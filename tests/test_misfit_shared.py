@@ -0,0 +1,106 @@
+
+import numpy as np
+
+from copy import deepcopy
+from mtuq.grid import FullMomentTensorGridRandom
+from mtuq.misfit import Misfit
+from mtuq.util import free_shared_arrays
+from synthetics import get_problem, relative_error
+
+
+
+if __name__=='__main__':
+    #
+    # Checks that misfit values computed from cross-correlation arrays in MPI-3
+    # shared memory agree with those computed in the usual way
+    #
+    # Green's functions are deliberately not padded beforehand, so that they
+    # are padded by the misfit function itself
+    #
+    # Can be run with any number of MPI processes, for example
+    #
+    #   mpirun -n 4 python test_misfit_shared.py
+    #
+    from mpi4py import MPI
+    comm = MPI.COMM_WORLD
+
+    data, greens, origins, _ = get_problem(nstations=8, npts=300, dt=0.1,
+        norigins=2)
+
+    sources = FullMomentTensorGridRandom(npts=1000, magnitudes=[4.5])
+
+    for precision in ['float64', 'float32']:
+        for fuse_origins in [False, True]:
+
+            misfit = Misfit(norm='L2', time_shift_min=-2., time_shift_max=+2.,
+                time_shift_groups=['ZR','T'], precision=precision)
+
+            shared = Misfit(norm='L2', time_shift_min=-2., time_shift_max=+2.,
+                time_shift_groups=['ZR','T'], precision=precision, cache=True)
+
+            _greens = deepcopy(greens)
+
+            if fuse_origins:
+                expected = misfit(data, deepcopy(greens), sources,
+                    origins=origins)
+
+                arrays = shared.precompute_shared(data, _greens, comm,
+                    origins=origins)[:-1]
+                values = shared(data, _greens, sources, origins=origins)
+
+            else:
+                expected = np.hstack([
+                    misfit(data, deepcopy(greens).select(origin), sources)
+                    for origin in origins])
+
+                arrays, values = [], []
+                for origin in origins:
+                    __greens = _greens.select(origin)
+                    arrays += shared.precompute_shared(data, __greens,
+                        comm)[:-1]
+                    values += [shared(data, __greens, sources)]
+                values = np.hstack(values)
+
+            shared.clear_cache()
+            free_shared_arrays(arrays)
+
+            error = relative_error(expected, values)
+
+            if comm.rank==0:
+                print('  precision: %s, fuse_origins: %s, relative error: %.1e'
+                    % (precision, fuse_origins, error))
+
+            assert error < (1.e-4 if precision=='float32' else 1.e-10)
+
+
+    #
+    # Checks that grid searches using shared memory agree with regular ones,
+    # and release shared memory once finished
+    #
+    from mtuq.grid_search import grid_search, grid_search_adaptive
+    from mtuq.util import _windows
+
+    misfit = Misfit(norm='L2', time_shift_min=-2., time_shift_max=+2.,
+        time_shift_groups=['ZR','T'])
+
+    for search, kwargs in [
+        (grid_search, {}),
+        (grid_search, {'fuse_origins': True}),
+        (grid_search_adaptive, {'levels': 2}),
+        ]:
+
+        expected = search(data, greens, misfit, origins, sources,
+            verbose=0, timed=False, msg_interval=0, **kwargs)
+
+        values = search(data, greens, misfit, origins, sources,
+            verbose=0, timed=False, msg_interval=0, shared_memory=True,
+            **kwargs)
+
+        assert len(_windows)==0
+
+        if comm.rank==0:
+            error = relative_error(expected.values, values.values)
+            print('  %s%s with shared memory, relative error: %.1e' %
+                (search.__name__, kwargs, error))
+            assert error < 1.e-10
+
@@ -0,0 +1,218 @@
+
+import numpy as np
+import os
+
+from copy import deepcopy
+from obspy.geodetics import gps2dist_azimuth
+from mtuq import ProcessData
+from mtuq.util import pool
+from mtuq.util import AttribDict
+from synthetics import get_problem, relative_error
+
+
+
+def compare(expected, actual):
+    # relative error over all traces of two processed datasets or lists of
+    # Green's tensors, which must otherwise agree exactly
+    assert type(expected)==type(actual)
+    assert len(expected)==len(actual)
+
+    array1, array2 = [], []
+    for stream1, stream2 in zip(expected, actual):
+        assert stream1.id==stream2.id
+        assert stream1.tags==stream2.tags
+        assert len(stream1)==len(stream2)
+        for trace1, trace2 in zip(stream1, stream2):
+            assert trace1.stats.channel==trace2.stats.channel
+            assert trace1.stats.starttime==trace2.stats.starttime
+            assert trace1.stats.npts==trace2.stats.npts
+            assert trace1.attrs==trace2.attrs
+            array1 += [trace1.data]
+            array2 += [trace2.data]
+
+    return relative_error(np.concatenate(array1), np.concatenate(array2))
+
+
+def fail(stream):
+    raise ValueError('Raised on purpose')
+
+
+def check(label, expected, actual, tolerance=1.e-10):
+    error = compare(expected, actual)
+    print('  %s, relative error: %.1e' % (label, error))
+    assert error < tolerance
+
+
+
+if __name__=='__main__':
+    #
+    # Checks that optional ways of processing data and Green's functions,
+    # which change only how processing is carried out, agree with applying
+    # ProcessData to one stream at a time
+    #
+    # Uses synthetic data and Green's functions, so that nothing needs to be
+    # downloaded or unpacked
+    #
+    data, greens, origins, stations = get_problem(nstations=8, npts=1200,
+        dt=0.1)
+
+    # stations read from SAC files carry SAC headers, including azimuth
+    for stream in list(data)+list(greens):
+        station, origin = stream.station, stream.origin
+        station.sac = AttribDict({'az': gps2dist_azimuth(origin.latitude,
+            origin.longitude, station.latitude, station.longitude)[1]})
+
+    parameters = {
+        'body_wave': {
+            'filter_type': 'bandpass',
+            'freq_min': 0.1,
+            'freq_max': 0.5,
+            'window_type': 'body_wave',
+            'window_length': 15.,
+            'padding': [-2., +2.],
+            },
+        'surface_wave': {
+            'filter_type': 'lowpass',
+            'freq': 0.1,
+            'window_type': 'surface_wave',
+            'window_length': 30.,
+            'padding': [-5., +5.],
+            },
+        'filter_only': {
+            'filter_type': 'highpass',
+            'freq': 0.05,
+            'apply_scaling': False,
+            },
+        }
+
+    def get_function(name, **kwargs):
+        kwargs.update(parameters[name])
+        if kwargs.get('window_type'):
+            kwargs.update(pick_type='taup', taup_model='ak135')
+        return ProcessData(apply_weights=False, **kwargs)
+
+
+    def get_blocks():
+        # shared memory blocks created by Python, on systems where they can
+        # be listed
+        if not os.path.isdir('/dev/shm'):
+            return set()
+        return {name for name in os.listdir('/dev/shm')
+            if name.startswith('psm_')}
+
+    blocks = get_blocks()
+
+    for name in parameters:
+        print('%s\n' % name)
+
+        function = get_function(name)
+
+        for label, streams in [('data', data), ('greens', greens)]:
+            expected = streams.map(function)
+
+
+            # all traces processed together as NumPy arrays
+            check('%s, batch' % label, expected, function.batch(streams))
+
+
+            # streams processed by several worker processes, which exchange
+            # trace data through shared memory
+            for workers, chunk_size in [(2, None), (3, 1)]:
+                check('%s, workers: %d, chunk_size: %s' % (label, workers,
+                    chunk_size), expected, streams.map(function,
+                    workers=workers, chunk_size=chunk_size))
+
+                # all shared memory blocks have been released
+                assert get_blocks() <= blocks
+
+            # array contents pickled along with everything else, as with
+            # Python 3.7
+            shared_memory = pool.shared_memory
+            pool.shared_memory = None
+            check('%s, workers: 2, without shared memory' % label, expected,
+                streams.map(function, workers=2))
+            pool.shared_memory = shared_memory
+
+            # errors raised by workers are passed on unchanged, and shared
+            # memory is released all the same
+            try:
+                streams.map(fail, workers=2, chunk_size=1)
+            except ValueError:
+                pass
+            else:
+                raise Exception('Error not passed on')
+            assert get_blocks() <= blocks
+
+
+            # only metadata copied, with trace data of the input left
+            # untouched
+            input_data = [trace.data.copy()
+                for stream in streams for trace in stream]
+
+            metadata_only = get_function(name, copy_mode='metadata')
+
+            check('%s, copy_mode: metadata' % label, expected,
+                streams.map(metadata_only))
+
+            check('%s, copy_mode: metadata, batch' % label, expected,
+                metadata_only.batch(streams))
+
+            assert all([np.array_equal(array, trace.data) for array, trace in
+                zip(input_data, [trace for stream in streams
+                for trace in stream])])
+
+        # arrays used by get_synthetics are not copied either
+        _greens = deepcopy(greens)
+        for tensor in _greens:
+            tensor._set_components(['Z', 'R', 'T'])
+
+        check('greens, copy_mode: metadata, get_synthetics arrays allocated',
+            greens.map(function), _greens.map(metadata_only))
+
+        for tensor, processed in zip(_greens, _greens.map(metadata_only)):
+            assert processed._array is tensor._array
+            for trace1, trace2 in zip(tensor._synthetics,
+                processed._synthetics):
+                assert trace1.data is trace2.data
+
+        print('')
+
+
+    #
+    # Checks that phase picks looked up in a travel time table agree with
+    # those calculated by TauP, and so do processed data except for window
+    # start times that may differ by one sample
+    #
+    print('taup_table\n')
+
+    for name in ['body_wave', 'surface_wave']:
+        function = get_function(name)
+        table = get_function(name, taup_table=True)
+
+        for stream in data:
+            distance_in_m = gps2dist_azimuth(stream.origin.latitude,
+                stream.origin.longitude, stream.station.latitude,
+                stream.station.longitude)[0]
+
+            expected = function._get_picks(stream, stream.origin,
+                distance_in_m)
+            picks = table._get_picks(stream, stream.origin, distance_in_m)
+
+            for phase in ['P', 'S']:
+                assert abs(picks[phase]-expected[phase]) < 0.01
+
+        for label, streams in [('data', data), ('greens', greens)]:
+            expected = streams.map(function)
+            actual = streams.map(table)
+
+            for stream1, stream2 in zip(expected, actual):
+                for trace1, trace2 in zip(stream1, stream2):
+                    shift = trace1.stats.starttime-trace2.stats.starttime
+                    assert abs(shift) <= trace1.stats.delta
+                    if shift==0.:
+                        assert np.array_equal(trace1.data, trace2.data)
+
+        print('  %s, P and S picks and window start times agree' % name)
+
+    print('')
+
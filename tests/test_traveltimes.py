@@ -0,0 +1,167 @@
+
+import numpy as np
+import os
+import tempfile
+import warnings
+
+from obspy.taup import TauPyModel
+from mtuq.util.polarity import calculate_takeoff_angle
+from mtuq.util.signal import get_arrival
+from mtuq.util.traveltimes import TravelTimeTable
+
+
+def get_picks(model, depth_in_km, distance_in_deg):
+    # P and S picks as in mtuq.ProcessData, or NaN if there are none
+    with warnings.catch_warnings():
+        warnings.filterwarnings('ignore')
+        arrivals = model.get_travel_times(depth_in_km, distance_in_deg,
+            phase_list=['p', 's', 'P', 'S'])
+
+    picks = {}
+    for pick, phases in [('P', ['p', 'P']), ('S', ['s', 'S'])]:
+        picks[pick] = np.nan
+        for phase in phases:
+            try:
+                picks[pick] = get_arrival(arrivals, phase)
+                break
+            except:
+                pass
+    return picks
+
+
+def get_takeoff_angle(model, depth_in_km, distance_in_deg):
+    takeoff_angle = calculate_takeoff_angle(model, depth_in_km,
+        distance_in_degree=distance_in_deg, phase_list=['p', 'P'])
+    if takeoff_angle is None:
+        return np.nan
+    return takeoff_angle
+
+
+
+if __name__=='__main__':
+    #
+    # Checks that travel times and takeoff angles looked up in a
+    # TravelTimeTable agree with those computed by obspy.taup
+    #
+    # Besides random source depths, depths are included just above and below
+    # discontinuities of the model, where the distance range of upgoing
+    # phases changes abruptly with depth
+    #
+    model = TauPyModel('ak135')
+
+    rng = np.random.default_rng(0)
+
+    depths = list(rng.uniform(0., 700., 40))
+    for depth in [20., 35., 210., 410., 660.]:
+        depths += [depth-0.5, depth-0.01, depth, depth+0.01, depth+0.2,
+            depth+0.5, depth+0.69]
+
+    points = []
+    for depth in depths:
+        for distance in np.concatenate([rng.uniform(0.01, 5., 4),
+            rng.uniform(5., 100., 2), rng.uniform(0.3, 2.5, 4)]):
+            points += [(depth, distance)]
+    points = np.array(points)
+
+    with tempfile.TemporaryDirectory() as path:
+        table = TravelTimeTable('ak135', path=path)
+
+        picks = table.get_picks(points[:, 0], points[:, 1])
+        takeoff_angles = table.get_takeoff_angle(points[:, 0], points[:, 1])
+
+        # values stored on disk are read back exactly by a new table
+        _table = TravelTimeTable('ak135', path=path)
+        _picks = _table.get_picks(points[:, 0], points[:, 1])
+        for key in ['P', 'S']:
+            assert np.array_equal(_picks[key], picks[key], equal_nan=True)
+        assert np.array_equal(
+            _table.get_takeoff_angle(points[:, 0], points[:, 1]),
+            takeoff_angles, equal_nan=True)
+
+        # no temporary files are left behind
+        for dirpath, _, filenames in os.walk(path):
+            assert all([name.endswith('.npz') and not name.startswith('tmp')
+                for name in filenames])
+
+
+    print('Checking %d source-receiver pairs...\n' % len(points))
+
+    errors = {'P': [], 'S': [], 'takeoff_angle': []}
+    for _i, (depth, distance) in enumerate(points):
+        expected = get_picks(model, depth, distance)
+        expected['takeoff_angle'] = get_takeoff_angle(model, depth, distance)
+
+        actual = {'P': picks['P'][_i], 'S': picks['S'][_i],
+            'takeoff_angle': takeoff_angles[_i]}
+
+        for key in errors:
+            # phases must be found by both or neither
+            if np.isnan(actual[key]) != np.isnan(expected[key]):
+                raise Exception('Phase mismatch at depth %f, distance %f' %
+                    (depth, distance))
+
+            if not np.isnan(actual[key]):
+                errors[key] += [abs(actual[key] - expected[key])]
+
+
+    for key, tolerance in [('P', 0.01), ('S', 0.01), ('takeoff_angle', 1.)]:
+        _errors = np.array(errors[key])
+        worst = np.argmax(_errors)
+
+        print('  %s: maximum error %.2e' % (key, _errors[worst]))
+
+        assert _errors[worst] < tolerance
+
+    print('')
+
+
+    #
+    # Checks that polarity misfit computed from takeoff angles calculated by
+    # obspy.taup (the default) agrees with a straightforward implementation,
+    # and that takeoff angles looked up in a TravelTimeTable instead agree
+    # with obspy.taup to within the stated tolerance
+    #
+    from obspy.geodetics import kilometers2degrees
+    from mtuq.grid import FullMomentTensorGridRandom
+    from mtuq.misfit.polarity import PolarityMisfit
+    from mtuq.misfit.waveform.level2 import _to_array
+    from mtuq.util import AttribDict
+    from mtuq.util.math import radiation_coef
+    from mtuq.util.polarity import extract_takeoff_angle
+    from synthetics import get_problem
+
+    _, greens, _, _ = get_problem(nstations=8, npts=300, dt=0.1)
+
+    # takeoff angles are calculated for Green's tensors from solvers other
+    # than FK
+    for tensor in greens:
+        tensor.tags = ['model:ak135', 'solver:AxiSEM']
+        tensor.station.sac = AttribDict({
+            'evdp': tensor.origin.depth_in_m/1000.,
+            'dist': tensor.distance_in_m/1000.,
+            })
+
+    expected = [get_takeoff_angle(model, tensor.station.sac['evdp'],
+        kilometers2degrees(tensor.station.sac['dist'])) for tensor in greens]
+
+    assert np.array_equal(extract_takeoff_angle(greens, taup_model='ak135'),
+        expected)
+
+    with tempfile.TemporaryDirectory() as path:
+        table = TravelTimeTable('ak135', path=path)
+        assert np.allclose(extract_takeoff_angle(greens, table=table),
+            expected, atol=1.)
+
+    sources = FullMomentTensorGridRandom(npts=1000, magnitudes=[4.5])
+    polarities = np.array([1, -1, 1, 0, -1, -1, 1, 1])
+
+    predicted = np.array([radiation_coef(_to_array(sources), takeoff_angle,
+        tensor.azimuth) for takeoff_angle, tensor in zip(expected, greens)])
+    expected = np.sum(np.abs(predicted.T*np.abs(polarities)-polarities),
+        axis=1)/2
+
+    values = PolarityMisfit(taup_model='ak135')(polarities, greens, sources)
+    assert np.array_equal(values[:, 0], expected)
+
+    print('Polarity misfit agrees with obspy.taup takeoff angles\n')
+